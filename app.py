@@ -1,24 +1,31 @@
 from flask import Flask, g, render_template, session, redirect, url_for
+import logging
 import sqlite3
 from config import Config
 import os
 
 def log_activity(user_id, activity_type, game_id=None, description=None):
     """
-    Helper to insert a row into the activities table.
+    Helper to insert a row into the activities table and fan it out to the
+    author's followers' timelines.
     activity_type: e.g. 'list_update', 'review'
     description: short text like 'added to wishlist ' – the game title is joined in the query.
     """
     db = get_db()
-    db.execute(
+    cursor = db.execute(
         'INSERT INTO activities (user_id, activity_type, game_id, description) VALUES (?, ?, ?, ?)',
         (user_id, activity_type, game_id, description)
     )
+    feed.fan_out(db, cursor.lastrowid)
     db.commit()
 
-from db import get_db, query_db
+from db import get_db, query_db, close_db, record_request_queries, slow_query_log, query_budget
 from modules.auth import login_required
 from modules.admin import admin_bp
+from modules import feed
+from cache import anonymous_cache
+import invalidation
+from fragments import FragmentCacheExtension
 
   
 
@@ -29,30 +36,49 @@ app.config.from_object(Config)
 os.makedirs('var', exist_ok=True)
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Slow statements go to their own log file
+if app.config.get('SLOW_QUERY_LOG') and not slow_query_log.handlers:
+    slow_handler = logging.FileHandler(app.config['SLOW_QUERY_LOG'], delay=True)
+    slow_handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    slow_query_log.addHandler(slow_handler)
+    slow_query_log.setLevel(logging.WARNING)
+
 # Database helper functions
+app.after_request(record_request_queries)
+
+# Keep this worker's caches in step with writes made by the others
+app.before_request(invalidation.poll_if_due)
+app.after_request(invalidation.sync_after_write)
+
 @app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, "_database", None)
-    if db is not None:
-        db.close()
+    # Hand the connection back to the pool instead of closing it
+    close_db(exception)
 
 
 # Make query_db available in Jinja templates
 app.jinja_env.globals.update(query_db=query_db)
 
+# {% cache %} blocks for repeated cards (see fragments.py)
+app.jinja_env.add_extension(FragmentCacheExtension)
+
 # Register blueprints
 from modules.auth import auth_bp
 from modules.games import games_bp
 from modules.users import users_bp
 from modules.admin import admin_bp
+from modules.api import api_bp
 
 app.register_blueprint(auth_bp)
 app.register_blueprint(games_bp)
 app.register_blueprint(users_bp)
 app.register_blueprint(admin_bp)
+app.register_blueprint(api_bp)
 
 # Main routes
 @app.route('/')
+@anonymous_cache('index')
+@query_budget(2)
 def index():
     """Landing page - accessible without login"""
     # If user is already logged in, redirect to home
@@ -86,6 +112,7 @@ def index():
 @app.route('/home')
 # Ensure a user is logged in
 @login_required 
+@query_budget(3)
 def home():
     """Logged-in home page with personalized content"""
     db = get_db()
@@ -119,17 +146,7 @@ def home():
     ''', (session['user_id'], session['user_id'])).fetchall()
     
     # Get activity from followed users
-    following_activity = db.execute('''
-        SELECT a.*, u.username, g.title, g.cover_image_url
-        FROM activities a
-        JOIN users u ON a.user_id = u.id
-        LEFT JOIN games g ON a.game_id = g.id
-        WHERE a.user_id IN (
-            SELECT following_id FROM follows WHERE follower_id = ?
-        )
-        ORDER BY a.created_at DESC
-        LIMIT 10
-    ''', (session['user_id'],)).fetchall()
+    following_activity = feed.read_timeline(db, session['user_id'], limit=10)
     
     return render_template('home.html',
                          recent_activity=recent_activity,
@@ -137,6 +154,7 @@ def home():
                          following_activity=following_activity)
 
 @app.route('/about')
+@anonymous_cache()
 def about():
     """About page"""
     return render_template('about.html')
@@ -0,0 +1,153 @@
+"""
+Candidate-set size and latency of the typo-tolerant game search.
+
+Builds a catalog of generated titles, then searches for misspelled versions
+of random titles and prints, per query and overall, how many trigram
+postings were read, how many candidates were reranked, the latency of each
+stage and whether the intended title came back in the top 10.
+
+    python benchmarks/fuzzy_search.py --titles 500000 --queries 200
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from app import app
+from db import get_db
+from init_db import migrate
+from modules import fuzzy
+
+SYLLABLES = ['ka', 'ri', 'to', 'mon', 'sha', 'dow', 'vel', 'ith', 'ar', 'quest', 'nor', 'bla',
+             'zen', 'lo', 'gar', 'eth', 'fal', 'cro', 'un', 'dra', 'pix', 'sol', 'tir', 'wyn']
+COMMON = ['the', 'of', 'and', 'legend', 'saga', 'chronicles', 'ii', 'iii', 'deluxe', 'edition']
+
+
+def make_vocabulary(rng, size):
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_title(rng, vocabulary):
+    words = [rng.choice(vocabulary) for _ in range(rng.randint(1, 3))]
+    if rng.random() < 0.5:
+        words.insert(rng.randint(0, len(words)), rng.choice(COMMON))
+    if rng.random() < 0.2:
+        words.append(str(rng.randint(2, 9)))
+    return ' '.join(words).title()
+
+
+def misspell(rng, title):
+    """One typo (drop, swap, replace or double a letter) in the longest word."""
+    words = title.split()
+    i = max(range(len(words)), key=lambda k: len(words[k]))
+    word = words[i]
+    pos = rng.randint(1, len(word) - 2)
+    kind = rng.choice(['drop', 'swap', 'replace', 'double'])
+    if kind == 'drop':
+        word = word[:pos] + word[pos + 1:]
+    elif kind == 'swap':
+        word = word[:pos] + word[pos + 1] + word[pos] + word[pos + 2:]
+    elif kind == 'replace':
+        word = word[:pos] + rng.choice('aeiouxyz') + word[pos + 1:]
+    else:
+        word = word[:pos] + word[pos] + word[pos:]
+    words[i] = word
+    return ' '.join(words)
+
+
+def build_database(path, n_titles, seed):
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng, max(1000, n_titles // 20))
+    titles = [make_title(rng, vocabulary) for _ in range(n_titles)]
+
+    conn = sqlite3.connect(path)
+    with open('schema.sql') as f:
+        conn.executescript(f.read())
+    migrate(conn)
+    started = time.perf_counter()
+    conn.executemany('INSERT INTO games (title) VALUES (?)', [(t,) for t in titles])
+    conn.commit()
+    conn.close()
+    print(f'Inserted {n_titles} titles (with trigram indexing) in {time.perf_counter() - started:.1f}s')
+    return titles
+
+
+def postings_read(db, query):
+    """Sum of document frequencies of the trigrams candidates() would use."""
+    grams = sorted(fuzzy.trigrams(query))
+    if not grams:
+        return 0
+    placeholders = ', '.join('?' for _ in grams)
+    df = [doc for _, doc in db.execute(
+        f'SELECT term, doc FROM games_title_vocab WHERE term IN ({placeholders})', grams)]
+    usable = sorted(d for d in df if d <= app.config['FUZZY_MAX_DF'])
+    return sum(usable[:app.config['FUZZY_MAX_TRIGRAMS']])
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--titles', type=int, default=500000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='print every query')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed + 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, 'fuzzy.db')
+        titles = build_database(database, args.titles, args.seed)
+        app.config.update(TESTING=True, DATABASE=database, SQL_INSTRUMENTATION=False)
+
+        candidate_ms, rerank_ms, sizes, postings, found = [], [], [], [], 0
+        with app.test_request_context('/'):
+            db = get_db()
+            fuzzy.search(db, 'warm up')
+            for _ in range(args.queries):
+                target = rng.choice(titles)
+                query = misspell(rng, target)
+
+                started = time.perf_counter()
+                rows = fuzzy.candidates(db, query)
+                middle = time.perf_counter()
+                ranked = fuzzy.rerank(query, rows)
+                finished = time.perf_counter()
+
+                hit = target in [row['title'] for row in ranked[:10]]
+                found += hit
+                candidate_ms.append((middle - started) * 1000)
+                rerank_ms.append((finished - middle) * 1000)
+                sizes.append(len(rows))
+                postings.append(postings_read(db, query))
+                if args.verbose:
+                    print(f'{query!r:40} -> {target!r:40} candidates {len(rows):4d} '
+                          f'postings {postings[-1]:6d} {candidate_ms[-1] + rerank_ms[-1]:6.1f} ms '
+                          f'{"hit" if hit else "MISS"}')
+
+        total_ms = [c + r for c, r in zip(candidate_ms, rerank_ms)]
+        print(f'{args.queries} queries over {args.titles} titles')
+        print(f'  postings read   mean {statistics.mean(postings):8.0f}  max {max(postings):8d}')
+        print(f'  candidates      mean {statistics.mean(sizes):8.1f}  max {max(sizes):8d}')
+        for label, values in (('candidates ms', candidate_ms), ('rerank ms', rerank_ms), ('total ms', total_ms)):
+            print(f'  {label:14}  p50 {statistics.median(values):8.2f}  p95 {percentile(values, 0.95):8.2f}  '
+                  f'max {max(values):8.2f}')
+        print(f'  intended title in top 10: {found / args.queries:.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""
+Read throughput while reviews and list updates are being written.
+
+Runs reader threads against the public GET pages while writer threads post
+reviews and list updates, once with read-only routing enabled and once with
+every request on the read-write pool, and prints reads/sec and latency.
+
+    python benchmarks/read_write_concurrency.py --readers 8 --writers 2 --seconds 5
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+os.chdir(PROJECT_ROOT)
+
+from werkzeug.security import generate_password_hash
+from app import app
+from init_db import migrate
+
+
+def build_database(path, n_games, n_users):
+    conn = sqlite3.connect(path)
+    with open('schema.sql') as f:
+        conn.executescript(f.read())
+    migrate(conn)
+    conn.executemany(
+        'INSERT INTO games (title, genre, platform, release_year, description) VALUES (?, ?, ?, ?, ?)',
+        [(f'Game {i}', f'Genre {i % 12}', f'Platform {i % 5}', 1990 + i % 35, 'x' * 400)
+         for i in range(n_games)]
+    )
+    # Cheap hash so logging the writers in does not dominate a short run
+    password_hash = generate_password_hash('bench', method='pbkdf2:sha256:1')
+    conn.executemany(
+        'INSERT INTO users (username, email, password_hash) VALUES (?, ?, ?)',
+        [(f'bench{i}', f'bench{i}@example.com', password_hash) for i in range(n_users)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def reader(stop, n_games, latencies):
+    client = app.test_client()
+    while not stop.is_set():
+        path = random.choice(['/', f'/game/{random.randint(1, n_games)}', '/profile/bench0'])
+        started = time.perf_counter()
+        client.get(path)
+        latencies.append(time.perf_counter() - started)
+
+
+def writer(stop, ready, index, n_games, counter):
+    client = app.test_client()
+    client.post('/login', data={'username': f'bench{index}', 'password': 'bench'})
+    ready.wait()
+    while not stop.is_set():
+        game_id = random.randint(1, n_games)
+        client.post(f'/game/{game_id}/review', data={'rating': random.randint(1, 10), 'review_text': 'bench'})
+        client.post(f'/game/{game_id}/add-to-list', data={'status': 'completed'})
+        counter.append(2)
+
+
+def run(routing, args, database):
+    app.config.update(DATABASE=database, DB_READ_ONLY_ROUTING=routing)
+    stop = threading.Event()
+    ready = threading.Barrier(args.writers + 1)
+    latencies, writes = [], []
+    writers = [threading.Thread(target=writer, args=(stop, ready, i, args.games, writes))
+               for i in range(args.writers)]
+    readers = [threading.Thread(target=reader, args=(stop, args.games, latencies))
+               for _ in range(args.readers)]
+    threads = writers + readers
+    for t in writers:
+        t.start()
+    ready.wait()
+    for t in readers:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    label = 'read-only routing' if routing else 'single read-write pool'
+    print(f'{label:>24}: {len(latencies) / args.seconds:8.1f} reads/s  '
+          f'p50 {statistics.median(latencies) * 1000:6.2f} ms  '
+          f'p95 {latencies[int(len(latencies) * 0.95)] * 1000:6.2f} ms  '
+          f'{sum(writes) / args.seconds:6.1f} writes/s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--games', type=int, default=2000)
+    args = parser.parse_args()
+
+    app.config.update(TESTING=True, SECRET_KEY='bench')
+    with tempfile.TemporaryDirectory() as tmp:
+        for routing in (False, True):
+            database = os.path.join(tmp, f'bench_{routing}.db')
+            build_database(database, args.games, args.writers)
+            run(routing, args, database)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+"""
+Full-response cache for anonymous GETs of public pages.
+
+Logged-out visitors all see the same landing page and about page, so the
+rendered response is kept in memory and served without touching the
+database. Every cached page carries tags ('index'); when the data behind a
+page changes, in this worker or another, invalidation.py calls
+invalidate() with its tags, and the next visitor rebuilds it. Pages cached
+by route_cache.py are not also cached here: each view uses one of the two.
+
+When many anonymous requests miss the same page at once, only the first
+one runs the view; the others wait for it and are served its response, so
+the database sees at most one rebuild per invalidation. An invalidated
+page is kept while it is rebuilt and served to the requests that arrive
+meanwhile, so they do not wait either.
+
+The same cache keeps other expensive values that many requests share, for
+a few seconds or minutes each (see cached_value()).
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import Response, current_app, make_response, request, session
+import etags
+
+
+class ResponseCache:
+    """
+    LRU of (body, status, headers) per URL, or of any other value, with
+    per-tag versions so a value built before an invalidation is never
+    stored after it.
+
+    An invalidated or expired entry is not dropped but marked stale. The
+    first request to find it stale rebuilds it; requests arriving during the
+    rebuild are served the stale value instead of waiting, for up to
+    max_stale seconds after it went stale. Without a usable entry, requests
+    for a key being built wait for that build, so a key is built by one
+    request at a time however many ask for it.
+    """
+
+    def __init__(self, max_entries=1000, wait_timeout=5.0, max_stale=10.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+        self.max_stale = max_stale
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> [value, tags, expires, stale_since]
+        self._versions = {}            # tag -> version
+        self._generation = 0           # bumped by clear()
+        self._building = {}            # key -> Event set when the rebuild is done
+        self.hits = self.stale_hits = self.misses = self.rebuilds = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _stamp(self, tags):
+        return self._generation, tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def _fresh(self, key, now):
+        """The entry for `key` and whether it is fresh, marking it stale once expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        if entry[3] is None and entry[2] is not None and now >= entry[2]:
+            entry[3] = entry[2]
+        return entry, entry[3] is None
+
+    def get_or_build(self, key, tags, build, ttl=None):
+        """
+        The cached value for `key`, or the result of build() stored under
+        `tags` for `ttl` seconds (until invalidated if None). build() returns
+        (value, cacheable). Returns (value, hit); a stale value is a hit.
+        """
+        with self._lock:
+            now = self.clock()
+            entry, fresh = self._fresh(key, now)
+            if fresh:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0], True
+            waiting = self._building.get(key)
+            if waiting is None:
+                done = self._building[key] = threading.Event()
+                stamp = self._stamp(tags)
+                self.misses += 1
+            elif entry is not None and now - entry[3] <= self.max_stale:
+                # Someone is already rebuilding it: serve the old one meanwhile
+                self.stale_hits += 1
+                return entry[0], True
+            else:
+                self.misses += 1
+
+        if waiting is not None:
+            # Someone is already rendering this page: use theirs
+            waiting.wait(self.wait_timeout)
+            with self._lock:
+                entry, fresh = self._fresh(key, self.clock())
+                if fresh:
+                    self._entries.move_to_end(key)
+                    return entry[0], True
+            # Not cacheable, or invalidated meanwhile: render our own
+            return build()[0], False
+
+        try:
+            value, cacheable = build()
+            with self._lock:
+                self.rebuilds += 1
+                if cacheable and self._stamp(tags) == stamp:
+                    expires = self.clock() + ttl if ttl is not None else None
+                    self._entries[key] = [value, tuple(tags), expires, None]
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            return value, False
+        finally:
+            with self._lock:
+                del self._building[key]
+            done.set()
+
+    def invalidate(self, *tags):
+        """Mark every entry tagged with any of `tags` stale."""
+        tags = set(tags)
+        with self._lock:
+            now = self.clock()
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+            for entry in self._entries.values():
+                if entry[3] is None and tags.intersection(entry[1]):
+                    entry[3] = now
+
+    def clear(self):
+        """Drop every entry, for writes whose effect is hard to pin down."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'stale_hits': self.stale_hits,
+                    'misses': self.misses, 'rebuilds': self.rebuilds}
+
+
+_cache_lock = threading.Lock()
+
+
+def _process_cache(app, name, max_entries):
+    app = app or current_app._get_current_object()
+    database = app.config['DATABASE']
+    current = app.extensions.get(name)
+    if current is None or current[0] != database:
+        with _cache_lock:
+            current = app.extensions.get(name)
+            if current is None or current[0] != database:
+                current = app.extensions[name] = (database, ResponseCache(max_entries))
+    return current[1]
+
+
+def get_cache(app=None):
+    """The process-wide response cache for the current database."""
+    app = app or current_app._get_current_object()
+    return _process_cache(app, 'response_cache', app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+
+
+def get_value_cache(app=None):
+    """The process-wide cache of cached_value() results for the current database."""
+    app = app or current_app._get_current_object()
+    return _process_cache(app, 'value_cache', app.config['VALUE_CACHE_MAX_ENTRIES'])
+
+
+def cached_value(key, compute, ttl, tags=()):
+    """
+    compute(), reused by every request in this worker for `ttl` seconds or
+    until one of `tags` is invalidated. Concurrent requests compute it once.
+    """
+    if not current_app.config['VALUE_CACHE']:
+        return compute()
+    value, _ = get_value_cache().get_or_build(key, tags, lambda: (compute(), True), ttl)
+    return value
+
+
+def invalidate(*tags):
+    get_cache().invalidate(*tags)
+    get_value_cache().invalidate(*tags)
+
+
+def clear():
+    get_cache().clear()
+    get_value_cache().clear()
+
+
+def _cacheable(response):
+    return (response.status_code == 200 and not response.direct_passthrough
+            and 'Set-Cookie' not in response.headers)
+
+
+def anonymous_cache(*tags):
+    """
+    Serve this view from the response cache to logged-out GET requests.
+    Tags may refer to the view's arguments, e.g. 'game:{game_id}'.
+    Requests with pending flash messages render normally, since the page
+    shows (and consumes) them. A cached page with an ETag (see etags.py)
+    answers If-None-Match itself, without a query. Responses vary on the
+    session cookie, so a shared cache never hands the anonymous page to a
+    logged-in visitor.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if (not current_app.config['RESPONSE_CACHE'] or request.method != 'GET'
+                    or 'user_id' in session or '_flashes' in session):
+                return etags.set_cache_control(make_response(f(*args, **kwargs)))
+
+            def build():
+                response = make_response(f(*args, **kwargs))
+                if not _cacheable(response):
+                    return response, False
+                headers = [(k, v) for k, v in response.headers.items() if k != 'Set-Cookie']
+                return (response.get_data(), response.status_code, headers), True
+
+            value, hit = get_cache().get_or_build(
+                request.full_path, [tag.format(**kwargs) for tag in tags], build)
+            if isinstance(value, Response):
+                return etags.set_cache_control(value)
+            body, status, headers = value
+            response = Response(body, status, headers)
+            response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+            return etags.set_cache_control(response).make_conditional(request)
+        return decorated_function
+    return decorator
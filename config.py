@@ -4,4 +4,74 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or '12345'
     DATABASE = os.path.join(os.getcwd(), 'var', 'greatgames.db')
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'static', 'uploads')
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
\ No newline at end of file
+    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
+
+    # Connection pools (see db.ConnectionPool). GET/HEAD requests use the
+    # read-only pool, everything else the read-write pool.
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+    DB_WRITE_POOL_SIZE = int(os.environ.get('DB_WRITE_POOL_SIZE', 4))
+    DB_READ_ONLY_ROUTING = True
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5.0))  # seconds to wait for a free connection
+
+    # Applied to every pooled connection when it is opened
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32000,            # negative = KiB, ~32MB per connection
+        'mmap_size': 256 * 1024 * 1024,  # 256MB
+        'temp_store': 'MEMORY',
+        'foreign_keys': 'ON',
+    }
+
+    # Per-request SQL instrumentation (see db.InstrumentedConnection)
+    SQL_INSTRUMENTATION = True
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+    SLOW_QUERY_LOG = os.path.join(os.getcwd(), 'var', 'slow_queries.log')
+
+    # Home timelines (see modules/feed.py): authors with more followers than
+    # this are merged in at read time instead of fanned out on write
+    TIMELINE_FANOUT_LIMIT = int(os.environ.get('TIMELINE_FANOUT_LIMIT', 1000))
+    TIMELINE_BACKFILL = 100  # activities copied into a timeline on follow
+
+    # Nav search typeahead (see modules/suggest.py)
+    SUGGEST_LIMIT = 8
+
+    # Typo-tolerant search (see modules/fuzzy.py)
+    FUZZY_MAX_TRIGRAMS = 12     # rarest query trigrams used for candidates
+    FUZZY_MAX_DF = 20000        # trigrams in more titles than this are skipped
+    FUZZY_CANDIDATES = 200      # titles reranked by edit distance
+    FUZZY_MAX_DISTANCE = 0.34   # mean edit distance per query word / word length
+
+    # Rendered pages for logged-out visitors (see cache.py)
+    RESPONSE_CACHE = True
+    RESPONSE_CACHE_MAX_ENTRIES = 1000
+
+    # Values shared by many requests, kept for a TTL each (see cache.cached_value)
+    VALUE_CACHE = True
+    VALUE_CACHE_MAX_ENTRIES = 1000
+    BROWSE_FACETS_TTL = float(os.environ.get('BROWSE_FACETS_TTL', 300))  # seconds
+
+    # Rendered pages per URL and viewer, kept while the versions of the data
+    # they show are unchanged (see route_cache.py)
+    ROUTE_CACHE = True
+    ROUTE_CACHE_MAX_BYTES = int(os.environ.get('ROUTE_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+    # Mixed into every ETag (see etags.py); change it on deploys that change
+    # templates, so browsers do not keep pages rendered by the old ones
+    ETAG_SALT = os.environ.get('ETAG_SALT', '')
+
+    # Rendered game and activity cards, keyed by row versions (see fragments.py)
+    FRAGMENT_CACHE = True
+    FRAGMENT_CACHE_MAX_BYTES = int(os.environ.get('FRAGMENT_CACHE_MAX_BYTES', 8 * 1024 * 1024))
+
+    # Hot game, tag and user rows (see entities.py)
+    ENTITY_CACHE = True
+    ENTITY_CACHE_MAX_BYTES = int(os.environ.get('ENTITY_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+    ENTITY_CACHE_TTL = float(os.environ.get('ENTITY_CACHE_TTL', 300))  # seconds
+
+    # How often each worker applies other workers' changes to its caches
+    # (see invalidation.py); the most a cached page or row can lag behind
+    INVALIDATION_POLL_INTERVAL = float(os.environ.get('INVALIDATION_POLL_INTERVAL', 1.0))  # seconds
+
+    # @query_budget violations raise under TESTING; set True/False to override
+    QUERY_BUDGET_ENFORCE = None
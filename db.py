@@ -1,13 +1,545 @@
+import logging
 import sqlite3
-from flask import g, current_app
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from urllib.parse import quote
+from flask import g, current_app, has_request_context, request
 
-def get_db():
-    db = getattr(g, "_database", None)
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became free within the pool timeout."""
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised in testing when a view runs more statements than its @query_budget."""
+
+
+class _Waiter:
+    __slots__ = ('event', 'conn')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.conn = None
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of SQLite connections shared by the request threads.
+
+    A connection is checked out by one thread for the lifetime of an app
+    context and returned on teardown, so it is never used by two threads at
+    once (hence check_same_thread=False). Idle connections are handed out
+    LIFO so the most recently used one - with the warmest page cache - is
+    reused first. When the pool is exhausted, released connections go
+    straight to the longest-waiting thread so nobody starves.
+
+    A read_only pool opens `mode=ro` URI connections. Under WAL these never
+    take the write lock, so readers run alongside the single writer.
+    """
+
+    def __init__(self, database, size=8, timeout=5.0, pragmas=None, read_only=False):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self.read_only = read_only
+        self.pragmas = dict(pragmas or {})
+        if read_only:
+            # The journal mode is a property of the file, set by the writers
+            self.pragmas.pop('journal_mode', None)
+            self.pragmas['query_only'] = 'ON'
+        self._idle = []
+        self._waiters = deque()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    def _connect(self):
+        if self.read_only:
+            uri = f"file:{quote(self.database)}?mode=ro"
+            conn = sqlite3.connect(uri, uri=True, timeout=self.timeout, check_same_thread=False)
+        else:
+            conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _open(self):
+        # The slot was reserved by the caller; give it back if connecting fails
+        try:
+            return self._connect()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def acquire(self):
+        """Check out a connection, opening a new one while below the pool size."""
+        started = time.perf_counter()
+        waiter = None
+        conn = None
+        with self._lock:
+            if self._idle and not self._waiters:
+                conn = self._idle.pop()
+            elif self._created < self.size:
+                self._created += 1
+            else:
+                waiter = _Waiter()
+                self._waiters.append(waiter)
+
+        if waiter is not None:
+            waiter.event.wait(self.timeout)
+            with self._lock:
+                conn = waiter.conn
+                if conn is None:
+                    self._waiters.remove(waiter)
+                    self._timeouts += 1
+            if conn is None:
+                raise PoolTimeout(
+                    f'No database connection available after {self.timeout}s '
+                    f'(pool size {self.size})'
+                )
+        elif conn is None:
+            conn = self._open()
+
+        if not self._is_healthy(conn):
+            self._close_quietly(conn)
+            with self._lock:
+                self._discarded += 1
+            conn = self._open()
+
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+            if waiter is not None:
+                self._waits += 1
+                self._wait_time += elapsed
+                self._max_wait = max(self._max_wait, elapsed)
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back anything left open."""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            healthy = True
+        except sqlite3.Error:
+            healthy = False
+
+        with self._lock:
+            self._in_use -= 1
+            if healthy and not self._closed:
+                if self._waiters:
+                    waiter = self._waiters.popleft()
+                    waiter.conn = conn
+                    waiter.event.set()
+                else:
+                    self._idle.append(conn)
+                return
+            self._created -= 1
+            self._discarded += 1
+        self._close_quietly(conn)
+
+    def close(self):
+        """Close every idle connection; connections still in use are closed on release."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'database': self.database,
+                'read_only': self.read_only,
+                'size': self.size,
+                'open': self._created,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'wait_time_ms': round(self._wait_time * 1000, 3),
+                'max_wait_ms': round(self._max_wait * 1000, 3),
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+            }
+
+
+_pool_lock = threading.Lock()
+
+READ_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+
+def _create_pools(app, database):
+    config = app.config
+    write_pool = ConnectionPool(
+        database,
+        size=config.get('DB_WRITE_POOL_SIZE', 4),
+        timeout=config.get('DB_POOL_TIMEOUT', 5.0),
+        pragmas=config.get('SQLITE_PRAGMAS'),
+    )
+    # Open one writer up front: it creates the file if needed and switches it
+    # to WAL before any read-only connection looks at it.
+    write_pool.release(write_pool.acquire())
+    read_pool = ConnectionPool(
+        database,
+        size=config.get('DB_POOL_SIZE', 8),
+        timeout=config.get('DB_POOL_TIMEOUT', 5.0),
+        pragmas=config.get('SQLITE_PRAGMAS'),
+        read_only=True,
+    )
+    return {'read': read_pool, 'write': write_pool}
+
+
+def get_pool(mode='write', app=None):
+    """Return the app's read or write pool, (re)creating both if DATABASE changed."""
+    app = app or current_app._get_current_object()
+    database = app.config['DATABASE']
+    pools = app.extensions.get('db_pools')
+    if pools is None or pools['write'].database != database:
+        with _pool_lock:
+            pools = app.extensions.get('db_pools')
+            if pools is None or pools['write'].database != database:
+                if pools is not None:
+                    for pool in pools.values():
+                        pool.close()
+                pools = app.extensions['db_pools'] = _create_pools(app, database)
+    return pools[mode]
+
+
+slow_query_log = logging.getLogger('greatgames.sql.slow')
+query_budget_log = logging.getLogger('greatgames.sql.budget')
+
+
+class QueryRecord:
+    """One statement run during a request: text, parameter shape, time and rows."""
+    __slots__ = ('sql', 'params', 'duration', 'rows')
+
+    def __init__(self, sql, params):
+        self.sql = ' '.join(sql.split())
+        self.params = _params_shape(params)
+        self.duration = 0.0
+        self.rows = 0
+
+
+def _params_shape(params):
+    # Only the types are kept: parameter values may be passwords or emails
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{k}: {type(v).__name__}' for k, v in params.items()) + '}'
+    return '(' + ', '.join(type(v).__name__ for v in params) + ')'
+
+
+class InstrumentedCursor:
+    """Cursor proxy that adds fetch time and fetched rows to its QueryRecord."""
+
+    def __init__(self, cursor, record):
+        self._cursor = cursor
+        self._record = record
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def _timed(self, fetch, *args):
+        started = time.perf_counter()
+        rv = fetch(*args)
+        self._record.duration += time.perf_counter() - started
+        return rv
+
+    def fetchone(self):
+        row = self._timed(self._cursor.fetchone)
+        if row is not None:
+            self._record.rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(self._cursor.fetchmany, size or self._cursor.arraysize)
+        self._record.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(self._cursor.fetchall)
+        self._record.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+
+class InstrumentedConnection:
+    """
+    Connection proxy that records every execute() and commit() into a
+    per-request list. Everything else is passed through to the real
+    connection, which is what goes back to the pool.
+    """
+
+    def __init__(self, conn, records):
+        self.raw = conn
+        self._records = records
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+    def _run(self, method, sql, params):
+        record = QueryRecord(sql, params)
+        started = time.perf_counter()
+        try:
+            cursor = method(sql, params)
+        finally:
+            record.duration = time.perf_counter() - started
+            self._records.append(record)
+        if cursor.rowcount > 0:
+            record.rows = cursor.rowcount
+        return InstrumentedCursor(cursor, record)
+
+    def execute(self, sql, parameters=()):
+        return self._run(self.raw.execute, sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        record_params = seq_of_parameters[0] if seq_of_parameters else ()
+        record = QueryRecord(sql, record_params)
+        started = time.perf_counter()
+        try:
+            cursor = self.raw.executemany(sql, seq_of_parameters)
+        finally:
+            record.duration = time.perf_counter() - started
+            self._records.append(record)
+        record.rows = max(cursor.rowcount, 0)
+        return cursor
+
+    def commit(self):
+        record = QueryRecord('COMMIT', ())
+        started = time.perf_counter()
+        try:
+            self.raw.commit()
+        finally:
+            record.duration = time.perf_counter() - started
+            self._records.append(record)
+
+
+class QueryStats:
+    """Process-wide totals per statement text, for the admin perf page."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def add(self, records):
+        with self._lock:
+            for record in records:
+                entry = self._stats.get(record.sql)
+                if entry is None:
+                    entry = self._stats[record.sql] = {
+                        'sql': record.sql, 'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0,
+                    }
+                duration_ms = record.duration * 1000
+                entry['calls'] += 1
+                entry['total_ms'] += duration_ms
+                entry['max_ms'] = max(entry['max_ms'], duration_ms)
+                entry['rows'] += record.rows
+
+    def top(self, limit=25):
+        with self._lock:
+            entries = sorted(self._stats.values(), key=lambda e: e['total_ms'], reverse=True)
+            return [dict(e, avg_ms=e['total_ms'] / e['calls']) for e in entries[:limit]]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+query_stats = QueryStats()
+
+
+def request_queries():
+    """Statements recorded so far for the current app context."""
+    return g.setdefault('_queries', [])
+
+
+def _count_statements(records):
+    return sum(1 for r in records if r.sql != 'COMMIT')
+
+
+def query_budget(max_queries):
+    """
+    Declare how many statements a view may run, template rendering included.
+    Going over raises QueryBudgetExceeded when QUERY_BUDGET_ENFORCE is set
+    (the default under TESTING) and logs a warning otherwise.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            records = request_queries()
+            before = len(records)
+            rv = f(*args, **kwargs)
+            used = _count_statements(records[before:])
+            if used > max_queries:
+                message = (f'{request.endpoint} ran {used} queries, budget is {max_queries}: '
+                           + '; '.join(r.sql[:80] for r in records[before:]))
+                enforce = current_app.config.get('QUERY_BUDGET_ENFORCE')
+                if enforce is None:
+                    enforce = current_app.testing
+                if enforce:
+                    raise QueryBudgetExceeded(message)
+                query_budget_log.warning(message)
+            return rv
+        decorated_function.query_budget = max_queries
+        return decorated_function
+    return decorator
+
+
+def record_request_queries(response):
+    """
+    after_request hook: add a Server-Timing header with the request's query
+    count and time, log slow statements and fold them into query_stats.
+    """
+    records = g.get('_queries')
+    if not records:
+        return response
+
+    total_ms = sum(r.duration for r in records) * 1000
+    response.headers.add(
+        'Server-Timing', f'db;dur={total_ms:.2f};desc="{_count_statements(records)} queries"'
+    )
+
+    threshold = current_app.config.get('SLOW_QUERY_MS', 100)
+    for record in records:
+        duration_ms = record.duration * 1000
+        if duration_ms >= threshold:
+            slow_query_log.warning(
+                '%.1f ms  %s %s  rows=%d  params=%s  %s', duration_ms, request.method,
+                request.path, record.rows, record.params, record.sql,
+            )
+
+    query_stats.add(records)
+    return response
+
+
+_statement_listeners = []
+
+
+def _trace_statement(sql):
+    for listener in list(_statement_listeners):
+        listener(sql)
+
+
+@contextmanager
+def capture_statements():
+    """
+    Collect the text (with parameters inlined) of every statement run on
+    connections checked out inside this block. Used by the query plan tests.
+    """
+    statements = []
+    _statement_listeners.append(statements.append)
+    try:
+        yield statements
+    finally:
+        _statement_listeners.remove(statements.append)
+
+
+def _checkout(mode):
+    attr = f'_{mode}_db'
+    db = getattr(g, attr, None)
     if db is None:
-        db = g._database = sqlite3.connect(current_app.config["DATABASE"])
-        db.row_factory = sqlite3.Row
+        pool = get_pool(mode)
+        db = pool.acquire()
+        db.set_trace_callback(_trace_statement if _statement_listeners else None)
+        if current_app.config.get('SQL_INSTRUMENTATION', True):
+            db = InstrumentedConnection(db, request_queries())
+        setattr(g, attr, db)
+        setattr(g, f'{attr}_pool', pool)
     return db
 
+
+def get_read_db():
+    """Read-only connection for the current app context."""
+    return _checkout('read')
+
+
+def get_write_db():
+    """Read-write connection for the current app context."""
+    return _checkout('write')
+
+
+def _request_mode():
+    mode = getattr(g, '_db_mode', None)
+    if mode is not None:
+        return mode
+    if not current_app.config.get('DB_READ_ONLY_ROUTING', True):
+        return 'write'
+    if has_request_context() and request.method in READ_METHODS:
+        return 'read'
+    return 'write'
+
+
+def get_db():
+    """
+    Connection for the current request: read-only for GET/HEAD/OPTIONS,
+    read-write otherwise, unless the view is marked with @read_only or
+    @read_write.
+    """
+    return _checkout(_request_mode())
+
+
+def read_only(f):
+    """Serve this view from the read-only pool regardless of HTTP method."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g._db_mode = 'read'
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def read_write(f):
+    """Serve this view from the read-write pool regardless of HTTP method."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g._db_mode = 'write'
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def close_db(exception=None):
+    for mode in ('read', 'write'):
+        db = g.pop(f'_{mode}_db', None)
+        pool = g.pop(f'_{mode}_db_pool', None)
+        if db is not None and pool is not None:
+            pool.release(getattr(db, 'raw', db))
+
+def pool_stats():
+    return {mode: get_pool(mode).stats() for mode in ('read', 'write')}
+
 def query_db(query, args=(), one=False):
     cur = get_db().execute(query, args)
     rv = cur.fetchall()
@@ -0,0 +1,206 @@
+"""
+In-process cache of the hot rows most pages start from: a game by id, its
+tags, and the public columns of a user by username.
+
+Rows are copied into plain dicts and kept until ENTITY_CACHE_TTL seconds
+have passed, they are invalidated because the row changed, or they
+are evicted (least recently used first) to keep the estimated size under
+ENTITY_CACHE_MAX_BYTES. Cached values are shared between requests and
+must not be modified.
+
+Entries are invalidated by invalidation.py when a game or user changes in
+any worker process; the TTL is only a backstop.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+from flask import current_app
+
+# What a user entity holds; never the password hash or email
+USER_COLUMNS = 'id, username, name, bio, profile_picture, is_admin, created_at'
+
+
+def sizeof(value):
+    """Rough memory footprint of a cached value, in bytes."""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sizeof(k) + sizeof(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(sizeof(item) for item in value)
+    return size
+
+
+class EntityCache:
+    """
+    LRU with a TTL and a byte budget. A per-key version makes sure a value
+    loaded before an invalidation is never stored after it.
+    """
+
+    def __init__(self, max_bytes, ttl, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, size, expires)
+        self._versions = {}            # key -> version, for invalidated keys
+        self._generation = 0           # bumped by clear()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _stamp(self, key):
+        return self._generation, self._versions.get(key, 0)
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self.bytes -= size
+
+    def get_or_load(self, key, load):
+        """The cached value for `key`, or load() stored under it. None is not cached."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                self._drop(key)
+                self.expirations += 1
+            self.misses += 1
+            stamp = self._stamp(key)
+
+        value = load()
+        if value is None:
+            return None
+        size = sizeof(value)
+        with self._lock:
+            if self._stamp(key) == stamp:
+                self._store(key, value, size)
+        return value
+
+    def get(self, key, valid=None):
+        """
+        The cached value for `key`, or None. A value for which valid(value)
+        is false is dropped and counts as a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[2] <= self.clock():
+                    self._drop(key)
+                    self.expirations += 1
+                elif valid is None or valid(entry[0]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                else:
+                    self._drop(key)
+            self.misses += 1
+            return None
+
+    def set(self, key, value, size=None):
+        """Store `value`, replacing what `key` held. `size` defaults to sizeof(value)."""
+        if size is None:
+            size = sizeof(value)
+        with self._lock:
+            self._store(key, value, size)
+
+    def _store(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (value, size, self.clock() + self.ttl)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+                if key in self._entries:
+                    self._drop(key)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._versions.clear()
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'expirations': self.expirations}
+
+
+_cache_lock = threading.Lock()
+
+
+def get_entity_cache(app=None):
+    """The process-wide entity cache for the current database."""
+    app = app or current_app._get_current_object()
+    database = app.config['DATABASE']
+    current = app.extensions.get('entity_cache')
+    if current is None or current[0] != database:
+        with _cache_lock:
+            current = app.extensions.get('entity_cache')
+            if current is None or current[0] != database:
+                cache = EntityCache(app.config['ENTITY_CACHE_MAX_BYTES'], app.config['ENTITY_CACHE_TTL'])
+                current = app.extensions['entity_cache'] = (database, cache)
+    return current[1]
+
+
+def _cached(key, load):
+    if not current_app.config['ENTITY_CACHE']:
+        return load()
+    return get_entity_cache().get_or_load(key, load)
+
+
+def game(db, game_id):
+    """The games row for `game_id` as a dict, or None."""
+    def load():
+        row = db.execute('SELECT * FROM games WHERE id = ?', (game_id,)).fetchone()
+        return dict(row) if row else None
+    return _cached(('game', game_id), load)
+
+
+def game_tags(db, game_id):
+    """The names of a game's tags, as [{'name': ...}]."""
+    def load():
+        return [dict(row) for row in db.execute('''
+            SELECT t.name
+            FROM tags t
+            JOIN game_tags gt ON t.id = gt.tag_id
+            WHERE gt.game_id = ?
+        ''', (game_id,))]
+    return _cached(('game_tags', game_id), load)
+
+
+def user(db, username):
+    """The public columns of the user called `username` as a dict, or None."""
+    def load():
+        row = db.execute(f'SELECT {USER_COLUMNS} FROM users WHERE username = ?', (username,)).fetchone()
+        return dict(row) if row else None
+    return _cached(('user', username), load)
+
+
+def invalidate_game(game_id):
+    """After a game is edited, re-rated, re-tagged or deleted."""
+    get_entity_cache().invalidate(('game', game_id), ('game_tags', game_id))
+
+
+def invalidate_user(username):
+    """After a user's profile or role changes."""
+    get_entity_cache().invalidate(('user', username))
+
+
+def clear():
+    """When this worker cannot tell what changed (see invalidation.py)."""
+    get_entity_cache().clear()
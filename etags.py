@@ -0,0 +1,46 @@
+"""
+Validators for pages built from versioned data.
+
+A page's ETag is a hash of the version stamps of everything it shows
+(migrations/0010_content_versions.sql), who is looking at it, and
+ETAG_SALT. route_cache.py reads the stamps with one query before the view
+runs, so a revalidation that matches is answered with 304 without the
+view's queries or its template render.
+
+The stamps are read before the page is, so a write landing in between can
+only pair an old ETag with a newer body; the next revalidation then misses
+and fetches the page again. A body is never older than its ETag.
+"""
+import hashlib
+from flask import Response, current_app, request, session
+from werkzeug.http import is_resource_modified
+
+
+def viewer():
+    """Who the page is rendered for: what the nav and per-user parts depend on."""
+    return session.get('user_id'), bool(session.get('is_admin'))
+
+
+def make_etag(stamp):
+    """Strong ETag value for a tuple of version stamps and the current viewer."""
+    parts = (current_app.config['ETAG_SALT'],) + viewer()
+    return hashlib.sha1(repr(parts + tuple(stamp)).encode()).hexdigest()
+
+
+def set_cache_control(response):
+    """Always revalidate; never share a logged-in page between visitors."""
+    response.headers['Cache-Control'] = 'private, no-cache' if 'user_id' in session else 'no-cache'
+    response.vary.add('Cookie')
+    return response
+
+
+def set_validators(response, etag):
+    response.set_etag(etag)
+    return set_cache_control(response)
+
+
+def not_modified(etag):
+    """A 304 if the request's If-None-Match matches `etag`, else None."""
+    if is_resource_modified(request.environ, etag=etag):
+        return None
+    return set_validators(Response(status=304), etag)
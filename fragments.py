@@ -0,0 +1,61 @@
+"""
+Fragment cache for repeated template markup.
+
+    {% cache 'game_card', game.id, game.version %}
+        ...card markup...
+    {% endcache %}
+
+The rendered block is kept in a byte-bounded LRU per worker, keyed by the
+values after `cache`, and reused by every template that renders the same
+key. A key includes the version stamps of the rows the block shows
+(migrations/0010_content_versions.sql), so an edit changes the key instead
+of invalidating anything; fragments for old versions fall out of the LRU.
+The block must not show anything that is not covered by its key.
+
+A key with an undefined part (a row selected without its version column)
+renders the block uncached rather than sharing it between versions.
+"""
+import threading
+from flask import current_app
+from jinja2 import nodes
+from jinja2.ext import Extension
+from jinja2.runtime import Undefined
+from entities import EntityCache
+
+
+_cache_lock = threading.Lock()
+
+
+def get_fragment_cache(app=None):
+    """The process-wide fragment cache for the current database."""
+    app = app or current_app._get_current_object()
+    database = app.config['DATABASE']
+    current = app.extensions.get('fragment_cache')
+    if current is None or current[0] != database:
+        with _cache_lock:
+            current = app.extensions.get('fragment_cache')
+            if current is None or current[0] != database:
+                # Keys carry versions, so entries never go stale; only the LRU drops them
+                cache = EntityCache(app.config['FRAGMENT_CACHE_MAX_BYTES'], ttl=float('inf'))
+                current = app.extensions['fragment_cache'] = (database, cache)
+    return current[1]
+
+
+class FragmentCacheExtension(Extension):
+    """Adds {% cache key, ... %}...{% endcache %} to the Jinja environment."""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', [nodes.List(key)]),
+                               [], [], body).set_lineno(lineno)
+
+    def _render(self, key, caller):
+        if not current_app.config['FRAGMENT_CACHE'] or any(isinstance(part, Undefined) for part in key):
+            return caller()
+        return get_fragment_cache().get_or_load(tuple(key), caller)
@@ -1,20 +1,92 @@
 import sqlite3
 import os
+import re
 
-def init_db():
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(BASE_DIR, 'schema.sql')
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'migrations')
+
+# migrations/0001_some_name.sql -> (1, 'some_name')
+MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.sql$')
+
+
+def load_migrations():
+    """Return (version, name, path) for every migration file, in order."""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2),
+                               os.path.join(MIGRATIONS_DIR, filename)))
+    return sorted(migrations)
+
+
+def applied_migrations(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    return {row[0] for row in conn.execute('SELECT version FROM schema_migrations')}
+
+
+def migrate(conn):
+    """
+    Apply every migration newer than the database and record its version.
+
+    Each migration runs in its own transaction together with the insert into
+    schema_migrations, so a failed migration leaves nothing behind and an
+    applied one is never run twice. Returns the versions applied.
+    """
+    applied = applied_migrations(conn)
+    newly_applied = []
+
+    for version, name, path in load_migrations():
+        if version in applied:
+            continue
+
+        with open(path, 'r') as f:
+            sql = f.read()
+
+        try:
+            conn.executescript(
+                'BEGIN IMMEDIATE;\n'
+                f'{sql}\n'
+                f"INSERT INTO schema_migrations (version, name) VALUES ({version}, '{name}');\n"
+                'COMMIT;'
+            )
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+
+        newly_applied.append(version)
+
+    return newly_applied
+
+
+def init_db(database='var/greatgames.db'):
     # Ensure var directory exists
-    os.makedirs('var', exist_ok=True)
+    os.makedirs(os.path.dirname(database) or '.', exist_ok=True)
     
     # Connect to database
-    conn = sqlite3.connect('var/greatgames.db')
+    conn = sqlite3.connect(database)
     
-    # Read and execute schema
-    with open('schema.sql', 'r') as f:
+    # Read and execute the base schema (a no-op on an existing database)
+    with open(SCHEMA_PATH, 'r') as f:
         conn.executescript(f.read())
     
     conn.commit()
+
+    # Bring the schema up to date
+    for version in migrate(conn):
+        print(f"Applied migration {version:04d}")
+
     conn.close()
     print("Database initialized successfully!")
 
 if __name__ == '__main__':
-    init_db()
\ No newline at end of file
+    init_db()
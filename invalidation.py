@@ -0,0 +1,163 @@
+"""
+Keeps the in-process caches of every worker coherent.
+
+The response cache, the entity cache and the suggest index live in each
+worker process, but any worker (or a script) can change the database.
+Triggers record every such change in cache_events, in the same transaction
+as the write (migrations/0011_cache_events.sql). Each worker remembers the
+last event it applied and reads the newer ones:
+
+- before a request, at most every INVALIDATION_POLL_INTERVAL seconds, so a
+  worker never serves data more than that long after another one changed it;
+- after each of its own write requests, so the writer sees its change at once.
+
+A poll is a primary key range read on a pooled connection of its own, kept
+out of the request's query count. A worker that falls behind the pruned end
+of the log drops all of its caches instead.
+"""
+import threading
+import time
+from flask import current_app, request
+import cache
+import entities
+from db import READ_METHODS, get_pool
+from modules import suggest
+
+
+def _game(target_id, label):
+    cache.invalidate('index')
+    entities.invalidate_game(target_id)
+
+
+def _game_title(target_id, label):
+    suggest.game_changed(target_id, label)
+
+
+def _game_deleted(target_id, label):
+    _game(target_id, label)
+    suggest.game_removed(target_id)
+
+
+def _reviews(target_id, label):
+    # The landing page lists recent reviews
+    cache.invalidate('index')
+
+
+def _user(target_id, label):
+    entities.invalidate_user(label)
+
+
+def _user_added(target_id, label):
+    suggest.user_added(target_id, label)
+
+
+def _user_deleted(target_id, label):
+    entities.invalidate_user(label)
+    suggest.user_removed(target_id)
+
+
+HANDLERS = {
+    'game': _game,
+    'game_title': _game_title,
+    'game_deleted': _game_deleted,
+    'reviews': _reviews,
+    'user': _user,
+    'user_added': _user_added,
+    'user_deleted': _user_deleted,
+}
+
+
+def _reset():
+    cache.clear()
+    entities.clear()
+    suggest.reset()
+
+
+class InvalidationLog:
+    """A worker's position in cache_events."""
+
+    def __init__(self, last_id):
+        self.last_id = last_id
+        self.polled_at = time.monotonic()
+        self.lock = threading.Lock()
+        self.applied = self.resets = 0
+
+    def poll(self, conn):
+        """Apply the events after last_id. Returns how many there were."""
+        rows = conn.execute(
+            'SELECT id, kind, target_id, label FROM cache_events WHERE id > ? ORDER BY id',
+            (self.last_id,)
+        ).fetchall()
+        self.polled_at = time.monotonic()
+        if not rows:
+            return 0
+        if rows[0][0] != self.last_id + 1:
+            # Pruned before we saw them: no telling what changed
+            _reset()
+            self.resets += 1
+        else:
+            for _, kind, target_id, label in rows:
+                HANDLERS[kind](target_id, label)
+        self.last_id = rows[-1][0]
+        self.applied += len(rows)
+        return len(rows)
+
+    def stats(self):
+        return {'last_id': self.last_id, 'applied': self.applied, 'resets': self.resets}
+
+
+_log_lock = threading.Lock()
+
+
+def _read(pool, query, *args):
+    conn = pool.acquire()
+    try:
+        return query(conn, *args)
+    finally:
+        pool.release(conn)
+
+
+def get_log(app=None):
+    """This worker's position in the log; starts at the end, when no cache holds anything."""
+    app = app or current_app._get_current_object()
+    database = app.config['DATABASE']
+    current = app.extensions.get('invalidation_log')
+    if current is None or current[0] != database:
+        with _log_lock:
+            current = app.extensions.get('invalidation_log')
+            if current is None or current[0] != database:
+                last_id = _read(get_pool('read', app),
+                                lambda conn: conn.execute('SELECT COALESCE(MAX(id), 0) FROM cache_events').fetchone()[0])
+                current = app.extensions['invalidation_log'] = (database, InvalidationLog(last_id))
+    return current[1]
+
+
+def sync(wait=True, conn=None):
+    """
+    Apply the events this worker has not seen, reading them on `conn` (the
+    real connection, not the instrumented one) or a pooled connection of
+    their own. Returns how many there were; with wait=False, None straight
+    away if another thread is already polling.
+    """
+    log = get_log()
+    if not log.lock.acquire(blocking=wait):
+        return None
+    try:
+        if conn is not None:
+            return log.poll(conn)
+        return _read(get_pool('read'), log.poll)
+    finally:
+        log.lock.release()
+
+
+def poll_if_due():
+    """before_request hook."""
+    if time.monotonic() - get_log().polled_at >= current_app.config['INVALIDATION_POLL_INTERVAL']:
+        sync(wait=False)
+
+
+def sync_after_write(response):
+    """after_request hook: a write request applies its own events before it returns."""
+    if request.method not in READ_METHODS:
+        sync()
+    return response
@@ -0,0 +1,37 @@
+-- =========================
+-- Indexes for the queries behind the landing page, home feed, friends
+-- feed, profile shelves, game pages, browse and the admin listings.
+-- =========================
+
+-- Landing page: top rated games, then newest
+CREATE INDEX IF NOT EXISTS idx_games_rating_created ON games(average_rating, created_at);
+
+-- Browse: sort by year, platform filter list; admin: newest games
+CREATE INDEX IF NOT EXISTS idx_games_release_year ON games(release_year);
+CREATE INDEX IF NOT EXISTS idx_games_platform ON games(platform);
+CREATE INDEX IF NOT EXISTS idx_games_created ON games(created_at);
+
+-- Admin: newest users
+CREATE INDEX IF NOT EXISTS idx_users_created ON users(created_at);
+
+-- Home and friends feeds: a followed user's activity, newest first
+CREATE INDEX IF NOT EXISTS idx_activities_user_created ON activities(user_id, created_at);
+
+-- Followers list (the primary key only covers follower_id lookups)
+CREATE INDEX IF NOT EXISTS idx_follows_following ON follows(following_id, follower_id);
+
+-- Profile: a user's latest reviews and review count
+CREATE INDEX IF NOT EXISTS idx_reviews_user_created ON reviews(user_id, created_at);
+
+-- Game page: a game's reviews, newest first (replaces idx_reviews_game)
+CREATE INDEX IF NOT EXISTS idx_reviews_game_created ON reviews(game_id, created_at);
+DROP INDEX IF EXISTS idx_reviews_game;
+
+-- Landing page: latest public reviews
+CREATE INDEX IF NOT EXISTS idx_reviews_public_created ON reviews(is_anonymous, created_at);
+
+-- Profile shelves and home recommendations
+CREATE INDEX IF NOT EXISTS idx_user_games_user_status_added ON user_games(user_id, status, added_at, game_id);
+
+-- Home: the user's recently updated games
+CREATE INDEX IF NOT EXISTS idx_user_games_user_updated ON user_games(user_id, updated_at);
@@ -0,0 +1,125 @@
+-- =========================
+-- Rating aggregates on games, kept current by triggers on reviews so a
+-- review write costs the same no matter how many reviews the game has.
+-- rating_1 .. rating_10 hold the number of reviews with that rating.
+-- =========================
+
+ALTER TABLE games ADD COLUMN rating_sum INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_1 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_2 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_3 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_4 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_5 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_6 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_7 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_8 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_9 INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE games ADD COLUMN rating_10 INTEGER NOT NULL DEFAULT 0;
+
+-- Backfill from the reviews already stored
+UPDATE games SET
+    rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews r WHERE r.game_id = games.id AND r.rating IS NOT NULL),
+    rating_count = (SELECT COUNT(rating) FROM reviews r WHERE r.game_id = games.id),
+    rating_1 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 1),
+    rating_2 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 2),
+    rating_3 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 3),
+    rating_4 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 4),
+    rating_5 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 5),
+    rating_6 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 6),
+    rating_7 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 7),
+    rating_8 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 8),
+    rating_9 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 9),
+    rating_10 = (SELECT COUNT(*) FROM reviews r WHERE r.game_id = games.id AND r.rating = 10);
+
+-- Games without reviews keep their seeded average_rating
+UPDATE games SET average_rating = CAST(rating_sum AS REAL) / rating_count
+WHERE rating_count > 0;
+
+-- In an UPDATE every right-hand side sees the row as it was before the
+-- statement, so average_rating is computed from the new sum and count.
+CREATE TRIGGER IF NOT EXISTS reviews_rating_insert
+AFTER INSERT ON reviews
+WHEN NEW.rating IS NOT NULL
+BEGIN
+    UPDATE games SET
+        rating_sum = rating_sum + NEW.rating,
+        rating_count = rating_count + 1,
+        average_rating = CAST(rating_sum + NEW.rating AS REAL) / (rating_count + 1),
+        rating_1 = rating_1 + (NEW.rating = 1),
+        rating_2 = rating_2 + (NEW.rating = 2),
+        rating_3 = rating_3 + (NEW.rating = 3),
+        rating_4 = rating_4 + (NEW.rating = 4),
+        rating_5 = rating_5 + (NEW.rating = 5),
+        rating_6 = rating_6 + (NEW.rating = 6),
+        rating_7 = rating_7 + (NEW.rating = 7),
+        rating_8 = rating_8 + (NEW.rating = 8),
+        rating_9 = rating_9 + (NEW.rating = 9),
+        rating_10 = rating_10 + (NEW.rating = 10)
+    WHERE id = NEW.game_id;
+END;
+
+-- Also fires for rows removed by ON DELETE CASCADE when a user is deleted
+CREATE TRIGGER IF NOT EXISTS reviews_rating_delete
+AFTER DELETE ON reviews
+WHEN OLD.rating IS NOT NULL
+BEGIN
+    UPDATE games SET
+        rating_sum = rating_sum - OLD.rating,
+        rating_count = rating_count - 1,
+        average_rating = CASE WHEN rating_count > 1
+                              THEN CAST(rating_sum - OLD.rating AS REAL) / (rating_count - 1)
+                              ELSE 0.0 END,
+        rating_1 = rating_1 - (OLD.rating = 1),
+        rating_2 = rating_2 - (OLD.rating = 2),
+        rating_3 = rating_3 - (OLD.rating = 3),
+        rating_4 = rating_4 - (OLD.rating = 4),
+        rating_5 = rating_5 - (OLD.rating = 5),
+        rating_6 = rating_6 - (OLD.rating = 6),
+        rating_7 = rating_7 - (OLD.rating = 7),
+        rating_8 = rating_8 - (OLD.rating = 8),
+        rating_9 = rating_9 - (OLD.rating = 9),
+        rating_10 = rating_10 - (OLD.rating = 10)
+    WHERE id = OLD.game_id;
+END;
+
+-- An edited review is taken out of the old game's totals and added to the
+-- new game's (the same game unless game_id itself changed)
+CREATE TRIGGER IF NOT EXISTS reviews_rating_update
+AFTER UPDATE OF rating, game_id ON reviews
+WHEN OLD.rating IS NOT NEW.rating OR OLD.game_id IS NOT NEW.game_id
+BEGIN
+    UPDATE games SET
+        rating_sum = rating_sum - OLD.rating,
+        rating_count = rating_count - 1,
+        average_rating = CASE WHEN rating_count > 1
+                              THEN CAST(rating_sum - OLD.rating AS REAL) / (rating_count - 1)
+                              ELSE 0.0 END,
+        rating_1 = rating_1 - (OLD.rating = 1),
+        rating_2 = rating_2 - (OLD.rating = 2),
+        rating_3 = rating_3 - (OLD.rating = 3),
+        rating_4 = rating_4 - (OLD.rating = 4),
+        rating_5 = rating_5 - (OLD.rating = 5),
+        rating_6 = rating_6 - (OLD.rating = 6),
+        rating_7 = rating_7 - (OLD.rating = 7),
+        rating_8 = rating_8 - (OLD.rating = 8),
+        rating_9 = rating_9 - (OLD.rating = 9),
+        rating_10 = rating_10 - (OLD.rating = 10)
+    WHERE id = OLD.game_id AND OLD.rating IS NOT NULL;
+
+    UPDATE games SET
+        rating_sum = rating_sum + NEW.rating,
+        rating_count = rating_count + 1,
+        average_rating = CAST(rating_sum + NEW.rating AS REAL) / (rating_count + 1),
+        rating_1 = rating_1 + (NEW.rating = 1),
+        rating_2 = rating_2 + (NEW.rating = 2),
+        rating_3 = rating_3 + (NEW.rating = 3),
+        rating_4 = rating_4 + (NEW.rating = 4),
+        rating_5 = rating_5 + (NEW.rating = 5),
+        rating_6 = rating_6 + (NEW.rating = 6),
+        rating_7 = rating_7 + (NEW.rating = 7),
+        rating_8 = rating_8 + (NEW.rating = 8),
+        rating_9 = rating_9 + (NEW.rating = 9),
+        rating_10 = rating_10 + (NEW.rating = 10)
+    WHERE id = NEW.game_id AND NEW.rating IS NOT NULL;
+END;
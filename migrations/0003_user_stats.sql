@@ -0,0 +1,109 @@
+-- =========================
+-- Per-user counters for the profile, friends and discover pages. One row
+-- per user, kept current by triggers in the same transaction as the write
+-- that changes a count.
+-- =========================
+
+CREATE TABLE IF NOT EXISTS user_stats (
+    user_id INTEGER PRIMARY KEY,
+    game_count INTEGER NOT NULL DEFAULT 0,
+    wishlist_count INTEGER NOT NULL DEFAULT 0,
+    currently_playing_count INTEGER NOT NULL DEFAULT 0,
+    completed_count INTEGER NOT NULL DEFAULT 0,
+    review_count INTEGER NOT NULL DEFAULT 0,
+    follower_count INTEGER NOT NULL DEFAULT 0,
+    following_count INTEGER NOT NULL DEFAULT 0,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Discover: users with the biggest libraries first
+CREATE INDEX IF NOT EXISTS idx_user_stats_game_count ON user_stats(game_count, user_id);
+
+-- Backfill from the existing rows
+INSERT OR IGNORE INTO user_stats (user_id, game_count, wishlist_count, currently_playing_count,
+                                  completed_count, review_count, follower_count, following_count)
+SELECT u.id,
+       (SELECT COUNT(*) FROM user_games WHERE user_id = u.id),
+       (SELECT COUNT(*) FROM user_games WHERE user_id = u.id AND status = 'wishlist'),
+       (SELECT COUNT(*) FROM user_games WHERE user_id = u.id AND status = 'currently_playing'),
+       (SELECT COUNT(*) FROM user_games WHERE user_id = u.id AND status = 'completed'),
+       (SELECT COUNT(*) FROM reviews WHERE user_id = u.id),
+       (SELECT COUNT(*) FROM follows WHERE following_id = u.id),
+       (SELECT COUNT(*) FROM follows WHERE follower_id = u.id)
+FROM users u;
+
+CREATE TRIGGER IF NOT EXISTS users_stats_insert
+AFTER INSERT ON users
+BEGIN
+    INSERT OR IGNORE INTO user_stats (user_id) VALUES (NEW.id);
+END;
+
+-- Shelves
+CREATE TRIGGER IF NOT EXISTS user_games_stats_insert
+AFTER INSERT ON user_games
+BEGIN
+    UPDATE user_stats SET
+        game_count = game_count + 1,
+        wishlist_count = wishlist_count + (NEW.status = 'wishlist'),
+        currently_playing_count = currently_playing_count + (NEW.status = 'currently_playing'),
+        completed_count = completed_count + (NEW.status = 'completed')
+    WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_games_stats_delete
+AFTER DELETE ON user_games
+BEGIN
+    UPDATE user_stats SET
+        game_count = game_count - 1,
+        wishlist_count = wishlist_count - (OLD.status = 'wishlist'),
+        currently_playing_count = currently_playing_count - (OLD.status = 'currently_playing'),
+        completed_count = completed_count - (OLD.status = 'completed')
+    WHERE user_id = OLD.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_games_stats_update
+AFTER UPDATE OF status, user_id ON user_games
+WHEN OLD.status IS NOT NEW.status OR OLD.user_id IS NOT NEW.user_id
+BEGIN
+    UPDATE user_stats SET
+        game_count = game_count - 1,
+        wishlist_count = wishlist_count - (OLD.status = 'wishlist'),
+        currently_playing_count = currently_playing_count - (OLD.status = 'currently_playing'),
+        completed_count = completed_count - (OLD.status = 'completed')
+    WHERE user_id = OLD.user_id;
+
+    UPDATE user_stats SET
+        game_count = game_count + 1,
+        wishlist_count = wishlist_count + (NEW.status = 'wishlist'),
+        currently_playing_count = currently_playing_count + (NEW.status = 'currently_playing'),
+        completed_count = completed_count + (NEW.status = 'completed')
+    WHERE user_id = NEW.user_id;
+END;
+
+-- Reviews
+CREATE TRIGGER IF NOT EXISTS reviews_stats_insert
+AFTER INSERT ON reviews
+BEGIN
+    UPDATE user_stats SET review_count = review_count + 1 WHERE user_id = NEW.user_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_stats_delete
+AFTER DELETE ON reviews
+BEGIN
+    UPDATE user_stats SET review_count = review_count - 1 WHERE user_id = OLD.user_id;
+END;
+
+-- Follows
+CREATE TRIGGER IF NOT EXISTS follows_stats_insert
+AFTER INSERT ON follows
+BEGIN
+    UPDATE user_stats SET following_count = following_count + 1 WHERE user_id = NEW.follower_id;
+    UPDATE user_stats SET follower_count = follower_count + 1 WHERE user_id = NEW.following_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS follows_stats_delete
+AFTER DELETE ON follows
+BEGIN
+    UPDATE user_stats SET following_count = following_count - 1 WHERE user_id = OLD.follower_id;
+    UPDATE user_stats SET follower_count = follower_count - 1 WHERE user_id = OLD.following_id;
+END;
@@ -0,0 +1,34 @@
+-- =========================
+-- Home timelines: one row per (follower, activity) written when the
+-- activity is logged, so reading a feed is a range scan on one user's rows.
+-- Accounts with more followers than TIMELINE_FANOUT_LIMIT are not fanned
+-- out; their activity is merged in when the feed is read (see modules/feed.py).
+-- =========================
+
+CREATE TABLE IF NOT EXISTS timeline (
+    user_id INTEGER NOT NULL,
+    created_at TIMESTAMP NOT NULL,
+    activity_id INTEGER NOT NULL,
+    actor_id INTEGER NOT NULL,
+    PRIMARY KEY (user_id, created_at, activity_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (activity_id) REFERENCES activities(id) ON DELETE CASCADE
+) WITHOUT ROWID;
+
+-- Unfollow: drop one followed user's rows from a timeline
+CREATE INDEX IF NOT EXISTS idx_timeline_user_actor ON timeline(user_id, actor_id);
+
+-- ON DELETE CASCADE from activities
+CREATE INDEX IF NOT EXISTS idx_timeline_activity ON timeline(activity_id);
+
+-- Backfill every follower with the 100 most recent activities of each user
+-- they follow (the same depth as TIMELINE_BACKFILL)
+INSERT OR IGNORE INTO timeline (user_id, created_at, activity_id, actor_id)
+SELECT f.follower_id, recent.created_at, recent.id, recent.user_id
+FROM follows f
+JOIN (
+    SELECT id, user_id, created_at,
+           ROW_NUMBER() OVER (PARTITION BY user_id ORDER BY created_at DESC, id DESC) AS position
+    FROM activities
+) recent ON recent.user_id = f.following_id
+WHERE recent.position <= 100;
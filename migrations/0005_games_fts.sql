@@ -0,0 +1,40 @@
+-- =========================
+-- Full-text search over games (browse and admin search). External-content
+-- FTS5 table: the text stays in games, games_fts only holds the index.
+-- unicode61 with remove_diacritics folds case and accents ("Pokémon"
+-- matches "pokemon"); the prefix indexes serve short "hol*" queries.
+-- =========================
+
+CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5(
+    title, developer, publisher, genre, platform, description,
+    content='games',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2',
+    prefix='2 3'
+);
+
+INSERT INTO games_fts (games_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS games_fts_insert
+AFTER INSERT ON games
+BEGIN
+    INSERT INTO games_fts (rowid, title, developer, publisher, genre, platform, description)
+    VALUES (NEW.id, NEW.title, NEW.developer, NEW.publisher, NEW.genre, NEW.platform, NEW.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_fts_delete
+AFTER DELETE ON games
+BEGIN
+    INSERT INTO games_fts (games_fts, rowid, title, developer, publisher, genre, platform, description)
+    VALUES ('delete', OLD.id, OLD.title, OLD.developer, OLD.publisher, OLD.genre, OLD.platform, OLD.description);
+END;
+
+-- Only the indexed columns: rating updates from reviews must not reindex
+CREATE TRIGGER IF NOT EXISTS games_fts_update
+AFTER UPDATE OF title, developer, publisher, genre, platform, description ON games
+BEGIN
+    INSERT INTO games_fts (games_fts, rowid, title, developer, publisher, genre, platform, description)
+    VALUES ('delete', OLD.id, OLD.title, OLD.developer, OLD.publisher, OLD.genre, OLD.platform, OLD.description);
+    INSERT INTO games_fts (rowid, title, developer, publisher, genre, platform, description)
+    VALUES (NEW.id, NEW.title, NEW.developer, NEW.publisher, NEW.genre, NEW.platform, NEW.description);
+END;
@@ -0,0 +1,42 @@
+-- =========================
+-- User search (discover friends, admin user management).
+-- Queries of three or more characters match anywhere in username, name or
+-- email through a trigram FTS5 index; shorter ones are prefix matches on
+-- the case-insensitive indexes below.
+-- =========================
+
+CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+    username, name, email,
+    content='users',
+    content_rowid='id',
+    tokenize='trigram'
+);
+
+INSERT INTO users_fts (users_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS users_fts_insert
+AFTER INSERT ON users
+BEGIN
+    INSERT INTO users_fts (rowid, username, name, email)
+    VALUES (NEW.id, NEW.username, NEW.name, NEW.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_delete
+AFTER DELETE ON users
+BEGIN
+    INSERT INTO users_fts (users_fts, rowid, username, name, email)
+    VALUES ('delete', OLD.id, OLD.username, OLD.name, OLD.email);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_fts_update
+AFTER UPDATE OF username, name, email ON users
+BEGIN
+    INSERT INTO users_fts (users_fts, rowid, username, name, email)
+    VALUES ('delete', OLD.id, OLD.username, OLD.name, OLD.email);
+    INSERT INTO users_fts (rowid, username, name, email)
+    VALUES (NEW.id, NEW.username, NEW.name, NEW.email);
+END;
+
+CREATE INDEX IF NOT EXISTS idx_users_username_nocase ON users(username COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_users_name_nocase ON users(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_users_email_nocase ON users(email COLLATE NOCASE);
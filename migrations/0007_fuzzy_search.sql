@@ -0,0 +1,37 @@
+-- =========================
+-- Trigram index over game titles for typo-tolerant search (modules/fuzzy.py).
+-- detail='none' keeps only which titles contain each trigram, which is all
+-- candidate generation needs. games_title_vocab exposes how many titles
+-- contain each trigram, so very common trigrams can be skipped.
+-- =========================
+
+CREATE VIRTUAL TABLE IF NOT EXISTS games_title_trigrams USING fts5(
+    title,
+    content='games',
+    content_rowid='id',
+    tokenize='trigram',
+    detail='none'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS games_title_vocab USING fts5vocab(games_title_trigrams, 'row');
+
+INSERT INTO games_title_trigrams (games_title_trigrams) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS games_title_trigrams_insert
+AFTER INSERT ON games
+BEGIN
+    INSERT INTO games_title_trigrams (rowid, title) VALUES (NEW.id, NEW.title);
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_title_trigrams_delete
+AFTER DELETE ON games
+BEGIN
+    INSERT INTO games_title_trigrams (games_title_trigrams, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_title_trigrams_update
+AFTER UPDATE OF title ON games
+BEGIN
+    INSERT INTO games_title_trigrams (games_title_trigrams, rowid, title) VALUES ('delete', OLD.id, OLD.title);
+    INSERT INTO games_title_trigrams (rowid, title) VALUES (NEW.id, NEW.title);
+END;
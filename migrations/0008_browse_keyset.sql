@@ -0,0 +1,13 @@
+-- =========================
+-- Keyset pagination for /browse (modules/games.py). Every sort mode is read
+-- as (sort key, id) from an index, so any page starts with an index seek.
+-- Unrated games and games without a year sort as 0, as they did before
+-- (NULLs last in descending order), without NULLs in the key.
+-- Title order uses idx_games_title, which already ends in the rowid.
+-- =========================
+
+CREATE INDEX IF NOT EXISTS idx_games_rating_keyset ON games(IFNULL(average_rating, 0), id);
+CREATE INDEX IF NOT EXISTS idx_games_year_keyset ON games(IFNULL(release_year, 0), id);
+
+-- Only browse sorted by year used it
+DROP INDEX IF EXISTS idx_games_release_year;
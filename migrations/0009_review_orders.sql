@@ -0,0 +1,11 @@
+-- =========================
+-- Review orders on the game page (modules/reviews.py). Each is read as
+-- (sort key, id) within one game; newest uses idx_reviews_game_created,
+-- which already ends in the rowid.
+-- =========================
+
+-- Most helpful
+CREATE INDEX IF NOT EXISTS idx_reviews_game_helpful ON reviews(game_id, helpful_count, id);
+
+-- Highest and lowest rated (the same index read in either direction)
+CREATE INDEX IF NOT EXISTS idx_reviews_game_rating ON reviews(game_id, rating, id);
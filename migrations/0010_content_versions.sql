@@ -0,0 +1,160 @@
+-- =========================
+-- Version stamps for conditional GETs (see etags.py). games and users
+-- carry their own version; everything a page shows that lives in other
+-- tables is summarized by a counter in content_versions, bumped by triggers
+-- in the same transaction as the write:
+--   games               any game inserted, edited, re-rated or deleted
+--   reviews:game:<id>   reviews of a game added, edited or removed
+--   reviews:user:<id>   reviews written by a user
+--   shelves:user:<id>   a user's wishlist / playing / completed lists
+--   activity:user:<id>  a user's own activity
+--   follows:user:<id>   follows from or to a user
+-- =========================
+
+ALTER TABLE games ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE games ADD COLUMN updated_at TIMESTAMP;
+UPDATE games SET updated_at = created_at;
+
+ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE users ADD COLUMN updated_at TIMESTAMP;
+UPDATE users SET updated_at = created_at;
+
+CREATE TABLE IF NOT EXISTS content_versions (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+) WITHOUT ROWID;
+
+-- Rows are created on first bump; a missing row reads as version 0
+
+-- The WHEN clause skips the trigger's own UPDATE, and updates that already
+-- set a new version. Rating aggregate updates from reviews count as edits.
+CREATE TRIGGER IF NOT EXISTS games_version_update
+AFTER UPDATE ON games
+WHEN NEW.version = OLD.version
+BEGIN
+    UPDATE games SET version = OLD.version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+    INSERT INTO content_versions (key, version) VALUES ('games', 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_version_insert
+AFTER INSERT ON games
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('games', 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_version_delete
+AFTER DELETE ON games
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('games', 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+-- Tags are shown on the game page only
+CREATE TRIGGER IF NOT EXISTS game_tags_version_insert
+AFTER INSERT ON game_tags
+BEGIN
+    UPDATE games SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.game_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS game_tags_version_delete
+AFTER DELETE ON game_tags
+BEGIN
+    UPDATE games SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = OLD.game_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_version_update
+AFTER UPDATE ON users
+WHEN NEW.version = OLD.version
+BEGIN
+    UPDATE users SET version = OLD.version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+-- Also fires for rows removed by ON DELETE CASCADE
+CREATE TRIGGER IF NOT EXISTS reviews_version_insert
+AFTER INSERT ON reviews
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('reviews:game:' || NEW.game_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+    INSERT INTO content_versions (key, version) VALUES ('reviews:user:' || NEW.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_version_delete
+AFTER DELETE ON reviews
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('reviews:game:' || OLD.game_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+    INSERT INTO content_versions (key, version) VALUES ('reviews:user:' || OLD.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+-- OLD and NEW ids are the same unless the review was moved
+CREATE TRIGGER IF NOT EXISTS reviews_version_update
+AFTER UPDATE ON reviews
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('reviews:game:' || OLD.game_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+    INSERT INTO content_versions (key, version) VALUES ('reviews:user:' || OLD.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+    INSERT INTO content_versions (key, version) VALUES ('reviews:game:' || NEW.game_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+    INSERT INTO content_versions (key, version) VALUES ('reviews:user:' || NEW.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_games_version_insert
+AFTER INSERT ON user_games
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('shelves:user:' || NEW.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_games_version_delete
+AFTER DELETE ON user_games
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('shelves:user:' || OLD.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS user_games_version_update
+AFTER UPDATE ON user_games
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('shelves:user:' || OLD.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+    INSERT INTO content_versions (key, version) VALUES ('shelves:user:' || NEW.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS activities_version_insert
+AFTER INSERT ON activities
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('activity:user:' || NEW.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS activities_version_delete
+AFTER DELETE ON activities
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('activity:user:' || OLD.user_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS follows_version_insert
+AFTER INSERT ON follows
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('follows:user:' || NEW.follower_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+    INSERT INTO content_versions (key, version) VALUES ('follows:user:' || NEW.following_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS follows_version_delete
+AFTER DELETE ON follows
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('follows:user:' || OLD.follower_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+    INSERT INTO content_versions (key, version) VALUES ('follows:user:' || OLD.following_id, 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
@@ -0,0 +1,109 @@
+-- =========================
+-- Invalidation log shared by all worker processes (see invalidation.py).
+-- Triggers append a row in the same transaction as every write that can
+-- change something the in-process caches hold; each worker applies the
+-- rows it has not seen yet.
+--   game           game added or changed (target = id, label = title)
+--   game_title     game added or renamed
+--   game_deleted
+--   reviews        a game's reviews changed (target = game id)
+--   user           profile or role changed (label = username)
+--   user_added / user_deleted
+-- =========================
+
+CREATE TABLE IF NOT EXISTS cache_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    target_id INTEGER,
+    label TEXT
+);
+
+-- Keep about the last 10000 events; a worker that falls further behind
+-- notices the gap and drops all of its caches
+CREATE TRIGGER IF NOT EXISTS cache_events_prune
+AFTER INSERT ON cache_events
+WHEN NEW.id % 1000 = 0
+BEGIN
+    DELETE FROM cache_events WHERE id <= NEW.id - 10000;
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_cache_insert
+AFTER INSERT ON games
+BEGIN
+    INSERT INTO cache_events (kind, target_id, label) VALUES ('game', NEW.id, NEW.title);
+    INSERT INTO cache_events (kind, target_id, label) VALUES ('game_title', NEW.id, NEW.title);
+END;
+
+-- Skips the version bump done by games_version_update (0010)
+CREATE TRIGGER IF NOT EXISTS games_cache_update
+AFTER UPDATE ON games
+WHEN NEW.version = OLD.version
+BEGIN
+    INSERT INTO cache_events (kind, target_id, label) VALUES ('game', NEW.id, NEW.title);
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_cache_title
+AFTER UPDATE OF title ON games
+WHEN NEW.title IS NOT OLD.title
+BEGIN
+    INSERT INTO cache_events (kind, target_id, label) VALUES ('game_title', NEW.id, NEW.title);
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_cache_delete
+AFTER DELETE ON games
+BEGIN
+    INSERT INTO cache_events (kind, target_id, label) VALUES ('game_deleted', OLD.id, OLD.title);
+END;
+
+CREATE TRIGGER IF NOT EXISTS game_tags_cache_insert
+AFTER INSERT ON game_tags
+BEGIN
+    INSERT INTO cache_events (kind, target_id) VALUES ('game', NEW.game_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS game_tags_cache_delete
+AFTER DELETE ON game_tags
+BEGIN
+    INSERT INTO cache_events (kind, target_id) VALUES ('game', OLD.game_id);
+END;
+
+-- Also fires for rows removed by ON DELETE CASCADE
+CREATE TRIGGER IF NOT EXISTS reviews_cache_insert
+AFTER INSERT ON reviews
+BEGIN
+    INSERT INTO cache_events (kind, target_id) VALUES ('reviews', NEW.game_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_cache_delete
+AFTER DELETE ON reviews
+BEGIN
+    INSERT INTO cache_events (kind, target_id) VALUES ('reviews', OLD.game_id);
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_cache_update
+AFTER UPDATE ON reviews
+BEGIN
+    INSERT INTO cache_events (kind, target_id) VALUES ('reviews', OLD.game_id);
+    INSERT INTO cache_events (kind, target_id)
+    SELECT 'reviews', NEW.game_id WHERE NEW.game_id IS NOT OLD.game_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_cache_insert
+AFTER INSERT ON users
+BEGIN
+    INSERT INTO cache_events (kind, target_id, label) VALUES ('user_added', NEW.id, NEW.username);
+END;
+
+-- Skips the version bump done by users_version_update (0010)
+CREATE TRIGGER IF NOT EXISTS users_cache_update
+AFTER UPDATE ON users
+WHEN NEW.version = OLD.version
+BEGIN
+    INSERT INTO cache_events (kind, target_id, label) VALUES ('user', NEW.id, OLD.username);
+END;
+
+CREATE TRIGGER IF NOT EXISTS users_cache_delete
+AFTER DELETE ON users
+BEGIN
+    INSERT INTO cache_events (kind, target_id, label) VALUES ('user_deleted', OLD.id, OLD.username);
+END;
@@ -0,0 +1,27 @@
+-- =========================
+-- One more dependency counter for route_cache.py:
+--   reviews   any review added, edited or removed (the landing page lists
+--             the latest ones)
+-- =========================
+
+-- Also fires for rows removed by ON DELETE CASCADE
+CREATE TRIGGER IF NOT EXISTS reviews_all_version_insert
+AFTER INSERT ON reviews
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('reviews', 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_all_version_delete
+AFTER DELETE ON reviews
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('reviews', 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS reviews_all_version_update
+AFTER UPDATE ON reviews
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('reviews', 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
@@ -0,0 +1,11 @@
+-- =========================
+-- Review orders without NULLs in the key (modules/reviews.py). Unrated
+-- reviews and reviews never voted on sort as 0, where NULLs sorted before,
+-- and their cursors no longer carry a null the pager cannot decode.
+-- =========================
+
+DROP INDEX IF EXISTS idx_reviews_game_helpful;
+CREATE INDEX IF NOT EXISTS idx_reviews_game_helpful ON reviews(game_id, IFNULL(helpful_count, 0), id);
+
+DROP INDEX IF EXISTS idx_reviews_game_rating;
+CREATE INDEX IF NOT EXISTS idx_reviews_game_rating ON reviews(game_id, IFNULL(rating, 0), id);
@@ -0,0 +1,34 @@
+-- =========================
+-- The catalog-wide 'games' counter (route_cache.py) only moves when a game
+-- changes in a way browse and profile cards can show or be searched on.
+-- Every review with a rating updates the aggregates of its game, which
+-- bumped it and dropped every cached browse and profile page; now only a
+-- change of average_rating does. The game's own version still moves on any
+-- update, since its page shows the rating breakdown.
+-- =========================
+
+DROP TRIGGER IF EXISTS games_version_update;
+
+CREATE TRIGGER IF NOT EXISTS games_version_update
+AFTER UPDATE ON games
+WHEN NEW.version = OLD.version
+BEGIN
+    UPDATE games SET version = OLD.version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS games_catalog_version_update
+AFTER UPDATE OF title, developer, publisher, release_year, platform, genre, description,
+                cover_image_url, average_rating ON games
+WHEN NEW.title IS NOT OLD.title
+  OR NEW.developer IS NOT OLD.developer
+  OR NEW.publisher IS NOT OLD.publisher
+  OR NEW.release_year IS NOT OLD.release_year
+  OR NEW.platform IS NOT OLD.platform
+  OR NEW.genre IS NOT OLD.genre
+  OR NEW.description IS NOT OLD.description
+  OR NEW.cover_image_url IS NOT OLD.cover_image_url
+  OR NEW.average_rating IS NOT OLD.average_rating
+BEGIN
+    INSERT INTO content_versions (key, version) VALUES ('games', 1)
+    ON CONFLICT (key) DO UPDATE SET version = version + 1;
+END;
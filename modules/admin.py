@@ -1,6 +1,18 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+import csv
+import datetime
+import io
+import json
+from flask import (Blueprint, Response, render_template, request, redirect, url_for, flash, session,
+                   stream_with_context)
 from modules.auth import admin_required
-from db import get_db
+from db import get_db, pool_stats, query_stats
+from modules.search import RANK, match_expression, user_match_filter
+import cache
+import entities
+import fragments
+import invalidation
+import route_cache
+from pagination import InvalidCursor, decode_key, encode_key, keyset_page, page_window
 
 
 admin_bp = Blueprint('admin', __name__)
@@ -41,32 +53,214 @@ def dashboard():
         'admin.html',
         stats=stats,
         recent_users=recent_users,
-        recent_games=recent_games
+        recent_games=recent_games,
+        pool=pool_stats()
     )
 
 # =========================
-# GAME MANAGEMENT
+# PERFORMANCE
 # =========================
 
-@admin_bp.route('/admin/games')
+@admin_bp.route('/admin/perf')
 @admin_required
-def manage_games():
-    db = get_db()
+def perf():
+    return render_template(
+        'admin_perf.html',
+        statements=query_stats.top(50),
+        entity_cache=entities.get_entity_cache().stats(),
+        response_cache=cache.get_cache().stats(),
+        value_cache=cache.get_value_cache().stats(),
+        fragment_cache=fragments.get_fragment_cache().stats(),
+        route_cache=route_cache.get_route_cache().stats(),
+        invalidations=invalidation.get_log().stats()
+    )
+
+
+@admin_bp.route('/admin/perf/reset', methods=['POST'])
+@admin_required
+def reset_perf():
+    query_stats.reset()
+    flash('Query statistics cleared.', 'success')
+    return redirect(url_for('admin.perf'))
+
+# =========================
+# LISTINGS AND EXPORTS
+# =========================
+
+# Rows per page in the admin tables
+PAGE_SIZE = 50
+
+# Rows fetched per step while streaming an export
+EXPORT_BATCH = 500
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# sort -> (label, sort key expression, direction); ties are broken by id
+GAME_SORTS = {
+    'relevance': ('Relevance', RANK, 'ASC'),
+    'newest': ('Newest', 'games.created_at', 'DESC'),
+    'title': ('Title', 'games.title', 'ASC'),
+    'rating': ('Rating', 'IFNULL(games.average_rating, 0)', 'DESC'),
+}
+
+USER_SORTS = {
+    'newest': ('Newest', 'users.created_at', 'DESC'),
+    'username': ('Username', 'users.username', 'ASC'),
+}
+
+
+def _game_filters():
+    """FROM ... WHERE clause, its parameters, the FTS match and the filters to keep in links."""
+    q = request.args.get('q', '').strip()
+    genre = request.args.get('genre', '').strip()
+    platform = request.args.get('platform', '').strip()
+
+    match = match_expression(q)
+    if match:
+        source = 'FROM games_fts JOIN games ON games.id = games_fts.rowid WHERE games_fts MATCH ?'
+        params = [match]
+    else:
+        # A search with no words in it matches nothing
+        source = 'FROM games WHERE 0' if q else 'FROM games WHERE 1=1'
+        params = []
+    if genre:
+        source += ' AND games.genre = ?'
+        params.append(genre)
+    if platform:
+        source += ' AND games.platform = ?'
+        params.append(platform)
+    return source, params, match, dict(q=q or None, genre=genre or None, platform=platform or None)
+
+
+def _user_filters():
+    """WHERE clause on `users`, its parameters and the filters to keep in links."""
     q = request.args.get('q', '').strip()
+    role = request.args.get('role', '')
 
-    sql = 'SELECT * FROM games'
+    where = 'WHERE 1=1'
     params = []
-
     if q:
-        sql += ' WHERE title LIKE ? OR genre LIKE ? OR platform LIKE ?'
-        like = f'%{q}%'
-        params.extend([like, like, like])
-
-    sql += ' ORDER BY created_at DESC'
+        condition, params = user_match_filter(q, ('username', 'name', 'email'), alias='users')
+        where += ' AND ' + condition
+    if role in ('admin', 'user'):
+        where += ' AND users.is_admin = ?'
+        params.append(1 if role == 'admin' else 0)
+    else:
+        role = ''
+    return where, params, dict(q=q or None, role=role or None)
+
+
+def _listing_page(db, select, params, sort, sort_by, id_expression, endpoint, filters):
+    """
+    One page of an admin table: (rows, previous page URL, next page URL).
+    `select` has a {key} placeholder for the sort key. The page starts at
+    the ?after= or ?before= cursor, which must belong to `sort_by`.
+    """
+    _, expression, direction = sort
+    cursor = request.args.get('after') or request.args.get('before')
+    backwards = bool(cursor) and not request.args.get('after')
+    position = None
+    if cursor:
+        cursor_sort, key, last_id = decode_key(cursor, 3)
+        if cursor_sort != sort_by:
+            raise InvalidCursor(cursor)
+        position = (key, last_id)
+
+    rows = keyset_page(db, select.format(key=expression), params, (expression, id_expression, direction),
+                       position, PAGE_SIZE + 1, backwards)
+    rows, has_prev, has_next = page_window(rows, PAGE_SIZE, position, backwards)
+    prev_url = next_url = None
+    if has_prev:
+        prev_url = url_for(endpoint, before=encode_key((sort_by, rows[0]['sort_key'], rows[0]['id'])), **filters)
+    if has_next:
+        next_url = url_for(endpoint, after=encode_key((sort_by, rows[-1]['sort_key'], rows[-1]['id'])), **filters)
+    return rows, prev_url, next_url
+
+
+def _export_response(cursor, fmt, name):
+    """
+    Stream the rows of an executed statement as CSV or JSON lines. Rows are
+    fetched EXPORT_BATCH at a time and written out as they come, so memory
+    stays flat however large the table is.
+    """
+    if fmt not in EXPORT_FORMATS:
+        cursor.close()
+        flash('Unknown export format.', 'danger')
+        return redirect(url_for(f'admin.manage_{name}'))
+
+    columns = [column[0] for column in cursor.description]
+
+    def generate():
+        try:
+            if fmt == 'csv':
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerow(columns)
+                yield buffer.getvalue()
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH)
+                if not rows:
+                    break
+                if fmt == 'csv':
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows(rows)
+                    yield buffer.getvalue()
+                else:
+                    yield ''.join(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+        finally:
+            cursor.close()
+
+    filename = f'{name}-{datetime.date.today().isoformat()}.{fmt}'
+    return Response(stream_with_context(generate()), mimetype=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
 
-    games = db.execute(sql, params).fetchall()
+# =========================
+# GAME MANAGEMENT
+# =========================
 
-    return render_template('admin_manage_games.html', games=games, query=q)
+@admin_bp.route('/admin/games')
+@admin_required
+def manage_games():
+    db = get_db()
+    source, params, match, filters = _game_filters()
+    sort_by = request.args.get('sort', 'relevance' if match else 'newest')
+    if sort_by not in GAME_SORTS or (sort_by == 'relevance' and not match):
+        sort_by = 'newest'
+    filters['sort'] = sort_by
+
+    try:
+        games, prev_url, next_url = _listing_page(
+            db, f'SELECT games.*, {{key}} AS sort_key {source}', params,
+            GAME_SORTS[sort_by], sort_by, 'games.id', 'admin.manage_games', filters)
+    except InvalidCursor:
+        flash('That page link is no longer valid.', 'warning')
+        return redirect(url_for('admin.manage_games', **filters))
+
+    genres = db.execute('SELECT DISTINCT genre FROM games WHERE genre IS NOT NULL ORDER BY genre').fetchall()
+    platforms = db.execute('SELECT DISTINCT platform FROM games WHERE platform IS NOT NULL ORDER BY platform').fetchall()
+
+    return render_template('admin_manage_games.html', games=games, query=filters['q'] or '',
+                           genre=filters['genre'] or '', platform=filters['platform'] or '',
+                           genres=genres, platforms=platforms, sort=sort_by, sorts=GAME_SORTS,
+                           prev_url=prev_url, next_url=next_url)
+
+
+@admin_bp.route('/admin/games/export')
+@admin_required
+def export_games():
+    source, params, _, filters = _game_filters()
+    cursor = get_db().execute(f'''
+        SELECT games.id, games.title, games.developer, games.publisher, games.release_year,
+               games.platform, games.genre, games.average_rating, games.rating_count,
+               games.cover_image_url, games.description, games.created_at
+        {source}
+        ORDER BY games.id
+    ''', params)
+    return _export_response(cursor, request.args.get('format', 'csv'), 'games')
 
 
 @admin_bp.route('/admin/game/add', methods=['GET', 'POST'])
@@ -153,21 +347,38 @@ def delete_game(game_id):
 @admin_required
 def manage_users():
     db = get_db()
-    q = request.args.get('q', '').strip()
-
-    sql = 'SELECT id, username, email, name, is_admin, created_at FROM users'
-    params = []
-
-    if q:
-        sql += ' WHERE username LIKE ? OR email LIKE ? OR (name IS NOT NULL AND name LIKE ?)'
-        like = f'%{q}%'
-        params.extend([like, like, like])
-
-    sql += ' ORDER BY created_at DESC'
-
-    users = db.execute(sql, params).fetchall()
-
-    return render_template('admin_manage_users.html', users=users, query=q)
+    where, params, filters = _user_filters()
+    sort_by = request.args.get('sort', 'newest')
+    if sort_by not in USER_SORTS:
+        sort_by = 'newest'
+    filters['sort'] = sort_by
+
+    try:
+        users, prev_url, next_url = _listing_page(
+            db, f'SELECT users.id, username, email, name, is_admin, created_at, {{key}} AS sort_key FROM users {where}',
+            params, USER_SORTS[sort_by], sort_by, 'users.id', 'admin.manage_users', filters)
+    except InvalidCursor:
+        flash('That page link is no longer valid.', 'warning')
+        return redirect(url_for('admin.manage_users', **filters))
+
+    return render_template('admin_manage_users.html', users=users, query=filters['q'] or '',
+                           role=filters['role'] or '', sort=sort_by, sorts=USER_SORTS,
+                           prev_url=prev_url, next_url=next_url)
+
+
+@admin_bp.route('/admin/users/export')
+@admin_required
+def export_users():
+    where, params, _ = _user_filters()
+    cursor = get_db().execute(f'''
+        SELECT users.id, users.username, users.email, users.name, users.is_admin, users.created_at,
+               s.game_count, s.review_count, s.follower_count, s.following_count
+        FROM users
+        LEFT JOIN user_stats s ON s.user_id = users.id
+        {where}
+        ORDER BY users.id
+    ''', params)
+    return _export_response(cursor, request.args.get('format', 'csv'), 'users')
 
 
 @admin_bp.route('/admin/user/<int:user_id>/toggle_admin', methods=['POST'])
@@ -0,0 +1,158 @@
+from functools import wraps
+from flask import Blueprint, current_app, jsonify, render_template, request, session, url_for
+from modules import feed, reviews, shelves, suggest
+from db import get_db, query_budget
+import entities
+from pagination import InvalidCursor, decode_cursor, paginate
+
+api_bp = Blueprint('api', __name__, url_prefix='/api')
+
+
+def _activity_json(row):
+    return {
+        'id': row['id'],
+        'username': row['username'],
+        'profile_url': url_for('users.profile', username=row['username']),
+        'description': row['description'],
+        'game_id': row['game_id'],
+        'title': row['title'],
+        'game_url': url_for('games.game_detail', game_id=row['game_id']) if row['game_id'] else None,
+        'cover_image_url': row['cover_image_url'],
+        'created_at': row['created_at'],
+    }
+
+
+def _page_response(rows, endpoint, **values):
+    page, cursor = paginate(rows, feed.PAGE_SIZE)
+    return jsonify(
+        items=[_activity_json(row) for row in page],
+        html=''.join(render_template('_activity_card.html', activity=row) for row in page),
+        next=url_for(endpoint, before=cursor, **values) if cursor else None,
+    )
+
+
+def _before():
+    return decode_cursor(request.args.get('before'))
+
+
+def api_login_required(f):
+    """Like auth.login_required, but answers a logged-out fetch with 401 JSON."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify(error='Login required.'), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@api_bp.errorhandler(InvalidCursor)
+def invalid_cursor(error):
+    return jsonify(error='Invalid cursor.'), 400
+
+
+@api_bp.route('/suggest')
+def suggestions():
+    """Typeahead for the nav search box: games and users matching a prefix."""
+    q = request.args.get('q', '').strip()
+    limit = current_app.config['SUGGEST_LIMIT']
+    items = []
+    for kind, item_id, label in suggest.get_index().search(q, limit):
+        if kind == 'game':
+            url = url_for('games.game_detail', game_id=item_id)
+        else:
+            url = url_for('users.profile', username=label)
+        items.append({'type': kind, 'id': item_id, 'label': label, 'url': url})
+    # complete: fewer than the limit, so these are all the matches, and the
+    # client can answer longer prefixes from them
+    return jsonify(query=q, items=items, complete=len(items) < limit)
+
+
+@api_bp.route('/feed')
+@api_login_required
+@query_budget(1)
+def activity_feed():
+    """
+    Activity from the users you follow, newest first, one page at a time,
+    as data and as the cards the feed appends.
+    """
+    rows = feed.read_timeline(get_db(), session['user_id'], feed.PAGE_SIZE + 1, before=_before())
+    return _page_response(rows, 'api.activity_feed')
+
+
+@api_bp.route('/users/<username>/activity')
+@query_budget(2)
+def user_activity(username):
+    """A user's own activity, newest first, one page at a time, as data and as cards."""
+    db = get_db()
+    user = entities.user(db, username)
+    if not user:
+        return jsonify(error='User not found.'), 404
+
+    rows = feed.read_user_activity(db, user['id'], feed.PAGE_SIZE + 1, before=_before())
+    return _page_response(rows, 'api.user_activity', username=username)
+
+
+@api_bp.route('/users/<username>/shelves/<status>')
+@query_budget(3)
+def user_shelf(username, status):
+    """
+    A page of one of a user's shelves. Without a cursor `html` is the whole
+    shelf as the profile shows it (an unopened tab); after one it is the
+    game cards to append.
+    """
+    if status not in shelves.SHELVES:
+        return jsonify(error='Unknown shelf.'), 404
+    db = get_db()
+    user = entities.user(db, username)
+    if not user:
+        return jsonify(error='User not found.'), 404
+
+    after = request.args.get('after')
+    page, cursor = shelves.read_page(db, user['id'], status, after)
+    next_url = url_for('api.user_shelf', username=username, status=status, after=cursor) if cursor else None
+    if after:
+        html = ''.join(render_template('_game_card.html', game=row) for row in page)
+    else:
+        html = render_template('_shelf.html', shelf_games=page, shelf_next=next_url,
+                               empty_text=shelves.EMPTY_TEXT[status])
+    return jsonify(
+        items=[{
+            'id': row['id'],
+            'title': row['title'],
+            'url': url_for('games.game_detail', game_id=row['id']),
+            'cover_image_url': row['cover_image_url'],
+            'added_at': row['added_at'],
+        } for row in page],
+        html=html,
+        next=next_url,
+    )
+
+
+@api_bp.route('/games/<int:game_id>/reviews')
+@query_budget(3)
+def game_reviews(game_id):
+    """
+    A page of a game's reviews after the `after` cursor, as data and as the
+    HTML the game page appends.
+    """
+    db = get_db()
+    if not entities.game(db, game_id):
+        return jsonify(error='Game not found.'), 404
+
+    order = request.args.get('order', 'newest')
+    if order not in reviews.ORDERS:
+        return jsonify(error='Unknown order.'), 400
+
+    page, cursor = reviews.read_page(db, game_id, order, request.args.get('after'))
+    return jsonify(
+        items=[{
+            'id': row['id'],
+            'username': None if row['is_anonymous'] else row['username'],
+            'rating': row['rating'],
+            'review_text': row['review_text'],
+            'helpful_count': row['helpful_count'],
+            'created_at': row['created_at'],
+        } for row in page],
+        html=''.join(render_template('_review.html', review=row) for row in page),
+        next=url_for('api.game_reviews', game_id=game_id, order=order, after=cursor) if cursor else None,
+    )
@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from werkzeug.security import generate_password_hash, check_password_hash
 from functools import wraps
 import sqlite3
+from db import read_only
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -65,6 +66,7 @@ def register():
     return render_template('register.html')
 
 @auth_bp.route('/login', methods=['GET', 'POST'])
+@read_only
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -0,0 +1,109 @@
+"""
+Fan-out-on-write home timelines.
+
+When an activity is logged it is copied into the timeline of every follower
+of its author, so a feed is read with one range scan on
+timeline(user_id, created_at). Authors with more than TIMELINE_FANOUT_LIMIT
+followers are skipped on write; followers pick up their recent activity at
+read time instead, which keeps one write from turning into 100k inserts.
+"""
+from flask import current_app
+from pagination import FIRST_PAGE
+
+# Activities per feed page, in the HTML views and in /api
+PAGE_SIZE = 20
+
+
+def _fanout_limit():
+    return current_app.config['TIMELINE_FANOUT_LIMIT']
+
+
+def fan_out(db, activity_id):
+    """Copy a new activity into its author's followers' timelines."""
+    db.execute('''
+        INSERT OR IGNORE INTO timeline (user_id, created_at, activity_id, actor_id)
+        SELECT f.follower_id, a.created_at, a.id, a.user_id
+        FROM activities a
+        JOIN follows f ON f.following_id = a.user_id
+        JOIN user_stats s ON s.user_id = a.user_id
+        WHERE a.id = ? AND s.follower_count <= ?
+    ''', (activity_id, _fanout_limit()))
+
+
+def backfill(db, follower_id, following_id):
+    """Give a new follower the followed user's most recent activity."""
+    db.execute('''
+        INSERT OR IGNORE INTO timeline (user_id, created_at, activity_id, actor_id)
+        SELECT ?, a.created_at, a.id, a.user_id
+        FROM activities a
+        JOIN user_stats s ON s.user_id = a.user_id
+        WHERE a.user_id = ? AND s.follower_count <= ?
+        ORDER BY a.created_at DESC, a.id DESC
+        LIMIT ?
+    ''', (follower_id, following_id, _fanout_limit(),
+          current_app.config['TIMELINE_BACKFILL']))
+
+
+def prune(db, follower_id, following_id):
+    """Remove an unfollowed user's activity from a timeline."""
+    db.execute(
+        'DELETE FROM timeline WHERE user_id = ? AND actor_id = ?',
+        (follower_id, following_id)
+    )
+
+
+def read_timeline(db, user_id, limit, before=FIRST_PAGE):
+    """
+    Newest activity from the users `user_id` follows that sorts before the
+    (created_at, id) key `before`, with the author's username and the
+    game's title and cover.
+
+    The fanned-out rows and the recent activity of each followed account over
+    the fan-out limit are each read with LIMIT, so only a few pages of
+    candidates are sorted however long the histories are. UNION drops the
+    duplicates left when an account crossed the limit after fanning out.
+    """
+    return db.execute('''
+        WITH candidates AS (
+            SELECT * FROM (
+                SELECT activity_id AS id, created_at
+                FROM timeline
+                WHERE user_id = :user_id
+                  AND (created_at, activity_id) < (:before_created_at, :before_id)
+                ORDER BY created_at DESC, activity_id DESC
+                LIMIT :limit
+            )
+            UNION
+            SELECT a.id, a.created_at
+            FROM follows f
+            JOIN user_stats s ON s.user_id = f.following_id
+            JOIN activities a ON a.id IN (
+                SELECT id FROM activities
+                WHERE user_id = f.following_id
+                  AND (created_at, id) < (:before_created_at, :before_id)
+                ORDER BY created_at DESC, id DESC
+                LIMIT :limit
+            )
+            WHERE f.follower_id = :user_id AND s.follower_count > :fanout_limit
+        )
+        SELECT a.*, u.username, g.title, g.cover_image_url, g.version AS game_version
+        FROM (SELECT * FROM candidates ORDER BY created_at DESC, id DESC LIMIT :limit) c
+        JOIN activities a ON a.id = c.id
+        JOIN users u ON a.user_id = u.id
+        LEFT JOIN games g ON a.game_id = g.id
+        ORDER BY c.created_at DESC, c.id DESC
+    ''', {'user_id': user_id, 'limit': limit, 'fanout_limit': _fanout_limit(),
+          'before_created_at': before[0], 'before_id': before[1]}).fetchall()
+
+
+def read_user_activity(db, user_id, limit, before=FIRST_PAGE):
+    """One user's own activity before the (created_at, id) key `before`."""
+    return db.execute('''
+        SELECT a.*, u.username, g.title, g.cover_image_url, g.version AS game_version
+        FROM activities a
+        JOIN users u ON a.user_id = u.id
+        LEFT JOIN games g ON a.game_id = g.id
+        WHERE a.user_id = ? AND (a.created_at, a.id) < (?, ?)
+        ORDER BY a.created_at DESC, a.id DESC
+        LIMIT ?
+    ''', (user_id, before[0], before[1], limit)).fetchall()
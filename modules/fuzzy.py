@@ -0,0 +1,117 @@
+"""
+Typo-tolerant game search ("Witchr 3", "Hollow Night").
+
+Candidates come from the trigram index games_title_trigrams
+(migrations/0007_fuzzy_search.sql): the query's trigrams are looked up in
+the index vocabulary, and at most FUZZY_MAX_TRIGRAMS of the rarest are used,
+skipping any that occur in more than FUZZY_MAX_DF titles. Titles sharing the
+most of those trigrams become candidates, at most FUZZY_CANDIDATES of them.
+The work is therefore bounded by FUZZY_MAX_TRIGRAMS * FUZZY_MAX_DF postings
+however large the catalog is.
+Candidates are then reranked by word-level edit distance to the query.
+"""
+import re
+from flask import current_app
+
+WORD = re.compile(r'\w+', re.UNICODE)
+
+# Shorter queries have too few trigrams to say anything useful
+MIN_QUERY_LENGTH = 3
+
+
+def trigrams(text):
+    """The trigrams the index stores for `text` (every 3-character window)."""
+    text = ' '.join(text.lower().split())
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def levenshtein(a, b):
+    """Edit distance between two strings (insert, delete, substitute)."""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def distance(query, title):
+    """
+    Mean over the query's words of the edit distance to the closest word in
+    the title, relative to the query word's length. 0.0 means every query
+    word appears in the title.
+    """
+    query_words = WORD.findall(query.lower())
+    title_words = WORD.findall(title.lower())
+    if not query_words or not title_words:
+        return 1.0
+    total = 0.0
+    for word in query_words:
+        total += min(levenshtein(word, other) for other in title_words) / len(word)
+    return total / len(query_words)
+
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+def candidates(db, query, conditions=(), params=()):
+    """
+    Games sharing the most rare trigrams with `query`, with a `shared`
+    column, limited to FUZZY_CANDIDATES. `conditions` are extra SQL filters
+    on games aliased as `games`.
+    """
+    config = current_app.config
+    grams = sorted(trigrams(query))
+    if not grams:
+        return []
+
+    placeholders = ', '.join('?' for _ in grams)
+    df = dict(db.execute(
+        f'SELECT term, doc FROM games_title_vocab WHERE term IN ({placeholders})', grams
+    ).fetchall())
+    usable = sorted((g for g in grams if 0 < df.get(g, 0) <= config['FUZZY_MAX_DF']),
+                    key=lambda g: (df[g], g))[:config['FUZZY_MAX_TRIGRAMS']]
+    if not usable:
+        return []
+
+    postings = ' UNION ALL '.join(
+        'SELECT rowid FROM games_title_trigrams WHERE games_title_trigrams MATCH ?' for _ in usable
+    )
+    # Filters are applied before the LIMIT so they cannot empty the candidates
+    filtered = ''
+    if conditions:
+        filtered = 'JOIN games ON games.id = p.rowid WHERE ' + ' AND '.join(conditions)
+    return db.execute(f'''
+        SELECT games.*, c.shared
+        FROM (
+            SELECT p.rowid AS id, COUNT(*) AS shared
+            FROM ({postings}) p
+            {filtered}
+            GROUP BY p.rowid
+            ORDER BY shared DESC
+            LIMIT ?
+        ) c
+        JOIN games ON games.id = c.id
+    ''', [_quote(g) for g in usable] + list(params) + [config['FUZZY_CANDIDATES']]).fetchall()
+
+
+def rerank(query, rows):
+    """Rows within FUZZY_MAX_DISTANCE of `query`, closest first."""
+    max_distance = current_app.config['FUZZY_MAX_DISTANCE']
+    scored = []
+    for row in rows:
+        score = distance(query, row['title'])
+        if score <= max_distance:
+            scored.append((score, -row['shared'], len(row['title']), row['id'], row))
+    scored.sort(key=lambda item: item[:4])
+    return [item[-1] for item in scored]
+
+
+def search(db, query, conditions=(), params=()):
+    return rerank(query, candidates(db, query, conditions, params))
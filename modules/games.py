@@ -1,39 +1,40 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session
+from flask import Blueprint, current_app, render_template, request, redirect, url_for, flash, session
 from modules.auth import login_required
 from app import get_db, log_activity
+from db import query_budget
+import entities
+from cache import cached_value
+from route_cache import cached_route, dependency_version
+from modules.search import RANK, match_expression
+from modules import fuzzy
+from modules import reviews as review_pages
+from pagination import InvalidCursor, decode_key, encode_key, keyset_page, page_window
 
 
 games_bp = Blueprint('games', __name__)
 
+
 @games_bp.route('/game/<int:game_id>')
+@query_budget(6)
+@cached_route('games:{game_id}', 'reviews:game:{game_id}', 'shelves:user:{viewer}', 'reviews:user:{viewer}')
 def game_detail(game_id):
     db = get_db()
     
     # Get game details
-    game = db.execute(
-        'SELECT * FROM games WHERE id = ?', (game_id,)
-    ).fetchone()
+    game = entities.game(db, game_id)
     
     if not game:
         flash('Game not found.', 'danger')
         return redirect(url_for('games.browse'))
     
-    # Get reviews
-    reviews = db.execute('''
-        SELECT r.*, u.username, u.name 
-        FROM reviews r
-        JOIN users u ON r.user_id = u.id
-        WHERE r.game_id = ?
-        ORDER BY r.created_at DESC
-    ''', (game_id,)).fetchall()
+    # First page of reviews; the rest are loaded from /api as you scroll
+    review_order = request.args.get('reviews', 'newest')
+    if review_order not in review_pages.ORDERS:
+        review_order = 'newest'
+    reviews, reviews_cursor = review_pages.read_page(db, game_id, review_order)
     
     # Get tags
-    tags = db.execute('''
-        SELECT t.name 
-        FROM tags t
-        JOIN game_tags gt ON t.id = gt.tag_id
-        WHERE gt.game_id = ?
-    ''', (game_id,)).fetchall()
+    tags = entities.game_tags(db, game_id)
     
     # Check user's status with this game
     user_game_status = None
@@ -50,10 +51,19 @@ def game_detail(game_id):
             (session['user_id'], game_id)
         ).fetchone()
     
+    # Rating distribution from the per-rating counters on games
+    histogram = [(rating, game[f'rating_{rating}']) for rating in range(10, 0, -1)]
+    histogram_max = max(count for _, count in histogram)
+    
     return render_template('game.html', 
                          game=game, 
                          reviews=reviews, 
+                         review_orders=review_pages.ORDERS,
+                         review_order=review_order,
+                         reviews_cursor=reviews_cursor,
                          tags=tags,
+                         histogram=histogram,
+                         histogram_max=histogram_max,
                          user_game_status=user_game_status,
                          user_review=user_review)
 
@@ -134,17 +144,9 @@ def add_review(game_id):
             VALUES (?, ?, ?, ?, ?)
         ''', (session['user_id'], game_id, rating, review_text, is_anonymous))
     
-    # Update average rating
-    avg_rating = db.execute(
-        'SELECT AVG(rating) as avg FROM reviews WHERE game_id = ?',
-        (game_id,)
-    ).fetchone()['avg']
-    
-    db.execute(
-        'UPDATE games SET average_rating = ? WHERE id = ?',
-        (avg_rating, game_id)
-    )
-    
+    # average_rating and the histogram are kept by the reviews_rating_*
+    # triggers (migrations/0002_rating_aggregates.sql); cached copies of the
+    # game and the pages showing it are dropped through invalidation.py
     db.commit()
     
         # Log review activity
@@ -158,7 +160,44 @@ def add_review(game_id):
     flash('Review submitted successfully!', 'success')
     return redirect(url_for('games.game_detail', game_id=game_id))
 
+# Games per browse page
+PAGE_SIZE = 24
+
+# Browse sort modes: sort key expression and direction. Ties are broken by
+# games.id in the same direction; the keys match the indexes from
+# migrations/0008_browse_keyset.sql (relevance only applies to a search).
+SORT_KEYS = {
+    'relevance': (RANK, 'ASC'),
+    'title': ('games.title', 'ASC'),
+    'rating': ('IFNULL(games.average_rating, 0)', 'DESC'),
+    'year': ('IFNULL(games.release_year, 0)', 'DESC'),
+}
+
+# What a game card needs, rather than games.* with the description
+CARD_COLUMNS = 'games.id, games.title, games.genre, games.cover_image_url, games.average_rating, games.version'
+
+
+def _read_page(db, source, params, sort_by, after=None, backwards=False):
+    expression, direction = SORT_KEYS[sort_by]
+    select = f'SELECT {CARD_COLUMNS}, {expression} AS sort_key {source}'
+    return keyset_page(db, select, params, (expression, 'games.id', direction),
+                       after, PAGE_SIZE + 1, backwards)
+
+
+def _page_key(sort_by, row):
+    return encode_key((sort_by, row['sort_key'], row['id']))
+
+
+def _facets(db):
+    """The genres and platforms offered as browse filters."""
+    genres = db.execute('SELECT DISTINCT genre FROM games WHERE genre IS NOT NULL').fetchall()
+    platforms = db.execute('SELECT DISTINCT platform FROM games WHERE platform IS NOT NULL').fetchall()
+    return genres, platforms
+
+
 @games_bp.route('/browse')
+@query_budget(6)  # 4, 5 past the first page, 6 when falling back to the fuzzy search
+@cached_route('games')  # cards show titles, covers and ratings
 def browse():
     db = get_db()
     
@@ -166,37 +205,78 @@ def browse():
     query = request.args.get('q', '').strip()
     genre = request.args.get('genre', '').strip()
     platform = request.args.get('platform', '').strip()
-    sort_by = request.args.get('sort', 'title')  # title, rating, year
-    
-    # Build SQL query
-    sql = 'SELECT * FROM games WHERE 1=1'
-    params = []
+    fuzzy_mode = request.args.get('fuzzy') == '1'
+    match = None if fuzzy_mode else match_expression(query)
+    # relevance (only with a search), title, rating, year
+    sort_by = request.args.get('sort', 'relevance' if match else 'title')
+    if sort_by not in SORT_KEYS or (sort_by == 'relevance' and not match):
+        sort_by = 'title'
+    filters = dict(q=query or None, genre=genre or None, platform=platform or None, sort=sort_by)
     
-    if query:
-        sql += ' AND title LIKE ?'
-        params.append(f'%{query}%')
+    # Page cursors: ?after=<last card of the previous page> or
+    # ?before=<first card of the next page>, each (sort mode, sort key, id)
+    cursor = request.args.get('after') or request.args.get('before')
+    backwards = not request.args.get('after') and bool(cursor)
+    position = None
+    if cursor:
+        try:
+            cursor_sort, key, last_id = decode_key(cursor, 3)
+        except InvalidCursor:
+            cursor_sort = None
+        if cursor_sort != sort_by:
+            flash('That page link is no longer valid.', 'warning')
+            return redirect(url_for('games.browse', **filters))
+        position = (key, last_id)
     
+    # Filters shared by the exact and the fuzzy search
+    conditions = []
+    filter_params = []
     if genre:
-        sql += ' AND genre LIKE ?'
-        params.append(f'%{genre}%')
+        conditions.append('games.genre LIKE ?')
+        filter_params.append(f'%{genre}%')
     
     if platform:
-        sql += ' AND platform LIKE ?'
-        params.append(f'%{platform}%')
-    
-    # Sorting
-    if sort_by == 'rating':
-        sql += ' ORDER BY average_rating DESC'
-    elif sort_by == 'year':
-        sql += ' ORDER BY release_year DESC'
-    else:
-        sql += ' ORDER BY title ASC'
+        conditions.append('games.platform LIKE ?')
+        filter_params.append(f'%{platform}%')
     
-    games = db.execute(sql, params).fetchall()
+    games = []
+    prev_url = next_url = None
+    # A search with no words in it (q=!!!) matches nothing, not the whole catalog
+    if not fuzzy_mode and (match or not query):
+        # A search goes through the full-text index
+        if match:
+            source = 'FROM games_fts JOIN games ON games.id = games_fts.rowid WHERE games_fts MATCH ?'
+            params = [match]
+        else:
+            source = 'FROM games WHERE 1=1'
+            params = []
+        
+        for condition in conditions:
+            source += f' AND {condition}'
+        params += filter_params
+        
+        rows = _read_page(db, source, params, sort_by, position, backwards)
+        games, has_prev, has_next = page_window(rows, PAGE_SIZE, position, backwards)
+        if has_next:
+            next_url = url_for('games.browse', after=_page_key(sort_by, games[-1]), **filters)
+        if has_prev:
+            prev_url = url_for('games.browse', before=_page_key(sort_by, games[0]), **filters)
+    
+    # Nothing matched exactly (or ?fuzzy=1): look for misspellings. The
+    # closest matches fit on one page.
+    fuzzy_results = False
+    if query and not games and not position and len(query) >= fuzzy.MIN_QUERY_LENGTH:
+        games = fuzzy.search(db, query, conditions, filter_params)[:PAGE_SIZE]
+        fuzzy_results = True
     
     # Get all unique genres and platforms for filters
-    genres = db.execute('SELECT DISTINCT genre FROM games WHERE genre IS NOT NULL').fetchall()
-    platforms = db.execute('SELECT DISTINCT platform FROM games WHERE platform IS NOT NULL').fetchall()
+    # Kept per catalog version, like the page itself
+    version = dependency_version('games')
+    if version is None:
+        genres, platforms = _facets(db)
+    else:
+        genres, platforms = cached_value(('browse:facets', version), lambda: _facets(db),
+                                         current_app.config['BROWSE_FACETS_TTL'])
     
     return render_template('browse.html', 
                          games=games, 
@@ -205,4 +285,7 @@ def browse():
                          current_query=query,
                          current_genre=genre,
                          current_platform=platform,
-                         current_sort=sort_by)
\ No newline at end of file
+                         current_sort=sort_by,
+                         fuzzy_results=fuzzy_results,
+                         prev_url=prev_url,
+                         next_url=next_url)
@@ -0,0 +1,48 @@
+"""
+Game page reviews, one page at a time.
+
+The game page renders the first page; later pages come from
+/api/games/<id>/reviews as an HTML fragment plus the cursor of the next
+page. Every order is a keyset over (sort key, id) backed by an index on
+reviews(game_id, sort key, id), see migrations/0009_review_orders.sql and
+0013_review_order_nulls.sql. Missing ratings and counts sort as 0.
+"""
+from pagination import InvalidCursor, decode_key, encode_key, keyset_page
+
+# Reviews per page, on the game page and in /api
+PAGE_SIZE = 10
+
+# order -> (label, sort key, direction); ties are broken by id the same way
+ORDERS = {
+    'newest': ('Newest', 'r.created_at', 'DESC'),
+    'helpful': ('Most helpful', 'IFNULL(r.helpful_count, 0)', 'DESC'),
+    'highest': ('Highest rated', 'IFNULL(r.rating, 0)', 'DESC'),
+    'lowest': ('Lowest rated', 'IFNULL(r.rating, 0)', 'ASC'),
+}
+
+
+def read_page(db, game_id, order='newest', cursor=None):
+    """
+    (reviews, next cursor) for a page of a game's reviews in `order`,
+    starting after `cursor`. Raises InvalidCursor for a cursor that is
+    malformed or belongs to another order.
+    """
+    after = None
+    if cursor:
+        cursor_order, key, last_id = decode_key(cursor, 3)
+        if cursor_order != order:
+            raise InvalidCursor(cursor)
+        after = (key, last_id)
+
+    _, expression, direction = ORDERS[order]
+    rows = keyset_page(db, f'''
+        SELECT r.*, u.username, {expression} AS sort_key
+        FROM reviews r
+        JOIN users u ON r.user_id = u.id
+        WHERE r.game_id = ?
+    ''', [game_id], (expression, 'r.id', direction), after, PAGE_SIZE + 1)
+
+    page = rows[:PAGE_SIZE]
+    if len(rows) <= PAGE_SIZE:
+        return page, None
+    return page, encode_key((order, page[-1]['sort_key'], page[-1]['id']))
@@ -0,0 +1,69 @@
+"""
+Full-text game search on the games_fts index (migrations/0005_games_fts.sql).
+"""
+import re
+from itertools import product
+
+# Words as the unicode61 tokenizer sees them
+WORD = re.compile(r'\w+', re.UNICODE)
+
+# bm25() weights per games_fts column: title, developer, publisher, genre,
+# platform, description. A title hit outranks a description hit.
+BM25_WEIGHTS = (10.0, 2.0, 2.0, 3.0, 3.0, 1.0)
+RANK = 'bm25(games_fts, {})'.format(', '.join(str(w) for w in BM25_WEIGHTS))
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 MATCH expression: every word must match, as a
+    prefix, so "hollow kni" finds "Hollow Knight". Words are quoted so FTS5
+    syntax in user input (AND, NEAR, column:, quotes) is taken literally.
+    Returns None when the query has no words.
+    """
+    words = WORD.findall(query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+# Shortest query the trigram index (users_fts) can answer
+TRIGRAM_MIN = 3
+
+
+def user_match_filter(query, columns, alias='u'):
+    """
+    SQL condition and parameters selecting the users whose `columns` contain
+    `query`, case-insensitively. Three or more characters match anywhere
+    through users_fts; shorter queries match as a prefix on the NOCASE
+    indexes from migrations/0006_user_search.sql, or with LIKE when they
+    have letters outside ASCII, which NOCASE does not fold.
+    """
+    if len(query) >= TRIGRAM_MIN:
+        phrase = '"' + query.replace('"', '""') + '"'
+        return (f'{alias}.id IN (SELECT rowid FROM users_fts WHERE users_fts MATCH ?)',
+                [f'{{{" ".join(columns)}}} : {phrase}'])
+
+    if query.isascii():
+        # Every string starting with the prefix sorts in [prefix, upper) under
+        # NOCASE, which compares ASCII letters as lower case
+        prefix = query.lower()
+        after = chr(ord(prefix[-1]) + 1)
+        if 'A' <= after <= 'Z':
+            # After '@' comes 'A', which NOCASE reads as 'a': take the next
+            # character that sorts as itself
+            after = chr(ord('Z') + 1)
+        upper = prefix[:-1] + after
+        clauses = ' OR '.join(
+            f'({alias}.{column} COLLATE NOCASE >= ? AND {alias}.{column} COLLATE NOCASE < ?)'
+            for column in columns
+        )
+        return f'({clauses})', [bound for _ in columns for bound in (prefix, upper)]
+
+    # NOCASE and LIKE only fold ASCII, so other letters are tried in each case
+    pattern = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    cases = ({c} if c.isascii() else {c.lower(), c.upper()} for c in pattern)
+    variants = sorted({''.join(chars) for chars in product(*cases)})
+    clauses = ' OR '.join(
+        f"{alias}.{column} LIKE ? ESCAPE '\\'" for column in columns for _ in variants
+    )
+    return f'({clauses})', [variant for _ in columns for variant in variants]
@@ -0,0 +1,52 @@
+"""
+Profile shelves (currently playing, wishlist, completed), one page at a time.
+
+The profile renders the first page of one shelf; the other shelves and
+further pages come from /api/users/<username>/shelves/<status> as HTML
+fragments. Pages are keysets over (added_at, game_id) on
+idx_user_games_user_status_added, and shelf sizes come from user_stats, so a
+profile costs the same with 5 or 5,000 games on it.
+"""
+from pagination import InvalidCursor, decode_key, encode_key, keyset_page
+
+# Games per shelf page
+PAGE_SIZE = 12
+
+# status -> heading, in the order the shelves are shown
+SHELVES = {
+    'currently_playing': 'Currently Playing',
+    'wishlist': 'Wishlist',
+    'completed': 'Completed',
+}
+
+EMPTY_TEXT = {
+    'currently_playing': 'No games currently being played.',
+    'wishlist': 'No games on wishlist.',
+    'completed': 'No completed games yet.',
+}
+
+
+def read_page(db, user_id, status, cursor=None):
+    """
+    (games, next cursor) for a page of one of a user's shelves, most recently
+    added first, starting after `cursor`. Raises InvalidCursor for a cursor
+    that is malformed or belongs to another shelf.
+    """
+    after = None
+    if cursor:
+        cursor_status, added_at, game_id = decode_key(cursor, 3)
+        if cursor_status != status:
+            raise InvalidCursor(cursor)
+        after = (added_at, game_id)
+
+    rows = keyset_page(db, '''
+        SELECT g.id, g.title, g.genre, g.cover_image_url, g.average_rating, g.version, ug.added_at
+        FROM user_games ug
+        JOIN games g ON g.id = ug.game_id
+        WHERE ug.user_id = ? AND ug.status = ?
+    ''', [user_id, status], ('ug.added_at', 'ug.game_id', 'DESC'), after, PAGE_SIZE + 1)
+
+    page = rows[:PAGE_SIZE]
+    if len(rows) <= PAGE_SIZE:
+        return page, None
+    return page, encode_key((status, page[-1]['added_at'], page[-1]['id']))
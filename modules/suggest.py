@@ -0,0 +1,169 @@
+"""
+In-memory prefix index behind the nav search typeahead (/api/suggest).
+
+Game titles and usernames are kept in one sorted list of normalized keys, so
+a prefix lookup is a bisect plus a walk over the matching range. Every word
+of a title gets its own key ("Hollow Knight" is found by "hol" and "kni").
+The index is loaded from the database on first use, once per process; game
+edits and new or deleted accounts, in any worker, update it in place through
+invalidation.py instead of reloading it.
+"""
+import bisect
+import heapq
+import threading
+import unicodedata
+from flask import current_app
+from db import get_db
+
+
+def normalize(text):
+    """Casefold and strip accents, so "Pokémon" and "pokemon" share a key."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def _keys(label):
+    words = normalize(label).split()
+    return {' '.join(words[i:]) for i in range(len(words))}
+
+
+class PrefixIndex:
+    """
+    Sorted (key, kind, id) entries plus the label and weight of each item.
+
+    Writers build a new (entries, items) pair and swap it in with one
+    assignment under a lock, so readers never see a list that is being
+    modified, or the entries of one version with the items of another, and
+    do not need to lock.
+    """
+
+    def __init__(self):
+        self._data = ([], {})  # (sorted entries, {(kind, id): (label, weight)})
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data[1])
+
+    def load(self, items):
+        """Replace the contents with (kind, id, label, weight) tuples."""
+        entries = []
+        labels = {}
+        for kind, item_id, label, weight in items:
+            labels[(kind, item_id)] = (label, weight)
+            entries.extend((key, kind, item_id) for key in _keys(label))
+        entries.sort()
+        with self._lock:
+            self._data = (entries, labels)
+
+    def add(self, kind, item_id, label, weight=None):
+        """Add an item, or replace it (keeping its weight unless given)."""
+        with self._lock:
+            entries, items = self._without(kind, item_id)
+            if weight is None:
+                weight = items.get((kind, item_id), (None, 0))[1]
+            for key in _keys(label):
+                bisect.insort(entries, (key, kind, item_id))
+            items[(kind, item_id)] = (label, weight)
+            self._data = (entries, items)
+
+    def remove(self, kind, item_id):
+        with self._lock:
+            entries, items = self._without(kind, item_id)
+            items.pop((kind, item_id), None)
+            self._data = (entries, items)
+
+    def _without(self, kind, item_id):
+        """Copies of the entries, without this item's keys, and of the items."""
+        entries, items = list(self._data[0]), dict(self._data[1])
+        current = items.get((kind, item_id))
+        if current:
+            for key in _keys(current[0]):
+                i = bisect.bisect_left(entries, (key, kind, item_id))
+                if i < len(entries) and entries[i] == (key, kind, item_id):
+                    del entries[i]
+        return entries, items
+
+    def search(self, prefix, limit):
+        """The `limit` heaviest items with a key starting with `prefix`."""
+        prefix = normalize(prefix).strip()
+        if not prefix:
+            return []
+        entries, items = self._data
+        matches = set()
+        i = bisect.bisect_left(entries, (prefix,))
+        while i < len(entries) and entries[i][0].startswith(prefix):
+            matches.add(entries[i][1:])
+            i += 1
+        best = heapq.nlargest(limit, matches, key=lambda item: (items[item][1], -item[1]))
+        return [(kind, item_id, items[(kind, item_id)][0]) for kind, item_id in best]
+
+
+def _load(index):
+    db = get_db()
+    games = db.execute('SELECT id, title, rating_count FROM games').fetchall()
+    users = db.execute('''
+        SELECT u.id, u.username, COALESCE(s.follower_count, 0) AS follower_count
+        FROM users u
+        LEFT JOIN user_stats s ON s.user_id = u.id
+    ''').fetchall()
+    index.load(
+        [('game', row['id'], row['title'], row['rating_count']) for row in games]
+        + [('user', row['id'], row['username'], row['follower_count']) for row in users]
+    )
+
+
+_load_lock = threading.Lock()
+
+
+def get_index(app=None):
+    """The process-wide index for the current database, loaded on first use."""
+    app = app or current_app._get_current_object()
+    database = app.config['DATABASE']
+    current = app.extensions.get('suggest_index')
+    if current is None or current[0] != database:
+        with _load_lock:
+            current = app.extensions.get('suggest_index')
+            if current is None or current[0] != database:
+                index = PrefixIndex()
+                _load(index)
+                current = app.extensions['suggest_index'] = (database, index)
+    return current[1]
+
+
+def reset(app=None):
+    """Forget the index; the next search reloads it from the database."""
+    app = app or current_app._get_current_object()
+    with _load_lock:
+        app.extensions.pop('suggest_index', None)
+
+
+def _loaded_index():
+    # Nothing to update until the index is loaded; loading reads the change
+    current = current_app.extensions.get('suggest_index')
+    if current is not None and current[0] == current_app.config['DATABASE']:
+        return current[1]
+    return None
+
+
+def game_changed(game_id, title):
+    index = _loaded_index()
+    if index is not None:
+        index.add('game', game_id, title)
+
+
+def game_removed(game_id):
+    index = _loaded_index()
+    if index is not None:
+        index.remove('game', game_id)
+
+
+def user_added(user_id, username):
+    index = _loaded_index()
+    if index is not None:
+        index.add('user', user_id, username)
+
+
+def user_removed(user_id):
+    index = _loaded_index()
+    if index is not None:
+        index.remove('user', user_id)
@@ -1,6 +1,12 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, session, current_app
 from modules.auth import login_required
 from app import get_db
+from db import query_budget
+import entities
+from route_cache import cached_route
+from modules import feed, shelves
+from pagination import paginate
+from modules.search import user_match_filter
 import os
 from werkzeug.utils import secure_filename
 
@@ -11,44 +17,33 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 def allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def _profile_user(db, username):
+    user = entities.user(db, username)
+    return {'user_id': user['id']} if user else None
+
+
 @users_bp.route('/profile/<username>')
+@query_budget(7)  # 6 once the user is in the entity cache
+# Cards, reviews and activity show game titles, covers and ratings, so
+# catalog changes count too (see migrations/0014_catalog_version_columns.sql)
+@cached_route('users:{user_id}', 'reviews:user:{user_id}', 'shelves:user:{user_id}',
+              'activity:user:{user_id}', 'follows:user:{user_id}', 'games', resolve=_profile_user)
 def profile(username):
     db = get_db()
     
-    # Get user
-    user = db.execute(
-        'SELECT * FROM users WHERE username = ?', (username,)
-    ).fetchone()
+    # Get user together with their counters (see migrations/0003_user_stats.sql)
+    user = db.execute('''
+        SELECT u.*, s.game_count, s.wishlist_count, s.currently_playing_count,
+               s.completed_count, s.review_count, s.follower_count, s.following_count
+        FROM users u
+        LEFT JOIN user_stats s ON s.user_id = u.id
+        WHERE u.username = ?
+    ''', (username,)).fetchone()
     
     if not user:
         flash('User not found.', 'danger')
         return redirect(url_for('index'))
     
-    # Get users games by status
-    wishlist = db.execute('''
-        SELECT g.*, ug.added_at 
-        FROM games g
-        JOIN user_games ug ON g.id = ug.game_id
-        WHERE ug.user_id = ? AND ug.status = 'wishlist'
-        ORDER BY ug.added_at DESC
-    ''', (user['id'],)).fetchall()
-    
-    currently_playing = db.execute('''
-        SELECT g.*, ug.added_at 
-        FROM games g
-        JOIN user_games ug ON g.id = ug.game_id
-        WHERE ug.user_id = ? AND ug.status = 'currently_playing'
-        ORDER BY ug.added_at DESC
-    ''', (user['id'],)).fetchall()
-    
-    completed = db.execute('''
-        SELECT g.*, ug.added_at 
-        FROM games g
-        JOIN user_games ug ON g.id = ug.game_id
-        WHERE ug.user_id = ? AND ug.status = 'completed'
-        ORDER BY ug.added_at DESC
-    ''', (user['id'],)).fetchall()
-    
     # Get user's reviews
     reviews = db.execute('''
         SELECT r.*, g.title, g.cover_image_url
@@ -61,14 +56,29 @@ def profile(username):
     
     # Statistics
     stats = {
-        'total_games': len(wishlist) + len(currently_playing) + len(completed),
-        'completed': len(completed),
-        'wishlist': len(wishlist),
-        'currently_playing': len(currently_playing),
-        'reviews': db.execute('SELECT COUNT(*) as count FROM reviews WHERE user_id = ?', 
-                            (user['id'],)).fetchone()['count']
+        'total_games': user['game_count'] or 0,
+        'completed': user['completed_count'] or 0,
+        'wishlist': user['wishlist_count'] or 0,
+        'currently_playing': user['currently_playing_count'] or 0,
+        'reviews': user['review_count'] or 0,
+        'followers': user['follower_count'] or 0,
+        'following': user['following_count'] or 0,
     }
     
+    # One shelf is rendered (?shelf=, else the first non-empty one); the
+    # others and further pages are loaded from /api when opened
+    shelf = request.args.get('shelf')
+    if shelf not in shelves.SHELVES:
+        shelf = next((status for status in shelves.SHELVES if stats[status]), 'currently_playing')
+    shelf_games, shelf_cursor = shelves.read_page(db, user['id'], shelf)
+    shelf_next = None
+    if shelf_cursor:
+        shelf_next = url_for('api.user_shelf', username=user['username'], status=shelf, after=shelf_cursor)
+    
+    # First page of the user's own activity; further pages come from /api
+    activity, activity_cursor = paginate(
+        feed.read_user_activity(db, user['id'], feed.PAGE_SIZE + 1), feed.PAGE_SIZE)
+    
     # Check if current user follows this profile
     is_following = False
     if 'user_id' in session and session['user_id'] != user['id']:
@@ -80,11 +90,15 @@ def profile(username):
     
     return render_template('profile.html',
                          profile_user=user,
-                         wishlist=wishlist,
-                         currently_playing=currently_playing,
-                         completed=completed,
+                         shelves=shelves.SHELVES,
+                         shelf=shelf,
+                         shelf_games=shelf_games,
+                         shelf_next=shelf_next,
+                         empty_text=shelves.EMPTY_TEXT[shelf],
                          reviews=reviews,
                          stats=stats,
+                         activity=activity,
+                         activity_cursor=activity_cursor,
                          is_following=is_following)
 
 @users_bp.route('/profile/edit', methods=['GET', 'POST'])
@@ -147,9 +161,7 @@ def edit_profile():
 def follow_user(username):
     db = get_db()
     
-    user_to_follow = db.execute(
-        'SELECT id FROM users WHERE username = ?', (username,)
-    ).fetchone()
+    user_to_follow = entities.user(db, username)
     
     if not user_to_follow:
         flash('User not found.', 'danger')
@@ -171,6 +183,7 @@ def follow_user(username):
             'DELETE FROM follows WHERE follower_id = ? AND following_id = ?',
             (session['user_id'], user_to_follow['id'])
         )
+        feed.prune(db, session['user_id'], user_to_follow['id'])
         flash(f'Unfollowed {username}.', 'info')
     else:
         # Follow
@@ -178,6 +191,7 @@ def follow_user(username):
             'INSERT INTO follows (follower_id, following_id) VALUES (?, ?)',
             (session['user_id'], user_to_follow['id'])
         )
+        feed.backfill(db, session['user_id'], user_to_follow['id'])
         flash(f'Now following {username}!', 'success')
     
     db.commit()
@@ -185,39 +199,31 @@ def follow_user(username):
 
 @users_bp.route('/friends')
 @login_required
+@query_budget(3)
 def friends():
     db = get_db()
     
     # Get users you follow
     following = db.execute('''
-        SELECT u.*, 
-               (SELECT COUNT(*) FROM user_games WHERE user_id = u.id) as game_count
+        SELECT u.*, COALESCE(s.game_count, 0) AS game_count
         FROM users u
         JOIN follows f ON u.id = f.following_id
+        LEFT JOIN user_stats s ON s.user_id = u.id
         WHERE f.follower_id = ?
     ''', (session['user_id'],)).fetchall()
     
     # Get your followers
     followers = db.execute('''
-        SELECT u.*,
-               (SELECT COUNT(*) FROM user_games WHERE user_id = u.id) as game_count
+        SELECT u.*, COALESCE(s.game_count, 0) AS game_count
         FROM users u
         JOIN follows f ON u.id = f.follower_id
+        LEFT JOIN user_stats s ON s.user_id = u.id
         WHERE f.following_id = ?
     ''', (session['user_id'],)).fetchall()
     
     # Get recent activity from people you follow
-    activity = db.execute('''
-        SELECT a.*, u.username, g.title, g.cover_image_url
-        FROM activities a
-        JOIN users u ON a.user_id = u.id
-        LEFT JOIN games g ON a.game_id = g.id
-        WHERE a.user_id IN (
-            SELECT following_id FROM follows WHERE follower_id = ?
-        )
-        ORDER BY a.created_at DESC
-        LIMIT 20
-    ''', (session['user_id'],)).fetchall()
+    activity, activity_cursor = paginate(
+        feed.read_timeline(db, session['user_id'], feed.PAGE_SIZE + 1), feed.PAGE_SIZE)
 
 
     following_ids = {u['id'] for u in following}
@@ -227,10 +233,12 @@ def friends():
         following=following,
         followers=followers,
         activity=activity,
+        activity_cursor=activity_cursor,
         following_ids=following_ids,   
     )
 @users_bp.route('/friends/discover', methods=['GET'])
 @login_required
+@query_budget(2)
 def discover_friends():
     db = get_db()
 
@@ -245,19 +253,20 @@ def discover_friends():
 
     # Build base query: exclude user
     params = [session['user_id']]
-    where_clauses = ['u.id != ?']
+    where_clauses = ['s.user_id != ?']
 
     if q:
-        like = f'%{q}%'
-        where_clauses.append('(u.username LIKE ? OR (u.name IS NOT NULL AND u.name LIKE ?))')
-        params.extend([like, like])
+        # Email is private, so it is not searchable here
+        condition, condition_params = user_match_filter(q, ('username', 'name'))
+        where_clauses.append(condition)
+        params.extend(condition_params)
 
     sql = f'''
-        SELECT u.*,
-               (SELECT COUNT(*) FROM user_games WHERE user_id = u.id) AS game_count
-        FROM users u
+        SELECT u.*, s.game_count
+        FROM user_stats s
+        JOIN users u ON u.id = s.user_id
         WHERE {' AND '.join(where_clauses)}
-        ORDER BY game_count DESC, u.username ASC
+        ORDER BY s.game_count DESC, s.user_id DESC
         LIMIT 50
     '''
 
@@ -0,0 +1,121 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page is read with `WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC,
+id DESC LIMIT n`, so every page costs one index range scan however far back
+it is. The cursor handed to the client is the sort key of the last row of the
+previous page, base64-encoded so it can be passed around as an opaque string.
+Pages sorted on other keys (browse) use encode_key()/decode_key(), which
+carry any tuple of values.
+"""
+import base64
+import binascii
+import json
+
+# Sorts after every stored (created_at, id), i.e. "start from the newest"
+FIRST_PAGE = ('9999-12-31 23:59:59', 2 ** 63 - 1)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, row_id):
+    raw = f'{created_at}|{row_id}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (created_at, id) for a cursor, or FIRST_PAGE when it is empty."""
+    if not cursor:
+        return FIRST_PAGE
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit('|', 1)
+        return created_at, int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+
+
+def paginate(rows, limit, key=('created_at', 'id')):
+    """
+    Split rows fetched with LIMIT limit + 1 into the page to show and the
+    cursor for the next one (None on the last page).
+    """
+    page = rows[:limit]
+    if len(rows) <= limit:
+        return page, None
+    last = page[-1]
+    return page, encode_cursor(last[key[0]], last[key[1]])
+
+
+def encode_key(values):
+    """Cursor for an arbitrary sort key, e.g. ('rating', 8.5, 1234)."""
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_key(cursor, length):
+    """The `length` values encoded by encode_key(); InvalidCursor otherwise."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if (not isinstance(values, list) or len(values) != length
+            or not all(isinstance(v, (str, int, float)) and not isinstance(v, bool) for v in values)):
+        raise InvalidCursor(cursor)
+    return tuple(values)
+
+
+def keyset_page(db, select, params, order, after=None, limit=21, backwards=False):
+    """
+    Up to `limit` rows of `select` (a SELECT ... WHERE ... without ORDER BY)
+    in `order` = (sort key expression, id expression, 'ASC' or 'DESC'),
+    starting after the (sort key, id) `after`, or going the other way from
+    it when `backwards` (the rows are still returned in `order`).
+
+    SQLite only seeks on the first column of a row-value comparison, so
+    `(key, id) > (?, ?)` would walk every row tying on the key (all the
+    unrated games, every 8/10 review). Instead the rows tying with the
+    cursor are read first, then the rows beyond its key; with an index on
+    (..., key, id) both are range scans, whatever page it is.
+    """
+    expression, id_expression, direction = order
+    if backwards:
+        direction = 'DESC' if direction == 'ASC' else 'ASC'
+    beyond = '>' if direction == 'ASC' else '<'
+
+    if after is None:
+        rows = db.execute(
+            f'{select} ORDER BY {expression} {direction}, {id_expression} {direction} LIMIT ?',
+            list(params) + [limit]
+        ).fetchall()
+    else:
+        key, last_id = after
+        rows = db.execute(
+            f'{select} AND {expression} = ? AND {id_expression} {beyond} ?'
+            f' ORDER BY {id_expression} {direction} LIMIT ?',
+            list(params) + [key, last_id, limit]
+        ).fetchall()
+        if len(rows) < limit:
+            rows += db.execute(
+                f'{select} AND {expression} {beyond} ?'
+                f' ORDER BY {expression} {direction}, {id_expression} {direction} LIMIT ?',
+                list(params) + [key, limit - len(rows)]
+            ).fetchall()
+    return rows[::-1] if backwards else rows
+
+
+def page_window(rows, limit, after=None, backwards=False):
+    """
+    For rows read by keyset_page() with limit + 1 starting at `after`:
+    (page, has_previous, has_next). Coming back from a later page there is
+    always a next one, and leaving from a cursor there is a previous one.
+    """
+    more = len(rows) > limit
+    page = rows[1:] if backwards and more else rows[:limit]
+    if not page:
+        return page, False, False
+    has_next = more or backwards
+    has_previous = (more and backwards) or (after is not None and not backwards)
+    return page, has_previous, has_next
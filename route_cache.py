@@ -0,0 +1,217 @@
+"""
+Route-level response cache keyed by the data a page depends on.
+
+A view declares its dependencies instead of invalidating anything:
+
+    @cached_route('games:{game_id}', 'reviews:game:{game_id}',
+                  'shelves:user:{viewer}', 'reviews:user:{viewer}')
+
+Each dependency names a version stamp. games:<id> and users:<id> are the
+version columns of those rows (a missing row means the page does not
+exist, and the view runs uncached); anything else is a counter in
+content_versions (migrations/0010_content_versions.sql, 0012, 0014). Triggers
+bump them in the same transaction as every write, from any view, worker
+or script. Dependencies on {viewer} only apply to logged-in requests.
+
+A request reads the versions of its dependencies in one query. The
+response stored for the same URL and viewer is served if it was rendered
+at those versions; otherwise the view runs and its response is stored for
+the next request. The same versions make the ETag (see etags.py), so a
+matching If-None-Match is answered with 304 before anything else.
+
+Views read rows from this worker's entity cache, which otherwise catches up
+with other workers' writes only on the next poll (see invalidation.py).
+So before rendering a miss, the worker applies the invalidation log:
+everything committed by the time the versions were read is then reflected
+in its caches, and a response is never older than the versions it is
+stored under. A miss that finds another thread applying the log does not
+wait for it; its response is served but not stored.
+
+Requests that miss the same URL and viewer at the same versions render it
+once: the first runs the view, the others wait for its response. Nothing
+older than the versions just read is ever served, so a write is visible
+to the next request (to its writer in particular).
+"""
+import threading
+from functools import wraps
+from flask import Response, current_app, g, make_response, request, session
+import etags
+import invalidation
+from db import get_db
+from entities import EntityCache
+
+ROW_VERSIONS = {
+    'games': 'SELECT version FROM games WHERE id = ?',
+    'users': 'SELECT version FROM users WHERE id = ?',
+}
+COUNTER_VERSION = 'SELECT COALESCE((SELECT version FROM content_versions WHERE key = ?), 0)'
+
+
+def _version_query(keys):
+    """One SELECT returning the version of each dependency key, in order."""
+    columns = []
+    params = []
+    for key in keys:
+        table, _, row_id = key.partition(':')
+        if table in ROW_VERSIONS and row_id.isdigit():
+            columns.append(f'({ROW_VERSIONS[table]})')
+            params.append(int(row_id))
+        else:
+            columns.append(f'({COUNTER_VERSION})')
+            params.append(key)
+    return 'SELECT ' + ', '.join(columns), params
+
+
+def read_versions(db, keys):
+    """The versions of `keys`, or None if one of them is a row that does not exist."""
+    sql, params = _version_query(keys)
+    versions = tuple(db.execute(sql, params).fetchone())
+    return None if None in versions else versions
+
+
+_cache_lock = threading.Lock()
+
+
+def get_route_cache(app=None):
+    """The process-wide route cache for the current database."""
+    app = app or current_app._get_current_object()
+    database = app.config['DATABASE']
+    current = app.extensions.get('route_cache')
+    if current is None or current[0] != database:
+        with _cache_lock:
+            current = app.extensions.get('route_cache')
+            if current is None or current[0] != database:
+                # Entries are replaced when their versions change, not expired
+                cache = EntityCache(app.config['ROUTE_CACHE_MAX_BYTES'], ttl=float('inf'))
+                current = app.extensions['route_cache'] = (database, cache)
+    return current[1]
+
+
+class _SingleFlight:
+    """Lets one request render a page while others asking for it wait."""
+
+    def __init__(self, timeout=5.0):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._calls = {}  # flight -> Event set when its render is done
+
+    def begin(self, flight):
+        """True if the caller should render `flight`, after waiting if someone else is."""
+        with self._lock:
+            done = self._calls.get(flight)
+            if done is None:
+                self._calls[flight] = threading.Event()
+                return True
+        done.wait(self.timeout)
+        return False
+
+    def end(self, flight):
+        with self._lock:
+            self._calls.pop(flight).set()
+
+
+_flights = _SingleFlight()
+
+
+def _dependencies(templates, fields):
+    keys = []
+    for template in templates:
+        if '{viewer}' in template and fields['viewer'] is None:
+            continue
+        keys.append(template.format(**fields))
+    return keys
+
+
+def _cacheable(response):
+    return (response.status_code == 200 and not response.direct_passthrough
+            and 'Set-Cookie' not in response.headers)
+
+
+def _render(f, args, kwargs, etag, cache=None, key=None, versions=None):
+    """Run the view, storing its response in `cache` under `key` if it can be."""
+    if cache is not None:
+        # On the request's own connection: it already holds one, and the pool may
+        # be taken by requests waiting for this render. Misses never wait for each
+        # other here; if another thread is applying the log, this one's response
+        # may be older than `versions` and is not stored.
+        db = get_db()
+        if invalidation.sync(wait=False, conn=getattr(db, 'raw', db)) is None:
+            cache = None
+    response = make_response(f(*args, **kwargs))
+    if response.status_code != 200:
+        return response
+    if cache is not None and _cacheable(response):
+        body = response.get_data()
+        headers = [(k, v) for k, v in response.headers.items() if k != 'Set-Cookie']
+        cache.set(key, (versions, body, response.status_code, headers), size=len(body) + 1024)
+        response.headers['X-Route-Cache'] = 'MISS'
+    return etags.set_validators(response, etag)
+
+
+def dependency_version(key):
+    """
+    The version of dependency `key` read for this request by cached_route,
+    or None. Values derived from the same data and cached on their own can
+    be keyed by it, so they are never older than the page they go into.
+    """
+    return g.get('route_versions', {}).get(key)
+
+
+def cached_route(*dependencies, resolve=None):
+    """
+    Cache this view's responses per URL and viewer, valid for as long as the
+    versions of `dependencies` are unchanged. Dependencies are formatted with
+    the view's arguments and `viewer` (the logged-in user's id).
+    `resolve(db, **view_kwargs)` may supply more fields, e.g. a user id from
+    a username, or return None when the page does not exist.
+    Requests with pending flash messages render normally, since the page
+    shows (and consumes) them.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or '_flashes' in session:
+                return f(*args, **kwargs)
+            db = get_db()
+            fields = dict(kwargs, viewer=session.get('user_id'))
+            if resolve is not None:
+                extra = resolve(db, **kwargs)
+                if extra is None:
+                    return f(*args, **kwargs)
+                fields.update(extra)
+            keys = _dependencies(dependencies, fields)
+            versions = read_versions(db, keys)
+            if versions is None:
+                return f(*args, **kwargs)
+            g.route_versions = dict(zip(keys, versions))
+
+            etag = etags.make_etag(versions)
+            response = etags.not_modified(etag)
+            if response is not None:
+                return response
+
+            if not (current_app.config['ROUTE_CACHE'] and request.method == 'GET'):
+                return _render(f, args, kwargs, etag)
+
+            cache = get_route_cache()
+            key = (request.full_path,) + etags.viewer()
+            valid = lambda entry: entry[0] == versions
+            entry = cache.get(key, valid=valid)
+            flight = (current_app.config['DATABASE'], key, versions)
+            if entry is None and not _flights.begin(flight):
+                # Someone else was rendering it: serve theirs if they stored it
+                entry = cache.get(key, valid=valid)
+                if entry is None:
+                    return _render(f, args, kwargs, etag, cache, key, versions)
+            if entry is not None:
+                _, body, status, headers = entry
+                response = Response(body, status, headers)
+                response.headers['X-Route-Cache'] = 'HIT'
+                return etags.set_validators(response, etag)
+
+            try:
+                return _render(f, args, kwargs, etag, cache, key, versions)
+            finally:
+                _flights.end(flight)
+        return decorated_function
+    return decorator
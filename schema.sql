@@ -107,6 +107,7 @@ CREATE TABLE IF NOT EXISTS activities (
 
 -- =========================
 -- INDEXES FOR PERFORMANCE
+-- Later schema changes live in migrations/ and are applied by init_db.py
 -- =========================
 CREATE INDEX IF NOT EXISTS idx_games_title ON games(title);
 CREATE INDEX IF NOT EXISTS idx_games_genre ON games(genre);
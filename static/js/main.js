@@ -69,22 +69,100 @@ document.addEventListener('DOMContentLoaded', function() {
         }, 5000);
     });
     
-    // Search suggestions -- not working yet
+    // Search suggestions
     const searchInput = document.querySelector('.nav-search input[name="q"]');
     
     if (searchInput) {
+        const suggestCache = new Map();  // prefix -> response, most recent last
+        const list = document.createElement('ul');
+        list.className = 'suggest-list';
+        list.hidden = true;
+        searchInput.setAttribute('autocomplete', 'off');
+        searchInput.closest('form').appendChild(list);
+        
         let timeout;
+        let controller = null;
+        
+        function render(items) {
+            list.replaceChildren();
+            items.forEach(item => {
+                const li = document.createElement('li');
+                const link = document.createElement('a');
+                link.href = item.url;
+                link.textContent = item.label;
+                const type = document.createElement('span');
+                type.className = 'suggest-type';
+                type.textContent = item.type === 'user' ? 'User' : 'Game';
+                link.appendChild(type);
+                li.appendChild(link);
+                list.appendChild(li);
+            });
+            list.hidden = items.length === 0;
+        }
+        
+        // Same folding as the server: lower case, no accents
+        function fold(text) {
+            return text.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+        }
+        
+        function remember(query, data) {
+            suggestCache.delete(query);
+            suggestCache.set(query, data);
+            if (suggestCache.size > 50) {
+                suggestCache.delete(suggestCache.keys().next().value);
+            }
+        }
+        
+        function cached(query) {
+            if (suggestCache.has(query)) return suggestCache.get(query).items;
+            // A shorter prefix whose response was complete already holds
+            // every match for this one
+            for (let i = query.length - 1; i >= 2; i--) {
+                const data = suggestCache.get(query.slice(0, i));
+                if (data && data.complete) {
+                    const prefix = fold(query);
+                    return data.items.filter(item => fold(item.label).split(/\s+/)
+                        .some((word, w, words) => words.slice(w).join(' ').startsWith(prefix)));
+                }
+            }
+            return null;
+        }
         
         searchInput.addEventListener('input', (e) => {
             clearTimeout(timeout);
             
-            const query = e.target.value;
+            const query = e.target.value.trim().toLowerCase();
             
-            if (query.length < 2) return;
+            if (query.length < 2) {
+                render([]);
+                return;
+            }
+            
+            const hit = cached(query);
+            if (hit) {
+                render(hit);
+                return;
+            }
             
             timeout = setTimeout(() => {
-                console.log('Searching for:', query);
-            }, 300);
+                // Only the latest request matters
+                if (controller) controller.abort();
+                controller = new AbortController();
+                makeRequest('/api/suggest?q=' + encodeURIComponent(query), 'GET', null, controller.signal)
+                    .then(data => {
+                        if (!data) return;
+                        remember(query, data);
+                        if (searchInput.value.trim().toLowerCase() === query) render(data.items);
+                    });
+            }, 150);
+        });
+        
+        searchInput.addEventListener('blur', () => {
+            // Let a click on a suggestion land first
+            setTimeout(() => { list.hidden = true; }, 200);
+        });
+        searchInput.addEventListener('focus', () => {
+            list.hidden = list.children.length === 0;
         });
     }
     
@@ -106,16 +184,19 @@ document.addEventListener('DOMContentLoaded', function() {
 });
 
 // Helper function for AJAX requests
-function makeRequest(url, method = 'GET', data = null) {
+function makeRequest(url, method = 'GET', data = null, signal = null) {
     return fetch(url, {
         method: method,
         headers: {
             'Content-Type': 'application/json',
         },
-        body: data ? JSON.stringify(data) : null
+        body: data ? JSON.stringify(data) : null,
+        signal: signal
     })
     .then(response => response.json())
-    .catch(error => console.error('Error:', error));
+    .catch(error => {
+        if (error.name !== 'AbortError') console.error('Error:', error);
+    });
 }
 //stars colour logic
 document.addEventListener('DOMContentLoaded', function () {
@@ -198,3 +279,87 @@ document.addEventListener('DOMContentLoaded', function () {
     showSlide(current);
   });
 });
+//infinite scroll for activity feeds and game reviews
+document.addEventListener('DOMContentLoaded', function () {
+
+  document.querySelectorAll('.activity-feed[data-next-url], .review-list[data-next-url]').forEach(list => {
+    const sentinel = document.createElement('div');
+    sentinel.className = 'activity-feed-status';
+    list.after(sentinel);
+
+    let nextUrl = list.dataset.nextUrl;
+    let loading = false;
+
+    const observer = new IntersectionObserver(entries => {
+      if (!entries[0].isIntersecting || loading || !nextUrl) return;
+
+      loading = true;
+      sentinel.textContent = 'Loading…';
+      makeRequest(nextUrl).then(page => {
+        loading = false;
+        if (!page || page.html === undefined) {
+          sentinel.textContent = '';
+          return;
+        }
+        // Activity and review pages come rendered by the server
+        list.insertAdjacentHTML('beforeend', page.html);
+        // The next page starts after the last row of this one
+        nextUrl = page.next;
+        sentinel.textContent = nextUrl ? '' : (list.dataset.endText || 'No more activity.');
+        if (!nextUrl) observer.disconnect();
+      });
+    }, { rootMargin: '200px' });
+
+    observer.observe(sentinel);
+  });
+});
+
+//profile shelves: tabs load their first page when opened, "Show more" appends the next
+document.addEventListener('DOMContentLoaded', function () {
+  const container = document.getElementById('shelves');
+  if (!container) return;
+
+  container.addEventListener('click', event => {
+    const more = event.target.closest('.shelf-more');
+    if (!more) return;
+    more.disabled = true;
+    makeRequest(more.dataset.nextUrl).then(page => {
+      more.disabled = false;
+      if (!page || page.html === undefined) return;
+      more.previousElementSibling.insertAdjacentHTML('beforeend', page.html);
+      if (page.next) {
+        more.dataset.nextUrl = page.next;
+      } else {
+        more.remove();
+      }
+    });
+  });
+
+  container.querySelectorAll('.shelf-tabs a[data-shelf]').forEach(tab => {
+    tab.addEventListener('click', event => {
+      event.preventDefault();
+      const status = tab.dataset.shelf;
+      container.querySelectorAll('.shelf-tabs a').forEach(other => {
+        other.classList.toggle('is-active', other === tab);
+      });
+      container.querySelectorAll('.shelf').forEach(shelf => {
+        shelf.hidden = shelf.dataset.shelf !== status;
+      });
+
+      const shelf = container.querySelector(`.shelf[data-shelf="${status}"]`);
+      if (!shelf.dataset.url) return;
+      const url = shelf.dataset.url;
+      delete shelf.dataset.url;
+      shelf.textContent = 'Loading…';
+      makeRequest(url).then(page => {
+        if (page && page.html !== undefined) {
+          shelf.innerHTML = page.html;
+        } else {
+          // Try again next time the tab is opened
+          shelf.textContent = '';
+          shelf.dataset.url = url;
+        }
+      });
+    });
+  });
+});
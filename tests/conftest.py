@@ -1,4 +1,6 @@
 import os
+import random
+import re
 import sys
 import sqlite3
 import pytest
@@ -8,6 +10,7 @@ if PROJECT_ROOT not in sys.path:
     sys.path.insert(0, PROJECT_ROOT)
 from app import app  
 from config import Config
+from init_db import migrate
 
 
 @pytest.fixture
@@ -29,6 +32,7 @@ def test_app(tmp_path):
     conn = sqlite3.connect(app.config['DATABASE'])
     with open('schema.sql', 'r') as f:
         conn.executescript(f.read())
+    migrate(conn)
 
     # Seed minimal test data: 1 normal user + 1 admin
     password_hash = generate_password_hash("password123")
@@ -86,3 +90,104 @@ class AuthActions:
 @pytest.fixture
 def auth(client):
     return AuthActions(client)
+
+
+def insert_rows(db_path, table, rows):
+    """Insert dicts of column values into `table`; every row has the same columns."""
+    columns = list(rows[0])
+    conn = sqlite3.connect(db_path)
+    conn.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        [[row[column] for column in columns] for row in rows],
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def catalog_games():
+    """
+    The games in `catalog`. Override this fixture in a test module, or
+    parametrize it, for other games.
+    """
+    return [{"title": "Hollow Knight", "genre": "Metroidvania"},
+            {"title": "Celeste", "genre": "Platformer"}]
+
+
+@pytest.fixture
+def catalog(test_app, catalog_games):
+    """The test app with `catalog_games` in its database (ids from 1, in order)."""
+    insert_rows(test_app.config["DATABASE"], "games", catalog_games)
+    return test_app
+
+
+def populate(db_path, games=2000, users=500, reviews=20000, shelf_entries=20000,
+             follows=5000, activities=20000, seed=1):
+    """
+    Fill a test database with a generated dataset of roughly the given size.
+    user1 (id 1) follows, shelves and reviews like everyone else.
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    statuses = ["wishlist", "currently_playing", "completed"]
+
+    conn.executemany(
+        "INSERT INTO games (title, genre, platform, release_year, description) VALUES (?, ?, ?, ?, ?)",
+        [(f"Game {i}", f"Genre {i % 20}", f"Platform {i % 6}", 1985 + i % 40, "Lorem ipsum " * 20)
+         for i in range(games)],
+    )
+    conn.executemany(
+        "INSERT INTO users (username, email, password_hash, name) VALUES (?, ?, ?, ?)",
+        [(f"player{i}", f"player{i}@example.com", "x", f"Player {i}") for i in range(users)],
+    )
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+    game_ids = [row[0] for row in conn.execute("SELECT id FROM games")]
+
+    conn.executemany(
+        "INSERT OR IGNORE INTO reviews (user_id, game_id, rating, review_text, is_anonymous, created_at) "
+        "VALUES (?, ?, ?, ?, ?, datetime('now', ?))",
+        [(rng.choice(user_ids), rng.choice(game_ids), rng.randint(1, 10), "Review text",
+          int(rng.random() < 0.1), f"-{rng.randint(0, 500000)} minutes") for _ in range(reviews)],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO user_games (user_id, game_id, status, added_at, updated_at) "
+        "VALUES (?, ?, ?, datetime('now', ?), datetime('now', ?))",
+        [(rng.choice(user_ids), rng.choice(game_ids), rng.choice(statuses),
+          f"-{rng.randint(0, 500000)} minutes", f"-{rng.randint(0, 500000)} minutes")
+         for _ in range(shelf_entries)],
+    )
+    conn.executemany(
+        "INSERT OR IGNORE INTO follows (follower_id, following_id) VALUES (?, ?)",
+        [(rng.choice(user_ids), rng.choice(user_ids)) for _ in range(follows)]
+        + [(1, rng.choice(user_ids[2:])) for _ in range(min(50, users))],
+    )
+    conn.executemany(
+        "INSERT INTO activities (user_id, activity_type, game_id, description, created_at) "
+        "VALUES (?, ?, ?, ?, datetime('now', ?))",
+        [(rng.choice(user_ids), "review", rng.choice(game_ids), "reviewed ",
+          f"-{rng.randint(0, 500000)} minutes") for _ in range(activities)],
+    )
+    # Fan every activity out to the author's followers, as log_activity does
+    conn.execute(
+        "INSERT OR IGNORE INTO timeline (user_id, created_at, activity_id, actor_id) "
+        "SELECT f.follower_id, a.created_at, a.id, a.user_id "
+        "FROM follows f JOIN activities a ON a.user_id = f.following_id"
+    )
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def assert_num_queries(client):
+    """
+    Request a path and assert how many statements it ran, as reported by
+    the Server-Timing header.
+    """
+    def check(path, expected, method="GET", **kwargs):
+        resp = client.open(path, method=method, **kwargs)
+        timing = resp.headers.get("Server-Timing", "")
+        match = re.search(r'desc="(\d+) queries"', timing)
+        count = int(match.group(1)) if match else 0
+        assert count == expected, f"{method} {path} ran {count} queries, expected {expected}"
+        return resp
+    return check
@@ -0,0 +1,107 @@
+import csv
+import io
+import json
+import re
+from datetime import datetime, timedelta
+import pytest
+from modules import admin
+from pagination import encode_key
+from conftest import insert_rows
+
+
+@pytest.fixture
+def catalog_games():
+    start = datetime(2024, 1, 1)
+    return [{"title": f"Game {i:03d}", "genre": "RPG" if i % 2 else "Puzzle", "platform": "PC",
+             "description": f'Line one\nsays "hi", {i}',
+             "created_at": (start + timedelta(hours=i // 3)).strftime("%Y-%m-%d %H:%M:%S")}
+            for i in range(1, 121)]
+
+
+@pytest.fixture
+def catalog(catalog):
+    insert_rows(catalog.config["DATABASE"], "users", [
+        {"username": f"member{i:03d}", "email": f"member{i:03d}@example.com", "password_hash": "x",
+         "is_admin": int(i % 10 == 0)}
+        for i in range(60)
+    ])
+    return catalog
+
+
+def _link(html, rel):
+    found = re.search(rf'<a href="([^"]+)" class="btn btn-secondary" rel="{rel}">', html)
+    return found.group(1).replace("&amp;", "&") if found else None
+
+
+def _walk(client, path, pattern):
+    seen, pages = [], 0
+    while path:
+        html = client.get(path).data.decode()
+        seen += re.findall(pattern, html)
+        pages += 1
+        path = _link(html, "next")
+    return seen, pages
+
+
+def test_game_listing_is_paged_in_every_sort(catalog, client, auth):
+    auth.login_admin()
+    titles, pages = _walk(client, "/admin/games?sort=title", r'font-weight: bold;">\s*(Game \d+)\s*<')
+    assert pages == 3 and titles == [f"Game {i:03d}" for i in range(1, 121)]
+
+    newest, _ = _walk(client, "/admin/games", r'href="/game/(\d+)"')
+    assert [int(i) for i in newest] == list(range(120, 0, -1))
+
+    rpg, _ = _walk(client, "/admin/games?genre=RPG&sort=title", r'font-weight: bold;">\s*(Game \d+)\s*<')
+    assert rpg == [f"Game {i:03d}" for i in range(1, 121, 2)]
+
+
+def test_previous_link_and_bad_cursor(catalog, client, auth):
+    auth.login_admin()
+    first = client.get("/admin/games?sort=title").data.decode()
+    second = client.get(_link(first, "next")).data.decode()
+    assert client.get(_link(second, "prev")).data.decode().count("Game 0") == admin.PAGE_SIZE
+
+    resp = client.get("/admin/games?sort=title&after=" + encode_key(("rating", 0, 5)))
+    assert resp.status_code == 302 and resp.headers["Location"].endswith("/admin/games?sort=title")
+
+
+def test_user_listing_filters_by_role_and_sorts_by_username(catalog, client, auth):
+    auth.login_admin()
+    names, pages = _walk(client, "/admin/users?sort=username", r'font-weight: bold;">\s*([\w]+)\s*<')
+    assert pages == 2 and names == sorted(names) and len(names) == 62
+
+    admins, _ = _walk(client, "/admin/users?role=admin&sort=username", r'font-weight: bold;">\s*([\w]+)\s*<')
+    assert admins == ["admin"] + [f"member{i:03d}" for i in range(0, 60, 10)]
+
+
+def test_export_games_streams_csv_and_jsonl(catalog, client, auth, monkeypatch):
+    monkeypatch.setattr(admin, "EXPORT_BATCH", 7)
+    auth.login_admin()
+
+    resp = client.get("/admin/games/export?format=csv&genre=Puzzle")
+    assert resp.is_streamed and resp.mimetype == "text/csv"
+    assert "attachment" in resp.headers["Content-Disposition"]
+    chunks = list(resp.iter_encoded())
+    assert len(chunks) == 1 + 60 // 7 + 1  # header, one chunk per batch
+    rows = list(csv.DictReader(io.StringIO(b"".join(chunks).decode())))
+    assert [int(row["id"]) for row in rows] == list(range(2, 121, 2))
+    assert rows[0]["description"] == 'Line one\nsays "hi", 2'
+
+    resp = client.get("/admin/games/export?format=jsonl&q=game+007")
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.data.decode().splitlines()]
+    assert [line["title"] for line in lines] == ["Game 007"]
+
+
+def test_export_users_leaves_out_password_hashes(catalog, client, auth):
+    auth.login_admin()
+    lines = [json.loads(line) for line in client.get("/admin/users/export?format=jsonl&role=admin").data.splitlines()]
+    assert [line["username"] for line in lines] == ["admin"] + [f"member{i:03d}" for i in range(0, 60, 10)]
+    assert "password_hash" not in lines[0] and lines[0]["game_count"] == 0
+
+
+def test_export_requires_admin_and_known_format(catalog, client, auth):
+    assert client.get("/admin/games/export").status_code == 302
+    auth.login_admin()
+    resp = client.get("/admin/users/export?format=xml")
+    assert resp.status_code == 302 and resp.headers["Location"].endswith("/admin/users")
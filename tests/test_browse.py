@@ -0,0 +1,111 @@
+import re
+import sqlite3
+import pytest
+from modules.games import PAGE_SIZE
+from pagination import encode_key
+
+
+@pytest.fixture
+def catalog_games():
+    # Lots of ties: ratings and years repeat, some games have no year
+    return [{"title": f"Game {i % 40:02d}", "genre": "RPG" if i % 3 else "Puzzle",
+             "release_year": None if i % 7 == 0 else 1990 + i % 5,
+             "average_rating": 0.0 if i % 11 == 0 else float(i % 4)}
+            for i in range(1, 101)]
+
+
+def _ids(html):
+    return [int(i) for i in re.findall(r'href="/game/(\d+)" class="game-card"', html.decode())]
+
+
+def _link(html, rel):
+    found = re.search(rf'<a href="([^"]+)" class="btn btn-secondary" rel="{rel}">', html.decode())
+    return found.group(1).replace("&amp;", "&") if found else None
+
+
+def _walk(client, path):
+    """Follow the next links from `path`; returns the ids of every page."""
+    pages = []
+    while path:
+        html = client.get(path).data
+        pages.append(_ids(html))
+        path = _link(html, "next")
+    return pages
+
+
+def _expected(test_app, order_by, where="1=1"):
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    ids = [row[0] for row in conn.execute(f"SELECT id FROM games WHERE {where} ORDER BY {order_by}")]
+    conn.close()
+    return ids
+
+
+@pytest.mark.parametrize("sort, order_by", [
+    ("title", "title, id"),
+    ("rating", "IFNULL(average_rating, 0) DESC, id DESC"),
+    ("year", "IFNULL(release_year, 0) DESC, id DESC"),
+])
+def test_pages_cover_the_catalog_once_in_order(catalog, client, sort, order_by):
+    pages = _walk(client, f"/browse?sort={sort}")
+    assert [len(page) for page in pages] == [PAGE_SIZE] * 4 + [100 - 4 * PAGE_SIZE]
+    assert sum(pages, []) == _expected(catalog, order_by)
+
+
+def test_previous_links_return_to_the_same_pages(catalog, client):
+    path, forward = "/browse?sort=rating", []
+    while path:
+        html = client.get(path).data
+        forward.append(_ids(html))
+        last, path = html, _link(html, "next")
+
+    backward = [_ids(last)]
+    path = _link(last, "prev")
+    while path:
+        html = client.get(path).data
+        backward.append(_ids(html))
+        path = _link(html, "prev")
+    assert backward[::-1] == forward
+
+
+def test_cursors_keep_filters_and_search(catalog, client):
+    pages = _walk(client, "/browse?genre=Puzzle&sort=year")
+    assert sum(pages, []) == _expected(catalog, "IFNULL(release_year, 0) DESC, id DESC", "genre = 'Puzzle'")
+
+    pages = _walk(client, "/browse?q=game&sort=title")
+    assert sum(pages, []) == _expected(catalog, "title, id")
+    assert len(_walk(client, "/browse?q=game")) == 5
+
+
+def test_first_page_has_no_previous_link(catalog, client):
+    html = client.get("/browse").data
+    assert _link(html, "prev") is None
+    assert "after=" in _link(html, "next")
+
+
+def test_invalid_or_mismatched_cursor_starts_over(catalog, client):
+    for cursor in ("garbage", encode_key(("rating", 2.0, 5)), encode_key(("title", "x"))):
+        resp = client.get(f"/browse?sort=title&genre=RPG&after={cursor}")
+        assert resp.status_code == 302
+        assert resp.headers["Location"].endswith("/browse?genre=RPG&sort=title")
+
+
+def test_browse_does_not_load_descriptions(catalog, client):
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("UPDATE games SET description = 'SECRET BLOB'")
+    conn.commit()
+    conn.close()
+    assert b"SECRET BLOB" not in client.get("/browse").data
+
+
+def test_filters_follow_games_added_by_another_worker(catalog, client, monkeypatch):
+    # This worker will not poll on its own
+    monkeypatch.setitem(catalog.config, "INVALIDATION_POLL_INTERVAL", 3600)
+    client.get("/browse")
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("INSERT INTO games (title, genre) VALUES ('Tetris Effect', 'Rhythm')")
+    conn.commit()
+    conn.close()
+
+    for _ in range(2):
+        html = client.get("/browse").data
+        assert b'<option value="Rhythm"' in html
@@ -0,0 +1,139 @@
+import threading
+import time
+from cache import ResponseCache, get_cache
+
+
+def test_anonymous_pages_are_served_from_cache(catalog, client):
+    for path in ("/", "/about"):
+        assert client.get(path).headers["X-Cache"] == "MISS"
+        resp = client.get(path)
+        assert resp.headers["X-Cache"] == "HIT"
+        assert "Server-Timing" not in resp.headers  # no queries ran
+        assert "Set-Cookie" not in resp.headers
+
+
+def test_anonymous_pages_vary_on_the_session_cookie(catalog, client, auth):
+    for path in ("/", "/about"):
+        for resp in (client.get(path), client.get(path)):
+            assert resp.headers["Cache-Control"] == "no-cache"
+            assert "Cookie" in resp.vary
+    auth.login()
+    resp = client.get("/about")
+    assert resp.headers["Cache-Control"] == "private, no-cache" and "Cookie" in resp.vary
+
+
+def test_logged_in_and_flash_requests_bypass_cache(catalog, client, auth):
+    client.get("/")
+    # Missing game: flashes and redirects; the next page shows the message
+    client.get("/game/99")
+    resp = client.get("/")
+    assert "X-Cache" not in resp.headers and b"Game not found." in resp.data
+
+    auth.login()
+    resp = client.get("/about")
+    assert "X-Cache" not in resp.headers and b"Logout" in resp.data
+
+
+def test_review_invalidates_index(catalog, client, auth):
+    for path in ("/", "/about"):
+        client.get(path)
+
+    auth.login()
+    client.post("/game/1/review", data={"rating": "9", "review_text": "Bugs everywhere"})
+    auth.logout()
+
+    resp = client.get("/")
+    assert resp.headers["X-Cache"] == "MISS" and b"Bugs everywhere" in resp.data
+    assert client.get("/about").headers["X-Cache"] == "HIT"
+
+
+def test_admin_edits_and_deletes_invalidate(catalog, client, auth):
+    assert b"Celeste" in client.get("/").data
+    auth.login_admin()
+    client.post("/admin/game/1/edit", data={"title": "Hollow Knight: Silksong", "genre": "", "platform": "",
+                                             "release_year": "", "cover_image_url": "", "description": ""})
+    client.post("/admin/game/2/delete")
+    auth.logout()
+
+    resp = client.get("/")
+    assert b"Silksong" in resp.data and b"Celeste" not in resp.data
+
+
+def test_burst_of_misses_renders_once():
+    cache = ResponseCache()
+    calls = []
+
+    def build():
+        calls.append(1)
+        time.sleep(0.05)
+        return "page", True
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_build("/", ["index"], build)))
+               for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert [value for value, _ in results] == ["page"] * 20
+
+
+def test_invalidation_during_rebuild_is_not_stored():
+    cache = ResponseCache()
+
+    def build():
+        cache.invalidate("game:1")
+        return "stale", True
+
+    assert cache.get_or_build("/game/1", ["game:1"], build) == ("stale", False)
+    assert cache.get_or_build("/game/1", ["game:1"], lambda: ("fresh", True)) == ("fresh", False)
+    assert cache.get_or_build("/game/1", ["game:1"], lambda: ("unused", True)) == ("fresh", True)
+
+
+def test_stale_value_is_served_while_rebuilding():
+    cache = ResponseCache()
+    cache.get_or_build("/", ["index"], lambda: ("old", True))
+    cache.invalidate("index")
+    started, release = threading.Event(), threading.Event()
+
+    def build():
+        started.set()
+        release.wait(5)
+        return "new", True
+
+    rebuild = threading.Thread(target=lambda: cache.get_or_build("/", ["index"], build))
+    rebuild.start()
+    started.wait(5)
+    assert cache.get_or_build("/", ["index"], lambda: ("unused", True)) == ("old", True)
+    release.set()
+    rebuild.join()
+    assert cache.get_or_build("/", ["index"], lambda: ("unused", True)) == ("new", True)
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_values_expire_after_their_ttl():
+    now = [0.0]
+    cache = ResponseCache(clock=lambda: now[0])
+    cache.get_or_build("facets", [], lambda: ("old", True), ttl=60)
+    now[0] = 59
+    assert cache.get_or_build("facets", [], lambda: ("new", True), ttl=60) == ("old", True)
+    now[0] = 61
+    assert cache.get_or_build("facets", [], lambda: ("new", True), ttl=60) == ("new", False)
+
+
+def test_cache_is_bounded_and_clearable():
+    cache = ResponseCache(max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.get_or_build(key, [], lambda: (key, True))
+    assert len(cache) == 2 and cache.get_or_build("a", [], lambda: ("a2", True)) == ("a2", False)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_route_cached_pages_are_not_stored_twice(catalog, client):
+    client.get("/game/1")
+    resp = client.get("/game/1")
+    assert "X-Cache" not in resp.headers and resp.headers["X-Route-Cache"] == "HIT"
+    with catalog.app_context():
+        assert get_cache().stats()["entries"] == 0
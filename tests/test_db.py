@@ -0,0 +1,96 @@
+import sqlite3
+import pytest
+from flask import g
+from db import ConnectionPool, PoolTimeout, get_db, get_pool, get_read_db, get_write_db, read_write
+
+
+def test_pool_reuses_connections(test_app, client):
+    # /browse, since / is served from the response cache the second time
+    client.get("/browse")
+    client.get("/browse")
+    stats = get_pool("read", test_app).stats()
+    assert stats["open"] == 1
+    assert stats["checkouts"] >= 2
+    assert stats["in_use"] == 0
+
+
+def test_pool_applies_pragmas(test_app):
+    with test_app.app_context():
+        db = get_db()
+        assert db.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert db.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        assert db.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert db.execute("PRAGMA temp_store").fetchone()[0] == 2  # MEMORY
+
+
+def test_pool_times_out_when_exhausted(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.05)
+    conn = pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["waits"] == 0
+
+
+def test_pool_replaces_broken_connection(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.close()
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert fresh.execute("SELECT 1").fetchone()[0] == 1
+    assert pool.stats()["discarded"] == 1
+
+
+def test_pool_rolls_back_on_release(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1)
+    conn = pool.acquire()
+    conn.execute("CREATE TABLE t (x INTEGER)")
+    conn.commit()
+    conn.execute("INSERT INTO t VALUES (1)")
+    pool.release(conn)
+    conn = pool.acquire()
+    assert conn.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+
+def test_get_requests_use_read_only_connections(test_app):
+    with test_app.test_request_context("/", method="GET"):
+        db = get_db()
+        assert db is get_read_db()
+        with pytest.raises(sqlite3.OperationalError):
+            db.execute("INSERT INTO tags (name) VALUES ('x')")
+
+
+def test_post_requests_use_write_connections(test_app):
+    with test_app.test_request_context("/", method="POST"):
+        db = get_db()
+        assert db is get_write_db()
+        db.execute("INSERT INTO tags (name) VALUES ('x')")
+        db.commit()
+    with test_app.test_request_context("/", method="GET"):
+        assert get_db().execute("SELECT name FROM tags").fetchone()["name"] == "x"
+
+
+def test_read_write_decorator_overrides_method(test_app):
+    @read_write
+    def view():
+        return get_db()
+
+    with test_app.test_request_context("/", method="GET"):
+        assert view() is get_write_db()
+        assert g._db_mode == "write"
+
+
+def test_reads_run_while_write_transaction_is_open(test_app):
+    with test_app.test_request_context("/", method="POST"):
+        writer = get_write_db()
+        writer.execute("INSERT INTO tags (name) VALUES ('pending')")
+        assert writer.in_transaction
+        reader = get_read_db()
+        # The reader is not blocked and does not see the uncommitted row
+        assert reader.execute("SELECT COUNT(*) FROM tags").fetchone()[0] == 0
+        writer.rollback()
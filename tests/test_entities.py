@@ -0,0 +1,111 @@
+import sqlite3
+import pytest
+import entities
+from entities import EntityCache, get_entity_cache, sizeof
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def catalog(catalog, monkeypatch):
+    monkeypatch.setitem(catalog.config, "RESPONSE_CACHE", False)
+    return catalog
+
+
+def test_ttl_expires_entries():
+    clock = Clock()
+    cache = EntityCache(max_bytes=10_000, ttl=60, clock=clock)
+    loads = []
+    load = lambda: loads.append(1) or {"id": 1}
+
+    cache.get_or_load("a", load)
+    cache.get_or_load("a", load)
+    clock.now = 61
+    cache.get_or_load("a", load)
+    assert len(loads) == 2
+    assert cache.stats()["hits"] == 1 and cache.stats()["expirations"] == 1
+
+
+def test_byte_cap_evicts_least_recently_used():
+    value = {"title": "x" * 100}
+    cache = EntityCache(max_bytes=sizeof(value) * 2, ttl=60)
+    cache.get_or_load("a", lambda: dict(value))
+    cache.get_or_load("b", lambda: dict(value))
+    cache.get_or_load("a", lambda: None)  # hit: b is now the oldest
+    cache.get_or_load("c", lambda: dict(value))
+
+    assert len(cache) == 2 and cache.bytes <= cache.max_bytes
+    assert cache.stats()["evictions"] == 1
+    assert cache.get_or_load("b", lambda: None) is None
+
+
+def test_oversized_and_missing_values_are_not_stored():
+    cache = EntityCache(max_bytes=100, ttl=60)
+    assert cache.get_or_load("big", lambda: {"bio": "x" * 1000})["bio"]
+    assert cache.get_or_load("none", lambda: None) is None
+    assert len(cache) == 0 and cache.bytes == 0
+
+
+def test_load_racing_an_invalidation_is_not_stored():
+    cache = EntityCache(max_bytes=10_000, ttl=60)
+
+    def load():
+        cache.invalidate("a")  # a write lands while the old row is read
+        return {"title": "old"}
+
+    assert cache.get_or_load("a", load) == {"title": "old"}
+    assert cache.get_or_load("a", lambda: {"title": "new"}) == {"title": "new"}
+
+
+def test_game_page_reads_game_and_tags_once(catalog, client, monkeypatch):
+    monkeypatch.setitem(catalog.config, "ROUTE_CACHE", False)
+    client.get("/game/1")
+    resp = client.get("/game/1")
+    assert 'desc="2 queries"' in resp.headers["Server-Timing"]  # versions and reviews
+    assert get_entity_cache(catalog).stats()["hits"] == 2
+
+
+def test_admin_edit_and_review_refresh_the_game(catalog, client, auth):
+    client.get("/game/1")
+    auth.login_admin()
+    client.post("/admin/game/1/edit", data={"title": "Hollow Knight: Silksong", "genre": "", "platform": "",
+                                             "release_year": "", "cover_image_url": "", "description": ""})
+    assert b"Hollow Knight: Silksong" in client.get("/game/1").data
+
+    client.post("/game/1/review", data={"rating": "8", "review_text": ""})
+    with catalog.test_request_context():
+        db = sqlite3.connect(catalog.config["DATABASE"])
+        db.row_factory = sqlite3.Row
+        assert entities.game(db, 1)["average_rating"] == 8.0
+        db.close()
+
+
+def test_profile_edit_and_role_change_refresh_the_user(catalog, client, auth):
+    client.get("/api/users/user1/activity")
+    auth.login()
+    client.post("/profile/edit", data={"name": "Player One", "bio": ""})
+    auth.logout()
+
+    auth.login_admin()
+    with catalog.test_request_context():
+        assert ("user", "user1") not in get_entity_cache()._entries
+        get_entity_cache().get_or_load(("user", "user1"), lambda: {"id": 1, "is_admin": 0})
+    client.post("/admin/user/1/toggle_admin")
+    with catalog.test_request_context():
+        assert ("user", "user1") not in get_entity_cache()._entries
+
+    resp = client.get("/admin/perf")
+    assert b"Entities (games, tags, users)" in resp.data
+
+
+def test_disabled_cache_always_loads(catalog, client, monkeypatch):
+    monkeypatch.setitem(catalog.config, "ENTITY_CACHE", False)
+    client.get("/game/1")
+    client.get("/game/1")
+    assert len(get_entity_cache(catalog)) == 0
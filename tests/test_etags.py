@@ -0,0 +1,112 @@
+import sqlite3
+import pytest
+
+
+@pytest.fixture
+def catalog(catalog, monkeypatch):
+    # Exercise the validators themselves, not the anonymous response cache
+    monkeypatch.setitem(catalog.config, "RESPONSE_CACHE", False)
+    return catalog
+
+
+def revalidate(client, path):
+    etag = client.get(path).headers["ETag"]
+    return etag, client.get(path, headers={"If-None-Match": etag})
+
+
+def queries(resp):
+    timing = resp.headers.get("Server-Timing", "")
+    return timing.split('desc="')[1].split(" ")[0] if timing else "0"
+
+
+@pytest.mark.parametrize("path", ["/game/1", "/profile/user1", "/browse", "/browse?q=hollow&sort=rating"])
+def test_unchanged_pages_revalidate_with_one_query(catalog, client, path):
+    etag, resp = revalidate(client, path)
+    assert etag.startswith('"') and not etag.startswith('W/')
+    assert resp.status_code == 304 and resp.data == b""
+    assert resp.headers["ETag"] == etag
+    assert queries(resp) == "1"
+
+
+def test_review_changes_game_profile_and_browse_etags(catalog, client, auth):
+    before = {path: client.get(path).headers["ETag"] for path in ("/game/1", "/game/2", "/profile/user1", "/browse")}
+
+    auth.login()
+    client.post("/game/1/review", data={"rating": "9", "review_text": "Bugs everywhere"}, follow_redirects=True)
+    auth.logout()
+
+    for path in ("/game/1", "/profile/user1", "/browse"):
+        resp = client.get(path, headers={"If-None-Match": before[path]})
+        assert resp.status_code == 200, path
+    assert client.get("/game/2", headers={"If-None-Match": before["/game/2"]}).status_code == 304
+
+
+def test_shelf_and_follow_changes_only_touch_profiles(catalog, client, auth):
+    etags = {path: client.get(path).headers["ETag"] for path in ("/profile/user1", "/profile/admin", "/browse", "/game/2")}
+
+    auth.login()
+    client.post("/game/1/add-to-list", data={"status": "wishlist"}, follow_redirects=True)
+    client.post("/follow/admin", follow_redirects=True)
+    auth.logout()
+
+    for path in ("/profile/user1", "/profile/admin"):
+        assert client.get(path, headers={"If-None-Match": etags[path]}).status_code == 200, path
+    for path in ("/browse", "/game/2"):
+        assert client.get(path, headers={"If-None-Match": etags[path]}).status_code == 304, path
+
+
+def test_admin_edit_changes_game_and_browse_etags(catalog, client, auth):
+    game_etag = client.get("/game/2").headers["ETag"]
+    browse_etag = client.get("/browse").headers["ETag"]
+
+    auth.login_admin()
+    client.post("/admin/game/2/edit", data={"title": "Celeste Classic", "genre": "", "platform": "",
+                                             "release_year": "", "cover_image_url": "", "description": ""},
+                follow_redirects=True)
+    auth.logout()
+
+    resp = client.get("/game/2", headers={"If-None-Match": game_etag})
+    assert resp.status_code == 200 and b"Celeste Classic" in resp.data
+    assert client.get("/browse", headers={"If-None-Match": browse_etag}).status_code == 200
+
+
+def test_etags_depend_on_the_viewer(catalog, client, auth):
+    anonymous = client.get("/game/1")
+    assert anonymous.headers["Cache-Control"] == "no-cache"
+    auth.login()
+    resp = client.get("/game/1", headers={"If-None-Match": anonymous.headers["ETag"]})
+    assert resp.status_code == 200
+    assert resp.headers["Cache-Control"] == "private, no-cache"
+    assert "Cookie" in resp.headers["Vary"]
+
+
+def test_pending_flash_messages_render(catalog, client):
+    etag = client.get("/game/1").headers["ETag"]
+    client.get("/game/99")  # flashes "Game not found." and redirects
+    resp = client.get("/game/1", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and b"Game not found." in resp.data
+
+
+def test_missing_pages_have_no_etag(catalog, client):
+    resp = client.get("/profile/nobody")
+    assert resp.status_code == 302 and "ETag" not in resp.headers
+
+
+def test_versions_are_bumped_by_triggers(catalog):
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    versions = lambda: dict(conn.execute("SELECT key, version FROM content_versions"))
+    start = versions()
+    game_version = conn.execute("SELECT version FROM games WHERE id = 1").fetchone()[0]
+
+    conn.execute("INSERT INTO reviews (user_id, game_id, rating) VALUES (1, 1, 7)")
+    conn.execute("INSERT INTO user_games (user_id, game_id, status) VALUES (1, 2, 'completed')")
+    after = versions()
+    assert after["games"] == start["games"] + 1  # the rating aggregates changed
+    assert after["reviews:game:1"] == after["reviews:user:1"] == 1
+    assert after["shelves:user:1"] == 1
+    assert conn.execute("SELECT version FROM games WHERE id = 1").fetchone()[0] == game_version + 1
+    assert conn.execute("SELECT version FROM games WHERE id = 2").fetchone()[0] == 1
+
+    conn.execute("UPDATE users SET bio = 'hi' WHERE id = 1")
+    assert conn.execute("SELECT version FROM users WHERE id = 1").fetchone()[0] == 2
+    conn.close()
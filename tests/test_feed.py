@@ -0,0 +1,127 @@
+import sqlite3
+import pytest
+from app import log_activity
+from db import get_db
+from modules import feed
+
+
+@pytest.fixture
+def followed(test_app):
+    """player0 (id 3) and player1 (id 4) are both followed by user1 (id 1)."""
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    conn.execute("INSERT INTO games (title) VALUES ('Feed Game')")
+    conn.executemany("INSERT INTO users (username, email, password_hash) VALUES (?, ?, 'x')",
+                     [("player0", "player0@example.com"), ("player1", "player1@example.com")])
+    conn.executemany("INSERT INTO follows (follower_id, following_id) VALUES (1, ?)", [(3,), (4,)])
+    conn.commit()
+    conn.close()
+    return test_app
+
+
+def _log(app, user_id, description):
+    with app.test_request_context("/", method="POST"):
+        log_activity(user_id=user_id, activity_type="review", game_id=1, description=description)
+
+
+def _timeline(app, user_id=1, limit=10):
+    with app.test_request_context("/"):
+        return [row["description"] for row in feed.read_timeline(get_db(), user_id, limit)]
+
+
+def _timeline_rows(app, user_id=1):
+    conn = sqlite3.connect(app.config["DATABASE"])
+    count = conn.execute("SELECT COUNT(*) FROM timeline WHERE user_id = ?", (user_id,)).fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_log_activity_fans_out_to_followers(followed):
+    _log(followed, 3, "first ")
+    _log(followed, 4, "second ")
+    assert _timeline_rows(followed) == 2
+    assert _timeline(followed) == ["second ", "first "]
+    # Nobody follows user1, and authors do not get their own activity
+    assert _timeline_rows(followed, user_id=3) == 0
+
+
+def test_unfollow_prunes_and_follow_backfills(followed, client, auth):
+    _log(followed, 3, "from player0 ")
+    auth.login()
+
+    client.post("/follow/player0")
+    assert _timeline(followed) == []
+
+    client.post("/follow/player0")
+    assert _timeline(followed) == ["from player0 "]
+
+
+def test_backfill_breaks_timestamp_ties_by_id(followed, monkeypatch):
+    monkeypatch.setitem(followed.config, "TIMELINE_BACKFILL", 2)
+    conn = sqlite3.connect(followed.config["DATABASE"])
+    conn.executemany("INSERT INTO activities (user_id, activity_type, game_id, description, created_at) "
+                     "VALUES (3, 'review', 1, ?, '2024-01-01 00:00:00')", [(f"tied {i} ",) for i in range(4)])
+    conn.commit()
+    conn.close()
+    with followed.test_request_context("/", method="POST"):
+        feed.backfill(get_db(), 2, 3)
+        get_db().commit()
+    assert _timeline(followed, user_id=2) == ["tied 3 ", "tied 2 "]
+
+
+def test_high_follower_accounts_are_merged_at_read_time(followed, monkeypatch):
+    monkeypatch.setitem(followed.config, "TIMELINE_FANOUT_LIMIT", 0)
+    _log(followed, 3, "celebrity ")
+    assert _timeline_rows(followed) == 0
+    assert _timeline(followed) == ["celebrity "]
+
+
+def test_account_crossing_the_limit_is_not_duplicated(followed, monkeypatch):
+    _log(followed, 3, "before ")
+    monkeypatch.setitem(followed.config, "TIMELINE_FANOUT_LIMIT", 0)
+    _log(followed, 3, "after ")
+    assert _timeline(followed) == ["after ", "before "]
+
+
+def test_timeline_respects_limit(followed):
+    for i in range(5):
+        _log(followed, 3, f"activity {i} ")
+    assert _timeline(followed, limit=3) == ["activity 4 ", "activity 3 ", "activity 2 "]
+
+
+def test_feed_api_pages_through_everything_once(followed, client, auth, monkeypatch):
+    monkeypatch.setattr(feed, "PAGE_SIZE", 2)
+    for i in range(5):
+        _log(followed, 3 + i % 2, f"activity {i} ")
+    auth.login()
+
+    seen = []
+    url = "/api/feed"
+    while url:
+        page = client.get(url).get_json()
+        assert len(page["items"]) <= 2
+        seen.extend(item["description"] for item in page["items"])
+        url = page["next"]
+    assert seen == [f"activity {i} " for i in range(4, -1, -1)]
+
+
+def test_user_activity_api(followed, client):
+    _log(followed, 3, "mine ")
+    _log(followed, 4, "not mine ")
+    page = client.get("/api/users/player0/activity").get_json()
+    assert [item["description"] for item in page["items"]] == ["mine "]
+    assert page["items"][0]["game_url"] == "/game/1"
+    assert page["html"].count('class="activity-card"') == 1 and "mine" in page["html"]
+    assert page["next"] is None
+    assert client.get("/api/users/nobody/activity").status_code == 404
+
+
+def test_feed_api_answers_logged_out_requests_with_401(followed, client):
+    resp = client.get("/api/feed")
+    assert resp.status_code == 401
+    assert resp.get_json() == {"error": "Login required."}
+
+
+def test_feed_api_rejects_bad_cursor(followed, client):
+    resp = client.get("/api/users/player0/activity?before=not-a-cursor")
+    assert resp.status_code == 400
+    assert resp.get_json() == {"error": "Invalid cursor."}
@@ -0,0 +1,78 @@
+import sqlite3
+import pytest
+from flask import render_template, render_template_string
+from fragments import get_fragment_cache
+
+
+@pytest.fixture
+def catalog_games():
+    return [{"title": f"Game {i}", "genre": "Platformer", "average_rating": i % 10} for i in range(60)]
+
+
+@pytest.fixture
+def catalog(catalog, monkeypatch):
+    # Render every page, so the cards come from the fragment cache or not at all
+    monkeypatch.setitem(catalog.config, "RESPONSE_CACHE", False)
+    monkeypatch.setitem(catalog.config, "ROUTE_CACHE", False)
+    return catalog
+
+
+def test_cards_render_once_across_pages(catalog, client):
+    first = client.get("/browse").data
+    misses = get_fragment_cache(catalog).stats()["misses"]
+    assert misses > 1
+    assert client.get("/browse").data == first
+    stats = get_fragment_cache(catalog).stats()
+    assert stats["misses"] == misses and stats["hits"] == misses
+
+    # The landing page shows some of the same cards
+    client.get("/")
+    assert get_fragment_cache(catalog).stats()["hits"] > misses
+
+
+def test_edited_game_gets_a_new_card(catalog, client, auth):
+    assert b"Game 0<" in client.get("/browse").data
+    auth.login_admin()
+    client.post("/admin/game/1/edit", data={"title": "Game 00", "genre": "", "platform": "",
+                                             "release_year": "", "cover_image_url": "", "description": ""})
+    resp = client.get("/browse")
+    assert b"Game 00<" in resp.data and b"Game 0<" not in resp.data
+
+
+def test_activity_cards_follow_the_game(catalog, client, auth):
+    auth.login()
+    client.post("/game/2/add-to-list", data={"status": "completed"})
+    assert b"Game 1</a>" in client.get("/profile/user1").data
+
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("UPDATE games SET title = 'Game One' WHERE id = 2")
+    conn.commit()
+    conn.close()
+    assert b"Game One</a>" in client.get("/profile/user1").data
+
+
+def test_undefined_key_parts_are_not_cached(catalog):
+    with catalog.test_request_context():
+        template = "{% cache 'card', game.id, game.version %}{{ game.title }}{% endcache %}"
+        assert render_template_string(template, game={"id": 1, "title": "A"}) == "A"
+        assert render_template_string(template, game={"id": 1, "title": "B"}) == "B"
+        assert len(get_fragment_cache()) == 0
+
+
+def test_store_is_bounded(catalog, monkeypatch):
+    monkeypatch.setitem(catalog.config, "FRAGMENT_CACHE_MAX_BYTES", 4096)
+    monkeypatch.delitem(catalog.extensions, "fragment_cache", raising=False)
+    with catalog.test_request_context():
+        games = [{"id": i, "version": 1, "title": f"Game {i}", "genre": "", "average_rating": 5}
+                 for i in range(100)]
+        for game in games:
+            render_template("_game_card.html", game=game)
+        cache = get_fragment_cache()
+        assert cache.bytes <= 4096 and cache.stats()["evictions"] > 0
+
+
+def test_disabled_cache_renders_every_card(catalog, client, monkeypatch):
+    monkeypatch.setitem(catalog.config, "FRAGMENT_CACHE", False)
+    client.get("/browse")
+    client.get("/browse")
+    assert len(get_fragment_cache(catalog)) == 0
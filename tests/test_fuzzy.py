@@ -0,0 +1,70 @@
+import re
+import sqlite3
+import pytest
+from db import get_db
+from modules import fuzzy
+
+
+@pytest.fixture
+def catalog_games():
+    return [{"title": title, "genre": genre} for title, genre in [
+        ("The Witcher 3: Wild Hunt", "RPG"),
+        ("Hollow Knight", "Metroidvania"),
+        ("Night in the Woods", "Adventure"),
+        ("Stardew Valley", "Simulation"),
+        ("Witch It", "Party"),
+    ]]
+
+
+def _titles(html):
+    return re.findall(r'class="game-card-title">([^<]+)<', html.decode())
+
+
+def test_levenshtein_and_distance():
+    assert fuzzy.levenshtein("witchr", "witcher") == 1
+    assert fuzzy.levenshtein("", "abc") == 3
+    assert fuzzy.levenshtein("kitten", "sitting") == 3
+    assert fuzzy.distance("Hollow Night", "Hollow Knight") == pytest.approx(0.1)
+    assert fuzzy.distance("hollow knight", "Hollow Knight") == 0.0
+
+
+def test_trigrams_match_the_index_tokenizer():
+    assert fuzzy.trigrams("Ab  C") == {"ab ", "b c"}
+    assert fuzzy.trigrams("ab") == set()
+
+
+def test_browse_falls_back_to_fuzzy_search(catalog, client):
+    resp = client.get("/browse?q=Witchr+3")
+    assert _titles(resp.data)[0] == "The Witcher 3: Wild Hunt"
+    assert "No exact matches".encode() in resp.data
+
+    assert _titles(client.get("/browse?q=Hollow+Night").data)[0] == "Hollow Knight"
+    assert _titles(client.get("/browse?q=Stardw").data) == ["Stardew Valley"]
+
+
+def test_exact_matches_do_not_use_fuzzy_search(catalog, client):
+    resp = client.get("/browse?q=hollow")
+    assert _titles(resp.data) == ["Hollow Knight"]
+    assert b"No exact matches" not in resp.data
+
+
+def test_fuzzy_search_applies_filters_and_threshold(catalog, client):
+    assert _titles(client.get("/browse?q=Witchr&genre=Party").data) == ["Witch It"]
+    assert _titles(client.get("/browse?q=zzzzzz").data) == []
+
+
+def test_candidates_skip_common_trigrams(catalog, monkeypatch):
+    # "the" appears in two titles, so with a limit of one it is not used
+    monkeypatch.setitem(catalog.config, "FUZZY_MAX_DF", 1)
+    with catalog.test_request_context("/"):
+        rows = fuzzy.candidates(get_db(), "the")
+    assert rows == []
+
+
+def test_index_follows_title_changes(catalog, client):
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("UPDATE games SET title = 'Celeste' WHERE title = 'Stardew Valley'")
+    conn.commit()
+    conn.close()
+    assert _titles(client.get("/browse?q=Stardw").data) == []
+    assert _titles(client.get("/browse?q=Celest").data) == ["Celeste"]
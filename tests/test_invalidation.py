@@ -0,0 +1,132 @@
+import multiprocessing
+import sqlite3
+import time
+import invalidation
+from cache import get_cache
+from entities import get_entity_cache
+
+
+def events(db_path, after=0):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT kind, target_id, label FROM cache_events WHERE id > ? ORDER BY id",
+                        (after,)).fetchall()
+    conn.close()
+    return rows
+
+
+def test_writes_are_logged_by_triggers(catalog):
+    db_path = catalog.config["DATABASE"]
+    conn = sqlite3.connect(db_path)
+    start = conn.execute("SELECT MAX(id) FROM cache_events").fetchone()[0]
+    conn.execute("UPDATE games SET title = 'Hollow Knight: Silksong' WHERE id = 1")
+    conn.execute("INSERT INTO reviews (user_id, game_id, rating) VALUES (1, 2, 7)")
+    conn.execute("UPDATE users SET bio = 'hi' WHERE id = 1")
+    conn.commit()
+    conn.close()
+
+    assert sorted(events(db_path, start), key=repr) == [
+        ("game", 1, "Hollow Knight: Silksong"),
+        ("game", 2, "Celeste"),  # rating aggregates
+        ("game_title", 1, "Hollow Knight: Silksong"),
+        ("reviews", 2, None),
+        ("user", 1, "user1"),
+    ]
+
+
+def test_change_made_elsewhere_reaches_caches_after_the_poll_interval(catalog, client, monkeypatch):
+    monkeypatch.setitem(catalog.config, "INVALIDATION_POLL_INTERVAL", 0.05)
+    assert b"Hollow Knight" in client.get("/").data
+    assert client.get("/").headers["X-Cache"] == "HIT"
+
+    # Another process edits the game
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("UPDATE games SET title = 'Hollow Knight: Silksong' WHERE id = 1")
+    conn.commit()
+    conn.close()
+
+    time.sleep(0.1)
+    resp = client.get("/")
+    assert resp.headers["X-Cache"] == "MISS" and b"Silksong" in resp.data
+    assert client.get("/api/suggest?q=silk").get_json()["items"][0]["id"] == 1
+
+
+def test_own_writes_are_applied_before_the_response(catalog, client, auth, monkeypatch):
+    monkeypatch.setitem(catalog.config, "INVALIDATION_POLL_INTERVAL", 3600)
+    client.get("/")
+    auth.login()
+    client.post("/game/2/review", data={"rating": "9", "review_text": "Tight controls"})
+    auth.logout()
+
+    resp = client.get("/")
+    assert resp.headers["X-Cache"] == "MISS" and b"Tight controls" in resp.data
+
+
+def test_falling_behind_the_pruned_log_drops_everything(catalog, client, monkeypatch):
+    monkeypatch.setitem(catalog.config, "INVALIDATION_POLL_INTERVAL", 0)
+    client.get("/")
+    client.get("/game/1")
+    assert len(get_cache(catalog)) == 1 and len(get_entity_cache(catalog)) == 2
+
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.executemany("INSERT INTO cache_events (kind, target_id) VALUES ('reviews', 2)", [()] * 12_000)
+    conn.commit()
+    conn.close()
+
+    client.get("/about")
+    with catalog.app_context():
+        assert invalidation.get_log().stats()["resets"] == 1
+    assert len(get_entity_cache(catalog)) == 0
+    assert client.get("/").headers["X-Cache"] == "MISS"
+
+
+# ---- several worker processes on one database ----
+
+def _worker(database, commands, results):
+    from app import app
+    app.config.update(TESTING=True, DATABASE=database, SECRET_KEY="test-secret-key",
+                      INVALIDATION_POLL_INTERVAL=0.2)
+    client = app.test_client()
+    for method, path, data in iter(commands.get, None):
+        resp = client.open(path, method=method, data=data)
+        results.put((resp.status_code, resp.headers.get("X-Cache"), resp.get_data(as_text=True)))
+
+
+class Worker:
+    def __init__(self, ctx, database):
+        self.commands, self.results = ctx.Queue(), ctx.Queue()
+        self.process = ctx.Process(target=_worker, args=(database, self.commands, self.results))
+        self.process.start()
+
+    def request(self, method, path, data=None):
+        self.commands.put((method, path, data))
+        return self.results.get(timeout=30)
+
+    def stop(self):
+        self.commands.put(None)
+        self.process.join(10)
+
+
+def test_workers_see_each_others_writes_within_the_poll_interval(catalog):
+    ctx = multiprocessing.get_context("spawn")
+    readers = [Worker(ctx, catalog.config["DATABASE"]) for _ in range(2)]
+    admin = Worker(ctx, catalog.config["DATABASE"])
+    try:
+        for reader in readers:
+            reader.request("GET", "/")
+            status, hit, body = reader.request("GET", "/")
+            assert hit == "HIT" and "Hollow Knight" in body
+            assert '"Hollow Knight"' in reader.request("GET", "/api/suggest?q=hol")[2]
+
+        admin.request("POST", "/login", {"username": "admin", "password": "password123"})
+        admin.request("POST", "/admin/game/1/edit", {"title": "Hollow Knight: Silksong", "genre": "",
+                                                     "platform": "", "release_year": "",
+                                                     "cover_image_url": "", "description": ""})
+        time.sleep(0.3)
+
+        for reader in readers:
+            status, hit, body = reader.request("GET", "/")
+            assert hit == "MISS" and "Silksong" in body
+            assert "Silksong" in reader.request("GET", "/api/suggest?q=hol")[2]
+    finally:
+        for worker in readers + [admin]:
+            worker.stop()
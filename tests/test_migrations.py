@@ -0,0 +1,78 @@
+import sqlite3
+import pytest
+from init_db import init_db, load_migrations, migrate
+
+
+def _index_names(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def test_init_db_applies_all_migrations(tmp_path):
+    db_path = str(tmp_path / "fresh.db")
+    init_db(db_path)
+
+    conn = sqlite3.connect(db_path)
+    versions = [row[0] for row in conn.execute("SELECT version FROM schema_migrations ORDER BY version")]
+    assert versions == [version for version, _, _ in load_migrations()]
+    assert "idx_activities_user_created" in _index_names(conn)
+
+
+def test_migrate_is_idempotent(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "twice.db"))
+    with open("schema.sql") as f:
+        conn.executescript(f.read())
+
+    assert migrate(conn)
+    assert migrate(conn) == []
+    count = conn.execute("SELECT COUNT(*) FROM schema_migrations").fetchone()[0]
+    assert count == len(load_migrations())
+
+
+def test_migrate_keeps_existing_data(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "existing.db"))
+    with open("schema.sql") as f:
+        conn.executescript(f.read())
+    conn.execute("INSERT INTO games (title) VALUES ('Old Game')")
+    conn.commit()
+
+    migrate(conn)
+
+    assert conn.execute("SELECT title FROM games").fetchone()[0] == "Old Game"
+    indexes = _index_names(conn)
+    assert "idx_reviews_game_created" in indexes
+    assert "idx_reviews_game" not in indexes
+
+
+def test_failed_migration_is_rolled_back(tmp_path, monkeypatch):
+    conn = sqlite3.connect(str(tmp_path / "broken.db"))
+    with open("schema.sql") as f:
+        conn.executescript(f.read())
+    migrate(conn)
+
+    broken = tmp_path / "9999_broken.sql"
+    broken.write_text("CREATE TABLE half_done (id INTEGER);\nTHIS IS NOT SQL;")
+    monkeypatch.setattr("init_db.load_migrations", lambda: [(9999, "broken", str(broken))])
+
+    with pytest.raises(sqlite3.Error):
+        migrate(conn)
+
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert "half_done" not in tables
+    assert conn.execute("SELECT COUNT(*) FROM schema_migrations WHERE version = 9999").fetchone()[0] == 0
+
+
+def test_rating_aggregates_are_backfilled(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "ratings.db"))
+    with open("schema.sql") as f:
+        conn.executescript(f.read())
+    conn.execute("INSERT INTO games (title, average_rating) VALUES ('Reviewed', 0), ('Seeded', 9.5)")
+    conn.executemany("INSERT INTO users (username, email, password_hash) VALUES (?, ?, 'x')",
+                     [("a", "a@example.com"), ("b", "b@example.com")])
+    conn.executemany("INSERT INTO reviews (user_id, game_id, rating) VALUES (?, 1, ?)", [(1, 7), (2, 10)])
+    conn.commit()
+
+    migrate(conn)
+
+    rows = conn.execute("SELECT rating_sum, rating_count, rating_7, rating_10, average_rating "
+                        "FROM games ORDER BY id").fetchall()
+    assert rows == [(17, 2, 1, 1, 8.5), (0, 0, 0, 0, 9.5)]
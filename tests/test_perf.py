@@ -0,0 +1,47 @@
+import logging
+from flask import g
+from db import get_db, query_stats
+
+
+def test_server_timing_header_counts_queries(client):
+    resp = client.get("/")
+    timing = resp.headers.get("Server-Timing")
+    assert timing is not None
+    assert timing.startswith("db;dur=")
+    assert 'desc="2 queries"' in timing
+
+
+def test_records_statement_shape_and_rows(test_app):
+    with test_app.test_request_context("/", method="GET"):
+        rows = get_db().execute(
+            "SELECT username FROM users WHERE id > ? AND username != ?", (0, "nobody")
+        ).fetchall()
+        record = g._queries[-1]
+        assert record.sql == "SELECT username FROM users WHERE id > ? AND username != ?"
+        assert record.params == "(int, str)"
+        assert record.rows == len(rows) == 2
+        assert record.duration > 0
+
+
+def test_slow_queries_are_logged(client, test_app, monkeypatch, caplog):
+    monkeypatch.setitem(test_app.config, "SLOW_QUERY_MS", 0)
+    with caplog.at_level(logging.WARNING, logger="greatgames.sql.slow"):
+        client.get("/")
+    messages = [r.getMessage() for r in caplog.records if r.name == "greatgames.sql.slow"]
+    assert any("FROM games" in m and "GET /" in m for m in messages)
+
+
+def test_admin_perf_lists_top_statements(client, auth):
+    query_stats.reset()
+    client.get("/")
+    auth.login_admin()
+    resp = client.get("/admin/perf")
+    assert resp.status_code == 200
+    assert b"Query Performance" in resp.data
+    assert b"FROM games" in resp.data
+
+
+def test_admin_perf_requires_admin(client, auth):
+    auth.login()
+    resp = client.get("/admin/perf", follow_redirects=False)
+    assert resp.status_code == 302
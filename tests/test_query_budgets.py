@@ -0,0 +1,88 @@
+import pytest
+from flask import g
+from db import QueryBudgetExceeded, get_db, query_budget
+from pagination import encode_key
+from conftest import populate
+
+
+# (path, expected statements); anonymous pages first, then as user1. Pages
+# after the first ones find game 3 and player3 in the entity cache, and
+# the browse filters in the value cache.
+ANONYMOUS_PAGES = [
+    ("/", 2),
+    ("/browse", 4),
+    ("/browse?sort=rating&after=" + encode_key(("rating", 0, 5)), 3),
+    ("/game/3", 4),
+    ("/profile/player3", 6),
+    ("/profile/player3?shelf=completed", 5),
+    ("/api/users/player3/activity", 1),
+    ("/api/games/3/reviews?order=highest&after=" + encode_key(("highest", 5, 10)), 2),
+    ("/api/users/player3/shelves/wishlist", 1),
+    ("/api/users/player3/shelves/completed?after=" + encode_key(("completed", "2024-01-01 00:00:00", 5)), 2),
+]
+LOGGED_IN_PAGES = [
+    ("/home", 3),
+    ("/game/3", 4),
+    ("/profile/player3", 6),
+    ("/friends", 3),
+    ("/friends/discover", 2),
+    ("/api/feed", 1),
+]
+
+
+@pytest.mark.parametrize("rows", [10, 10_000])
+def test_query_counts_do_not_grow_with_data(test_app, auth, assert_num_queries, rows):
+    populate(test_app.config["DATABASE"], games=rows, users=max(rows // 10, 10), reviews=rows,
+             shelf_entries=rows, follows=rows, activities=rows)
+
+    for path, expected in ANONYMOUS_PAGES:
+        assert_num_queries(path, expected)
+
+    auth.login()
+    for path, expected in LOGGED_IN_PAGES:
+        assert_num_queries(path, expected)
+
+
+def test_budget_raises_in_testing(test_app):
+    @query_budget(1)
+    def view():
+        db = get_db()
+        db.execute("SELECT 1").fetchone()
+        db.execute("SELECT 2").fetchone()
+        return "ok"
+
+    with test_app.test_request_context("/"):
+        with pytest.raises(QueryBudgetExceeded):
+            view()
+
+
+def test_budget_only_warns_when_not_enforced(test_app, monkeypatch, caplog):
+    monkeypatch.setitem(test_app.config, "QUERY_BUDGET_ENFORCE", False)
+
+    @query_budget(0)
+    def view():
+        get_db().execute("SELECT 1").fetchone()
+        return "ok"
+
+    with test_app.test_request_context("/"):
+        assert view() == "ok"
+    assert any("budget is 0" in r.getMessage() for r in caplog.records)
+
+
+def test_budget_ignores_queries_before_the_view(test_app):
+    @query_budget(1)
+    def view():
+        get_db().execute("SELECT 1").fetchone()
+        return "ok"
+
+    with test_app.test_request_context("/"):
+        get_db().execute("SELECT 0").fetchone()
+        assert view() == "ok"
+        assert len(g._queries) == 2
+
+
+def test_views_declare_budgets(test_app):
+    for endpoint in ("index", "home", "games.game_detail", "games.browse",
+                     "users.profile", "users.friends", "users.discover_friends",
+                     "api.activity_feed", "api.user_activity", "api.game_reviews", "api.user_shelf"):
+        assert hasattr(test_app.view_functions[endpoint], "query_budget"), endpoint
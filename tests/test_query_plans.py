@@ -0,0 +1,228 @@
+"""
+EXPLAIN QUERY PLAN regression checks for the statements each route issues.
+
+Every route below is requested against a generated dataset while its SQL is
+captured through get_db(). Each captured statement is then explained. A
+statement on a hot route fails the test when its plan contains a full table
+scan, an unbounded index walk (SCAN ... USING INDEX without LIMIT) or a
+temporary B-tree for ORDER BY. Known offenders are listed in KNOWN_SLOW with
+the reason they are tolerated; an entry that stops matching also fails, so
+the list has to be kept current.
+"""
+import re
+import sqlite3
+import pytest
+from werkzeug.security import generate_password_hash
+from db import capture_statements
+from pagination import encode_cursor, encode_key
+from init_db import migrate
+from conftest import populate
+
+
+# (name, method, path, login as, form data, hot?)
+ROUTES = [
+    ("index", "GET", "/", None, None, True),
+    ("home", "GET", "/home", "user1", None, True),
+    ("games.browse", "GET", "/browse", None, None, True),
+    ("games.browse (rating)", "GET", "/browse?sort=rating", None, None, True),
+    ("games.browse (year)", "GET", "/browse?sort=year", None, None, True),
+    ("games.browse (page)", "GET", "/browse?after=" + encode_key(("title", "Game 1500", 1500)), None, None, True),
+    ("games.browse (rating page)", "GET", "/browse?sort=rating&after=" + encode_key(("rating", 0, 700)),
+     None, None, True),
+    ("games.browse (year, back)", "GET", "/browse?sort=year&genre=Genre+3&before=" + encode_key(("year", 2001, 900)),
+     None, None, True),
+    ("games.browse (search)", "GET", "/browse?q=Game+12&genre=Genre+3", None, None, True),
+    ("games.browse (search page)", "GET", "/browse?q=Game&sort=rating&after=" + encode_key(("rating", 0, 700)),
+     None, None, True),
+    ("games.browse (fuzzy)", "GET", "/browse?q=Gmae+1234", None, None, True),
+    ("games.game_detail", "GET", "/game/7", "user1", None, True),
+    ("games.game_detail (helpful)", "GET", "/game/7?reviews=helpful", None, None, True),
+    ("api.game_reviews", "GET", "/api/games/7/reviews?after=" + encode_key(("newest", "2024-01-01 00:00:00", 900)),
+     None, None, True),
+    ("api.game_reviews (helpful)", "GET", "/api/games/7/reviews?order=helpful&after=" + encode_key(("helpful", 0, 9000)),
+     None, None, True),
+    ("api.game_reviews (lowest)", "GET", "/api/games/7/reviews?order=lowest&after=" + encode_key(("lowest", 3, 9000)),
+     None, None, True),
+    ("games.add_to_list", "POST", "/game/7/add-to-list", "user1", {"status": "completed"}, True),
+    ("games.add_review", "POST", "/game/7/review", "user1", {"rating": "8", "review_text": "Good"}, True),
+    ("users.profile", "GET", "/profile/player3", "user1", None, True),
+    ("api.user_shelf", "GET", "/api/users/player3/shelves/wishlist", None, None, True),
+    ("api.user_shelf (page)", "GET",
+     "/api/users/player3/shelves/completed?after=" + encode_key(("completed", "2024-01-01 00:00:00", 500)),
+     None, None, True),
+    ("users.friends", "GET", "/friends", "user1", None, True),
+    ("users.discover_friends", "GET", "/friends/discover", "user1", None, True),
+    ("users.discover_friends (search)", "GET", "/friends/discover?q=yer12", "user1", None, True),
+    ("users.discover_friends (prefix)", "GET", "/friends/discover?q=pl", "user1", None, True),
+    ("users.follow_user", "POST", "/follow/player4", "user1", None, True),
+    ("api.activity_feed", "GET", "/api/feed", "user1", None, True),
+    ("api.activity_feed (deep)", "GET", "/api/feed?before=" + encode_cursor("2020-01-01 00:00:00", 500),
+     "user1", None, True),
+    ("api.user_activity", "GET", "/api/users/player3/activity?before=" + encode_cursor("2020-01-01 00:00:00", 500),
+     None, None, True),
+    ("users.edit_profile", "GET", "/profile/edit", "user1", None, False),
+    ("auth.login", "POST", "/login", None, {"username": "user1", "password": "password123"}, True),
+    ("admin.dashboard", "GET", "/admin", "admin", None, False),
+    ("admin.manage_games", "GET", "/admin/games", "admin", None, False),
+    ("admin.manage_games (search)", "GET", "/admin/games?q=Genre", "admin", None, False),
+    ("admin.manage_games (page)", "GET", "/admin/games?sort=rating&genre=Genre+3&after="
+     + encode_key(("rating", 0, 700)), "admin", None, False),
+    ("admin.export_games", "GET", "/admin/games/export?format=jsonl&platform=Platform+2", "admin", None, False),
+    ("admin.manage_users", "GET", "/admin/users", "admin", None, False),
+    ("admin.manage_users (page)", "GET", "/admin/users?sort=username&role=user&after="
+     + encode_key(("username", "player2", 5)), "admin", None, False),
+    ("admin.export_users", "GET", "/admin/users/export", "admin", None, False),
+    ("admin.manage_users (search)", "GET", "/admin/users?q=example", "admin", None, False),
+    ("admin.edit_game", "GET", "/admin/game/7/edit", "admin", None, False),
+]
+
+# (route name, regex on the statement) -> why the plan is tolerated for now
+KNOWN_SLOW = {
+    ("home", r"WITH candidates AS"):
+        "sorts one page of timeline rows plus one page per high-follower account",
+    ("home", r"SELECT DISTINCT g\.\*"):
+        "recommendations sort the games of at most three genres",
+    ("users.friends", r"WITH candidates AS"):
+        "sorts one page of timeline rows plus one page per high-follower account",
+    ("api.activity_feed", r"WITH candidates AS"):
+        "sorts one page of timeline rows plus one page per high-follower account",
+    ("api.activity_feed (deep)", r"WITH candidates AS"):
+        "sorts one page of timeline rows plus one page per high-follower account",
+    ("users.discover_friends (search)", r"users_fts MATCH"):
+        "orders the matching users by game_count",
+    ("users.discover_friends (prefix)", r"COLLATE NOCASE"):
+        "orders the matching users by game_count",
+    ("games.browse (fuzzy)", r"FROM games_fts"):
+        "sorts every full-text match to take one page",
+    ("games.browse (fuzzy)", r"games_title_trigrams MATCH"):
+        "ranks the candidates; bounded by FUZZY_MAX_TRIGRAMS * FUZZY_MAX_DF postings",
+    ("games.browse (search)", r"FROM games_fts"):
+        "sorts every full-text match to take one page",
+    ("games.browse (search page)", r"FROM games_fts"):
+        "sorts every full-text match to take one page",
+}
+
+STATEMENT = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+HAS_LIMIT = re.compile(r"\bLIMIT\b", re.IGNORECASE)
+# Statements FTS5 runs against its own shadow tables
+FTS_INTERNAL = re.compile(r"^\s*\w+ .*'main'\.'\w+_(config|data|idx|docsize|content)'", re.IGNORECASE | re.DOTALL)
+# A virtual table scan without any constraint passed to the module
+UNCONSTRAINED_VTAB = re.compile(r"VIRTUAL TABLE INDEX 0:$")
+# Sorting all of the rows, or only the tiebreak after an indexed prefix
+TEMP_SORT = re.compile(r"^USE TEMP B-TREE FOR (RIGHT PART OF |LAST TERM OF )?ORDER BY")
+
+
+SUBQUERY = re.compile(r"^(?:MATERIALIZE|CO-ROUTINE) (.+)$")
+
+
+def plan_problems(sql, plan):
+    # Scans of subqueries and CTEs read rows the statement already produced
+    derived = {"CONSTANT ROW"} | {m.group(1) for m in map(SUBQUERY.match, plan) if m}
+    problems = []
+    for detail in plan:
+        if TEMP_SORT.match(detail):
+            problems.append(detail)
+        elif " VIRTUAL TABLE INDEX " in detail:
+            if UNCONSTRAINED_VTAB.search(detail):
+                problems.append(detail)
+        elif detail.startswith("SCAN ") and detail[5:] not in derived and not detail.startswith("SCAN (subquery-"):
+            if " USING " not in detail or not HAS_LIMIT.search(sql):
+                problems.append(detail)
+    return problems
+
+
+def explain(conn, sql):
+    return [row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql)]
+
+
+def known_reason(route, sql):
+    for (known_route, pattern), reason in KNOWN_SLOW.items():
+        if known_route == route and re.search(pattern, sql):
+            return (known_route, pattern), reason
+    return None, None
+
+
+@pytest.fixture(scope="module")
+def large_db(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("plans") / "large.db")
+    conn = sqlite3.connect(db_path)
+    with open("schema.sql") as f:
+        conn.executescript(f.read())
+    migrate(conn)
+    password_hash = generate_password_hash("password123")
+    conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('user1', 'user1@example.com', ?)",
+                 (password_hash,))
+    conn.execute("INSERT INTO users (username, email, password_hash, is_admin) "
+                 "VALUES ('admin', 'admin@example.com', ?, 1)", (password_hash,))
+    conn.commit()
+    conn.close()
+    populate(db_path)
+    return db_path
+
+
+def test_route_query_plans(test_app, large_db, capsys):
+    test_app.config["DATABASE"] = large_db
+
+    captured = {}
+    for name, method, path, user, data, hot in ROUTES:
+        client = test_app.test_client()
+        if user:
+            client.post("/login", data={"username": user, "password": "password123"})
+        with capture_statements() as statements:
+            resp = client.open(path, method=method, data=data)
+        assert resp.status_code in (200, 302), f"{name}: {resp.status_code}"
+        captured[name] = ([sql for sql in statements if STATEMENT.match(sql) and not FTS_INTERNAL.match(sql)], hot)
+
+    conn = sqlite3.connect(large_db)
+    failures = []
+    used_known = set()
+    summary = ["", "Query plans per route:"]
+    report = ["", "Query plans per route:"]
+    for name, (statements, hot) in captured.items():
+        summary.append(f"  {name}: {len(statements)} statements")
+        report.append(f"  {name} ({len(statements)} statements)")
+        for sql in statements:
+            plan = explain(conn, sql)
+            problems = plan_problems(sql, plan)
+            flat = " ".join(sql.split())
+            marker = "ok"
+            if problems:
+                key, reason = known_reason(name, flat)
+                if key is not None:
+                    used_known.add(key)
+                    marker = f"known: {reason}"
+                elif hot:
+                    marker = "FAIL"
+                    failures.append(f"{name}: {flat[:120]}\n      " + "\n      ".join(problems))
+                else:
+                    marker = "cold"
+                summary.extend(f"    [{marker.split(':')[0]}] {problem}" for problem in problems)
+            report.append(f"    [{marker}] {flat[:90]}")
+            for detail in plan:
+                report.append(f"        {detail}")
+    conn.close()
+
+    # The summary on every run, every plan line only when there is something to look at
+    with capsys.disabled():
+        print("\n".join(summary))
+    stale = [f"{route}: {pattern}" for route, pattern in KNOWN_SLOW if (route, pattern) not in used_known]
+    assert not failures, ("Hot queries with bad plans:\n  " + "\n  ".join(failures)
+                          + "\n".join(report))
+    assert not stale, ("KNOWN_SLOW entries no longer needed:\n  " + "\n  ".join(stale)
+                       + "\n".join(report))
+
+
+def test_plan_problems_flags_scans_and_sorts():
+    assert plan_problems("SELECT * FROM games", ["SCAN games"])
+    assert plan_problems("SELECT * FROM games ORDER BY title", ["SCAN games USING INDEX idx_games_title"])
+    assert plan_problems("SELECT * FROM t ORDER BY x LIMIT 5", ["SCAN t", "USE TEMP B-TREE FOR ORDER BY"])
+    assert not plan_problems("SELECT * FROM games ORDER BY title LIMIT 5",
+                             ["SCAN games USING INDEX idx_games_title"])
+    assert not plan_problems("SELECT 1", ["SCAN CONSTANT ROW"])
+    assert not plan_problems("SELECT rowid FROM games_fts WHERE games_fts MATCH 'x'",
+                             ["SCAN games_fts VIRTUAL TABLE INDEX 0:M6"])
+    assert plan_problems("SELECT rowid FROM games_fts", ["SCAN games_fts VIRTUAL TABLE INDEX 0:"])
+    assert not plan_problems("SELECT * FROM (SELECT * FROM t LIMIT 5) c",
+                             ["CO-ROUTINE c", "SEARCH t USING INDEX idx_t (x=?)", "SCAN c"])
+    assert not plan_problems("SELECT * FROM games WHERE id = 1",
+                             ["SEARCH games USING INTEGER PRIMARY KEY (rowid=?)"])
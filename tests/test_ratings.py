@@ -0,0 +1,83 @@
+import sqlite3
+from db import capture_statements
+
+
+def _game(db_path, game_id=1):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT * FROM games WHERE id = ?", (game_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def _add_game_and_users(db_path, users=3):
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO games (title) VALUES ('Rated Game')")
+    conn.executemany("INSERT INTO users (username, email, password_hash) VALUES (?, ?, 'x')",
+                     [(f"rater{i}", f"rater{i}@example.com") for i in range(users)])
+    conn.commit()
+    conn.close()
+
+
+def test_review_updates_aggregates(test_app, client, auth):
+    db_path = test_app.config["DATABASE"]
+    _add_game_and_users(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO reviews (user_id, game_id, rating) VALUES (3, 1, 4)")
+    conn.commit()
+    conn.close()
+
+    auth.login()
+    client.post("/game/1/review", data={"rating": "8", "review_text": "Good"})
+    game = _game(db_path)
+    assert (game["rating_sum"], game["rating_count"]) == (12, 2)
+    assert game["average_rating"] == 6.0
+    assert (game["rating_4"], game["rating_8"]) == (1, 1)
+
+    # Editing moves the review to another bucket
+    client.post("/game/1/review", data={"rating": "10", "review_text": "Great"})
+    game = _game(db_path)
+    assert (game["rating_sum"], game["rating_count"]) == (14, 2)
+    assert (game["rating_8"], game["rating_10"]) == (0, 1)
+    assert game["average_rating"] == 7.0
+
+
+def test_review_submission_does_not_scan_reviews(test_app, client, auth):
+    _add_game_and_users(test_app.config["DATABASE"])
+    auth.login()
+    with capture_statements() as statements:
+        client.post("/game/1/review", data={"rating": "8", "review_text": "Good"})
+    assert not [sql for sql in statements if "AVG(" in sql.upper() or "FROM REVIEWS WHERE GAME_ID" in sql.upper()]
+
+
+def test_deleting_user_removes_their_ratings(test_app, client, auth):
+    db_path = test_app.config["DATABASE"]
+    _add_game_and_users(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO reviews (user_id, game_id, rating) VALUES (?, 1, ?)", [(3, 2), (4, 6)])
+    conn.commit()
+    conn.close()
+
+    auth.login_admin()
+    client.post("/admin/user/3/delete")
+    game = _game(db_path)
+    assert (game["rating_sum"], game["rating_count"], game["rating_2"]) == (6, 1, 0)
+    assert game["average_rating"] == 6.0
+
+    client.post("/admin/user/4/delete")
+    game = _game(db_path)
+    assert (game["rating_sum"], game["rating_count"], game["average_rating"]) == (0, 0, 0.0)
+
+
+def test_game_page_shows_rating_distribution(test_app, client):
+    db_path = test_app.config["DATABASE"]
+    _add_game_and_users(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO reviews (user_id, game_id, rating) VALUES (?, 1, ?)", [(3, 9), (4, 9), (5, 3)])
+    conn.commit()
+    conn.close()
+
+    resp = client.get("/game/1")
+    assert b"3 ratings" in resp.data
+    assert b"width: 100.0%" in resp.data
+    assert b"width: 50.0%" in resp.data
@@ -0,0 +1,103 @@
+import re
+import sqlite3
+import pytest
+from modules.reviews import PAGE_SIZE
+from pagination import encode_key
+
+
+@pytest.fixture
+def reviewed(test_app):
+    # Game 1 with 35 reviews from 35 users; ratings and helpful counts tie a lot
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    conn.execute("INSERT INTO games (title) VALUES ('Hollow Knight')")
+    conn.executemany(
+        "INSERT INTO users (username, email, password_hash) VALUES (?, ?, 'x')",
+        [(f"critic{i}", f"critic{i}@example.com") for i in range(35)],
+    )
+    conn.executemany(
+        "INSERT INTO reviews (user_id, game_id, rating, review_text, is_anonymous, helpful_count, created_at) "
+        "SELECT id, 1, ?, ?, ?, ?, datetime('2024-01-01', ? || ' hours') FROM users WHERE username = ?",
+        [(1 + i % 10, f"Review number {i}", int(i % 9 == 0), i % 3, -(i // 2), f"critic{i}") for i in range(35)],
+    )
+    conn.commit()
+    conn.close()
+    return test_app
+
+
+def _review_texts(html):
+    return re.findall(r"Review number (\d+)", html)
+
+
+def _expected(test_app, order_by):
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    texts = [row[0] for row in conn.execute(f"SELECT review_text FROM reviews ORDER BY {order_by}")]
+    conn.close()
+    return [text.split()[-1] for text in texts]
+
+
+@pytest.mark.parametrize("order, order_by", [
+    ("newest", "created_at DESC, id DESC"),
+    ("helpful", "helpful_count DESC, id DESC"),
+    ("highest", "rating DESC, id DESC"),
+    ("lowest", "rating ASC, id ASC"),
+])
+def test_game_page_then_api_pages_cover_every_review(reviewed, client, order, order_by):
+    html = client.get(f"/game/1?reviews={order}").data.decode()
+    seen = _review_texts(html)
+    assert len(seen) == PAGE_SIZE
+
+    next_url = re.search(r'data-next-url="([^"]+)"', html).group(1).replace("&amp;", "&")
+    while next_url:
+        page = client.get(next_url).get_json()
+        assert len(page["items"]) == len(_review_texts(page["html"])) <= PAGE_SIZE
+        seen += _review_texts(page["html"])
+        next_url = page["next"]
+    assert seen == _expected(reviewed, order_by)
+
+
+@pytest.mark.parametrize("order, order_by", [
+    ("helpful", "IFNULL(helpful_count, 0) DESC, id DESC"),
+    ("lowest", "IFNULL(rating, 0) ASC, id ASC"),
+])
+def test_reviews_without_rating_or_votes_page_as_zero(reviewed, client, order, order_by):
+    conn = sqlite3.connect(reviewed.config["DATABASE"])
+    conn.execute("UPDATE reviews SET rating = NULL, helpful_count = NULL WHERE id % 2 = 0")
+    conn.commit()
+    conn.close()
+
+    seen = []
+    next_url = f"/api/games/1/reviews?order={order}"
+    while next_url:
+        resp = client.get(next_url)
+        assert resp.status_code == 200
+        seen += _review_texts(resp.get_json()["html"])
+        next_url = resp.get_json()["next"]
+    assert seen == _expected(reviewed, order_by)
+
+
+def test_api_hides_anonymous_reviewers(reviewed, client):
+    items = client.get("/api/games/1/reviews?order=lowest").get_json()["items"]
+    first = items[0]
+    assert first["review_text"] == "Review number 0" and first["username"] is None
+    assert items[1]["username"] == "critic10"
+    assert "critic0<" not in client.get("/api/games/1/reviews?order=lowest").get_json()["html"]
+
+
+def test_api_rejects_bad_requests(reviewed, client):
+    assert client.get("/api/games/99/reviews").status_code == 404
+    assert client.get("/api/games/1/reviews?order=random").status_code == 400
+    assert client.get("/api/games/1/reviews?after=garbage").status_code == 400
+    # A cursor from another order
+    cursor = encode_key(("helpful", 1, 5))
+    assert client.get(f"/api/games/1/reviews?order=highest&after={cursor}").status_code == 400
+
+
+def test_short_review_list_has_no_next_page(test_app, client, auth):
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    conn.execute("INSERT INTO games (title) VALUES ('Celeste')")
+    conn.execute("INSERT INTO reviews (user_id, game_id, rating, review_text) VALUES (1, 1, 9, 'Review number 1')")
+    conn.commit()
+    conn.close()
+    html = client.get("/game/1").data.decode()
+    assert _review_texts(html) == ["1"]
+    assert "data-next-url" not in html
@@ -0,0 +1,140 @@
+import sqlite3
+import pytest
+from invalidation import get_log
+from route_cache import get_route_cache, read_versions
+
+
+@pytest.fixture
+def catalog(catalog, monkeypatch):
+    # Logged-out pages would be answered by the anonymous cache first
+    monkeypatch.setitem(catalog.config, "RESPONSE_CACHE", False)
+    return catalog
+
+
+def hit(resp):
+    return resp.headers.get("X-Route-Cache") == "HIT"
+
+
+def test_unchanged_pages_are_served_with_one_query(catalog, client, auth):
+    auth.login()
+    for path in ("/game/1", "/profile/admin", "/browse?sort=rating"):
+        first = client.get(path)
+        assert first.headers["X-Route-Cache"] == "MISS"
+        resp = client.get(path)
+        assert hit(resp) and resp.data == first.data
+        assert 'desc="1 queries"' in resp.headers["Server-Timing"]
+
+
+def test_add_to_list_changes_only_the_viewers_pages(catalog, client, auth):
+    auth.login()
+    client.get("/game/1")
+    client.get("/browse")
+    client.post("/game/1/add-to-list", data={"status": "completed"}, follow_redirects=True)
+
+    resp = client.get("/game/1")
+    assert not hit(resp)
+    assert hit(client.get("/browse"))
+
+
+def test_follow_changes_both_profiles(catalog, client, auth):
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("INSERT INTO users (username, email, password_hash) VALUES ('bystander', 'b@example.com', 'x')")
+    conn.commit()
+    conn.close()
+    for path in ("/profile/user1", "/profile/admin", "/profile/bystander"):
+        client.get(path)
+
+    auth.login()
+    client.post("/follow/admin", follow_redirects=True)
+    auth.logout()
+
+    assert not hit(client.get("/profile/user1"))
+    assert not hit(client.get("/profile/admin"))
+    assert hit(client.get("/profile/bystander"))
+
+
+def test_reviews_and_admin_edits_change_the_pages_showing_them(catalog, client, auth):
+    for path in ("/game/1", "/game/2", "/browse"):
+        client.get(path)
+
+    auth.login()
+    client.post("/game/1/review", data={"rating": "9", "review_text": "Bugs everywhere"}, follow_redirects=True)
+    auth.logout()
+    assert hit(client.get("/game/2"))
+    for path in ("/game/1", "/browse"):
+        resp = client.get(path)
+        assert not hit(resp), path
+    assert b"Bugs everywhere" in client.get("/").data
+
+    auth.login_admin()
+    client.post("/admin/game/2/edit", data={"title": "Celeste Classic", "genre": "", "platform": "",
+                                             "release_year": "", "cover_image_url": "", "description": ""})
+    auth.logout()
+    resp = client.get("/game/2")
+    assert not hit(resp) and b"Celeste Classic" in resp.data
+
+
+def test_reviews_leaving_the_average_alone_keep_catalog_pages(catalog, client, auth):
+    auth.login()
+    client.post("/game/1/review", data={"rating": "9", "review_text": "Bugs"}, follow_redirects=True)
+    auth.logout()
+    for path in ("/game/1", "/browse", "/profile/user1"):
+        client.get(path)
+
+    auth.login_admin()
+    client.post("/game/1/review", data={"rating": "9", "review_text": "Knights"}, follow_redirects=True)
+    auth.logout()
+    assert not hit(client.get("/game/1"))
+    assert hit(client.get("/browse"))
+    assert hit(client.get("/profile/user1"))
+
+
+def test_pages_are_kept_per_viewer(catalog, client, auth):
+    client.get("/game/1")
+    auth.login()
+    resp = client.get("/game/1")
+    assert not hit(resp) and b"Write a Review" in resp.data
+    assert len(get_route_cache(catalog)) == 2
+
+
+def test_missing_rows_are_not_cached(catalog, client):
+    assert client.get("/game/99").status_code == 302
+    assert client.get("/profile/nobody").status_code == 302
+    with catalog.test_request_context():
+        from db import get_db
+        assert read_versions(get_db(), ["games:99"]) is None
+        assert read_versions(get_db(), ["games:1", "reviews:game:1", "never-bumped"])[1:] == (0, 0)
+    assert len(get_route_cache(catalog)) == 0
+
+
+def test_disabled_cache_still_sends_validators(catalog, client, monkeypatch):
+    monkeypatch.setitem(catalog.config, "ROUTE_CACHE", False)
+    client.get("/game/1")
+    resp = client.get("/game/1")
+    assert "X-Route-Cache" not in resp.headers and resp.headers["ETag"]
+
+
+def test_rows_changed_by_another_worker_are_not_cached_stale(catalog, client, monkeypatch):
+    # The entity cache holds game 1, and this worker will not poll on its own
+    monkeypatch.setitem(catalog.config, "INVALIDATION_POLL_INTERVAL", 3600)
+    client.get("/game/1")
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("UPDATE games SET title = 'Hollow Knight: Silksong' WHERE id = 1")
+    conn.commit()
+    conn.close()
+
+    resp = client.get("/game/1")
+    assert not hit(resp) and b"Silksong" in resp.data
+    resp = client.get("/game/1")
+    assert hit(resp) and b"Silksong" in resp.data
+
+
+def test_miss_does_not_wait_for_another_thread_applying_the_log(catalog, client, monkeypatch):
+    monkeypatch.setitem(catalog.config, "INVALIDATION_POLL_INTERVAL", 3600)
+    log = get_log(catalog)
+    with log.lock:
+        resp = client.get("/game/1")
+    # Served, but it may predate events the other thread is applying
+    assert resp.status_code == 200 and "X-Route-Cache" not in resp.headers
+    assert len(get_route_cache(catalog)) == 0
+    assert client.get("/game/1").headers["X-Route-Cache"] == "MISS"
@@ -0,0 +1,140 @@
+import re
+import sqlite3
+import pytest
+from modules.search import match_expression
+from conftest import insert_rows
+
+
+@pytest.fixture
+def catalog_games():
+    return [
+        {"title": "Hollow Knight", "developer": "Team Cherry", "genre": "Metroidvania", "platform": "PC",
+         "description": "Bugs and knights."},
+        {"title": "Pokémon Snap", "developer": "HAL", "genre": "Photography", "platform": "N64",
+         "description": "Take pictures."},
+        {"title": "Knightfall", "developer": "Studio K", "genre": "Strategy", "platform": "PC",
+         "description": "A hollow crown."},
+        {"title": "Celeste", "developer": "Maddy Makes Games", "genre": "Platformer", "platform": "Switch",
+         "description": "Climb a mountain."},
+    ]
+
+
+def _titles(html):
+    return re.findall(r'class="game-card-title">([^<]+)<', html.decode())
+
+
+def test_match_expression_quotes_words_as_prefixes():
+    assert match_expression("hollow kni") == '"hollow"* "kni"*'
+    assert match_expression('title:"x" OR NEAR(') == '"title"* "x"* "OR"* "NEAR"*'
+    assert match_expression("  !! ") is None
+
+
+def test_browse_search_folds_accents_and_case(catalog, client):
+    assert _titles(client.get("/browse?q=POKEMON").data) == ["Pokémon Snap"]
+
+
+def test_browse_search_matches_prefixes_ranked_by_relevance(catalog, client):
+    # A title hit ranks above a description hit
+    assert _titles(client.get("/browse?q=hollow").data) == ["Hollow Knight", "Knightfall"]
+    assert set(_titles(client.get("/browse?q=knigh").data)) == {"Hollow Knight", "Knightfall"}
+
+
+def test_browse_search_keeps_filters_and_explicit_sort(catalog, client):
+    assert _titles(client.get("/browse?q=hollow&sort=title").data) == ["Hollow Knight", "Knightfall"]
+    assert _titles(client.get("/browse?q=hollow&genre=Strategy").data) == ["Knightfall"]
+    assert _titles(client.get("/browse?q=team+cherry").data) == ["Hollow Knight"]
+
+
+def test_index_follows_game_edits_and_deletes(catalog, client):
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.execute("UPDATE games SET title = 'Silksong' WHERE title = 'Hollow Knight'")
+    conn.execute("DELETE FROM games WHERE title = 'Celeste'")
+    conn.commit()
+    conn.close()
+
+    assert _titles(client.get("/browse?q=silksong").data) == ["Silksong"]
+    assert _titles(client.get("/browse?q=celeste").data) == []
+
+
+def test_admin_search_uses_full_text_index(catalog, client, auth):
+    auth.login_admin()
+    html = client.get("/admin/games?q=metroid").data
+    assert b"Hollow Knight" in html
+    assert b"Celeste" not in html
+
+
+@pytest.mark.parametrize("q", ["!!!", "%22"])
+def test_searches_without_words_match_nothing(catalog, client, auth, q):
+    assert _titles(client.get(f"/browse?q={q}").data) == []
+    auth.login_admin()
+    html = client.get(f"/admin/games?q={q}").data
+    assert b"Hollow Knight" not in html
+    assert b"Celeste" not in html
+
+
+@pytest.fixture
+def people(test_app):
+    insert_rows(test_app.config["DATABASE"], "users", [
+        {"username": "speedrunner", "email": "fast@example.com", "password_hash": "x", "name": "Alice Moreau"},
+        {"username": "Knightly", "email": "knight@secret.org", "password_hash": "x", "name": "Bob"},
+        {"username": "casual", "email": "casual@example.com", "password_hash": "x", "name": None},
+        {"username": "elo", "email": "elo@example.com", "password_hash": "x", "name": "Élodie"},
+    ])
+    return test_app
+
+
+def _discover(client, q):
+    html = client.get(f"/friends/discover?q={q}").data.decode()
+    results = html.split("<h2>Results</h2>", 1)[1]
+    return set(re.findall(r'/profile/(\w+)', results))
+
+
+def test_discover_matches_substrings_and_short_prefixes(people, client, auth):
+    auth.login()
+    assert _discover(client, "RUNN") == {"speedrunner"}
+    assert _discover(client, "moreau") == {"speedrunner"}
+    assert _discover(client, "kn") == {"Knightly"}
+    assert _discover(client, "ca") == {"casual"}
+    # Two characters only match the start of a name
+    assert _discover(client, "un") == set()
+
+
+def test_discover_folds_case_of_short_non_ascii_prefixes(people, client, auth):
+    auth.login()
+    assert _discover(client, "él") == {"elo"}
+    assert _discover(client, "ÉL") == {"elo"}
+    assert _discover(client, "é_") == set()
+
+
+def test_discover_prefix_ending_in_at_sign(people, client, auth):
+    insert_rows(people.config["DATABASE"], "users", [
+        {"username": "athome", "email": "a@example.com", "password_hash": "x", "name": "x@home"},
+        {"username": "files", "email": "f@example.com", "password_hash": "x", "name": "x_files"},
+    ])
+    auth.login()
+    assert _discover(client, "X@") == {"athome"}
+
+
+def test_discover_does_not_search_email(people, client, auth):
+    auth.login()
+    assert _discover(client, "secret") == set()
+
+
+def test_admin_user_search_includes_email(people, client, auth):
+    auth.login_admin()
+    html = client.get("/admin/users?q=secret.org").data
+    assert b"Knightly" in html
+    assert b"speedrunner" not in html
+
+
+def test_user_search_follows_registration_and_profile_edits(people, client, auth):
+    client.post("/register", data={"username": "newcomer", "email": "new@example.com", "name": "",
+                                   "password": "password123", "confirm_password": "password123"})
+    auth.login()
+    assert _discover(client, "comer") == {"newcomer"}
+
+    client.post("/profile/edit", data={"name": "Zelda Fan", "bio": ""})
+    auth.logout()
+    auth.login("newcomer", "password123")
+    assert _discover(client, "zelda") == {"user1"}
@@ -0,0 +1,80 @@
+import re
+import sqlite3
+import pytest
+from modules.shelves import PAGE_SIZE
+from pagination import encode_key
+
+
+@pytest.fixture
+def shelved(test_app):
+    # user1 has 30 completed games (some added at the same moment) and 2 on the wishlist
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    conn.executemany("INSERT INTO games (title) VALUES (?)", [(f"Game {i}",) for i in range(1, 33)])
+    conn.executemany(
+        "INSERT INTO user_games (user_id, game_id, status, added_at) "
+        "VALUES (1, ?, ?, datetime('2024-01-01', ? || ' days'))",
+        [(i, "completed" if i <= 30 else "wishlist", i // 4) for i in range(1, 33)],
+    )
+    conn.commit()
+    conn.close()
+    return test_app
+
+
+def _game_ids(html):
+    return [int(i) for i in re.findall(r'href="/game/(\d+)" class="game-card"', html)]
+
+
+def _expected(test_app, status):
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    ids = [row[0] for row in conn.execute(
+        "SELECT game_id FROM user_games WHERE user_id = 1 AND status = ? ORDER BY added_at DESC, game_id DESC",
+        (status,))]
+    conn.close()
+    return ids
+
+
+def test_profile_renders_first_page_of_first_non_empty_shelf(shelved, client):
+    html = client.get("/profile/user1").data.decode()
+    assert _game_ids(html) == [32, 31]
+    # Counts come from user_stats; the other shelves are loaded on demand
+    assert re.search(r'Completed <span class="shelf-count">30</span>', html)
+    assert re.search(r'Wishlist <span class="shelf-count">2</span>', html)
+    assert 'data-url="/api/users/user1/shelves/completed"' in html
+    assert 'data-url="/api/users/user1/shelves/wishlist"' not in html
+
+
+def test_show_more_pages_cover_the_shelf(shelved, client):
+    html = client.get("/profile/user1?shelf=completed").data.decode()
+    seen = _game_ids(html)
+    assert len(seen) == PAGE_SIZE
+    next_url = re.search(r'class="btn btn-secondary shelf-more" data-next-url="([^"]+)"', html).group(1)
+    while next_url:
+        page = client.get(next_url.replace("&amp;", "&")).get_json()
+        assert [item["id"] for item in page["items"]] == _game_ids(page["html"])
+        assert len(page["items"]) == (PAGE_SIZE if page["next"] else 30 % PAGE_SIZE or PAGE_SIZE)
+        seen += _game_ids(page["html"])
+        next_url = page["next"]
+    assert seen == _expected(shelved, "completed")
+
+
+def test_unopened_tab_loads_whole_shelf_fragment(shelved, client):
+    page = client.get("/api/users/user1/shelves/wishlist").get_json()
+    assert _game_ids(page["html"]) == [32, 31] and page["next"] is None
+    assert "shelf-more" not in page["html"]
+
+    empty = client.get("/api/users/user1/shelves/currently_playing").get_json()
+    assert empty["items"] == [] and "No games currently being played." in empty["html"]
+
+
+def test_shelf_api_rejects_bad_requests(shelved, client):
+    assert client.get("/api/users/nobody/shelves/wishlist").status_code == 404
+    assert client.get("/api/users/user1/shelves/owned").status_code == 404
+    assert client.get("/api/users/user1/shelves/wishlist?after=garbage").status_code == 400
+    cursor = encode_key(("completed", "2024-01-01 00:00:00", 5))
+    assert client.get(f"/api/users/user1/shelves/wishlist?after={cursor}").status_code == 400
+
+
+def test_new_user_profile_shows_empty_default_shelf(test_app, client):
+    html = client.get("/profile/user1").data.decode()
+    assert "No games currently being played." in html
+    assert "shelf-more" not in html
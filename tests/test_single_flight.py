@@ -0,0 +1,116 @@
+import sqlite3
+import threading
+import time
+import pytest
+from flask import render_template
+from cache import get_cache, get_value_cache
+from db import query_stats
+from modules import games
+
+CONCURRENCY = 200
+
+
+@pytest.fixture
+def catalog_games():
+    return [{"title": f"Game {i}", "genre": f"Genre {i % 5}", "platform": f"Platform {i % 3}"}
+            for i in range(50)]
+
+
+@pytest.fixture
+def catalog(catalog, monkeypatch):
+    # Keep other workers' changes out of the way, and let 200 requests share
+    # the read pool without timing out
+    monkeypatch.setitem(catalog.config, "INVALIDATION_POLL_INTERVAL", 3600)
+    monkeypatch.setitem(catalog.config, "DB_POOL_TIMEOUT", 60)
+    return catalog
+
+
+@pytest.fixture
+def slow_render(monkeypatch):
+    """Make rendering the landing and game pages take long enough for requests to pile up on them."""
+    def render(*args, **kwargs):
+        time.sleep(0.2)
+        return render_template(*args, **kwargs)
+    monkeypatch.setattr("app.render_template", render)
+    monkeypatch.setattr("modules.games.render_template", render)
+
+
+def burst(app, path):
+    """GET `path` from CONCURRENCY threads at once; returns the responses."""
+    barrier = threading.Barrier(CONCURRENCY)
+    responses = []
+
+    def request():
+        client = app.test_client()
+        barrier.wait()
+        responses.append(client.get(path))
+
+    threads = [threading.Thread(target=request) for _ in range(CONCURRENCY)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(responses) == CONCURRENCY and all(r.status_code == 200 for r in responses)
+    return responses
+
+
+def statements(matching=""):
+    return sum(s["calls"] for s in query_stats.top(limit=1000) if matching in s["sql"])
+
+
+def queries(resp):
+    timing = resp.headers.get("Server-Timing", "")
+    return int(timing.split('desc="')[1].split()[0]) if timing else 0
+
+
+def test_invalidated_page_is_rebuilt_once(catalog, client, slow_render):
+    rebuild = queries(client.get("/"))
+    with catalog.app_context():
+        get_cache().invalidate("index")
+
+    query_stats.reset()
+    responses = burst(catalog, "/")
+    # One request rebuilt the page; the rest were served the old one meanwhile
+    assert statements() == rebuild
+    assert sum(queries(r) for r in responses) == rebuild
+    with catalog.app_context():
+        stats = get_cache().stats()
+    assert stats["rebuilds"] == 2 and stats["hits"] + stats["stale_hits"] == CONCURRENCY - 1
+
+
+def test_changed_page_is_rendered_once(catalog, client, slow_render):
+    client.get("/game/1")
+    conn = sqlite3.connect(catalog.config["DATABASE"])
+    conn.execute("INSERT INTO reviews (user_id, game_id, rating, review_text) VALUES (1, 1, 9, 'Great')")
+    conn.commit()
+    conn.close()
+    client.get("/game/1?warm")  # reload the game row into the entity cache
+
+    query_stats.reset()
+    responses = burst(catalog, "/game/1")
+    total = statements()
+    render = queries(client.get("/game/1?again"))  # a miss at the same versions
+    # Every request reads the versions; only one renders the new page
+    assert total == CONCURRENCY + render - 1
+    assert [r.headers["X-Route-Cache"] for r in responses].count("MISS") == 1
+    assert len({r.data for r in responses}) == 1 and b"Great" in responses[0].data
+
+
+def test_expired_value_is_computed_once(catalog, client, monkeypatch):
+    monkeypatch.setitem(catalog.config, "RESPONSE_CACHE", False)
+    monkeypatch.setitem(catalog.config, "ROUTE_CACHE", False)
+    facets = games._facets
+    monkeypatch.setattr(games, "_facets", lambda db: time.sleep(0.2) or facets(db))
+    now = [0.0]
+    with catalog.app_context():
+        monkeypatch.setattr(get_value_cache(), "clock", lambda: now[0])
+    client.get("/browse")
+    now[0] = catalog.config["BROWSE_FACETS_TTL"] + 1
+
+    query_stats.reset()
+    burst(catalog, "/browse")
+    # The page itself is read by every request, the filters by one
+    assert statements("SELECT DISTINCT genre") == 1
+    assert statements("SELECT DISTINCT platform") == 1
+    total = statements()
+    assert total == CONCURRENCY * queries(client.get("/browse")) + 2
@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+import pytest
+from modules.suggest import PrefixIndex
+
+
+@pytest.fixture
+def index():
+    index = PrefixIndex()
+    index.load([
+        ("game", 1, "Hollow Knight", 50),
+        ("game", 2, "Pokémon Snap", 10),
+        ("game", 3, "Knightfall", 5),
+        ("user", 1, "knightlover", 2),
+    ])
+    return index
+
+
+def test_prefix_search_matches_any_word_ranked_by_weight(index):
+    assert index.search("kni", 10) == [("game", 1, "Hollow Knight"), ("game", 3, "Knightfall"),
+                                       ("user", 1, "knightlover")]
+    assert index.search("hollow k", 10) == [("game", 1, "Hollow Knight")]
+    assert index.search("KNI", 2) == [("game", 1, "Hollow Knight"), ("game", 3, "Knightfall")]
+    assert index.search("pokemon", 10) == [("game", 2, "Pokémon Snap")]
+    assert index.search("zzz", 10) == []
+    assert index.search("  ", 10) == []
+
+
+def test_incremental_updates(index):
+    index.add("game", 3, "Silksong")
+    assert index.search("knightf", 10) == []
+    assert index.search("silk", 10) == [("game", 3, "Silksong")]
+
+    index.remove("game", 1)
+    assert index.search("hollow", 10) == []
+    assert len(index) == 3
+
+
+def test_searches_during_updates_see_consistent_versions(index):
+    stop = threading.Event()
+
+    def churn():
+        while not stop.is_set():
+            index.add("game", 4, "Knight Witch", 1)
+            index.remove("game", 4)
+
+    writer = threading.Thread(target=churn)
+    writer.start()
+    try:
+        for _ in range(2000):
+            assert index.search("kni", 5)[0] == ("game", 1, "Hollow Knight")
+    finally:
+        stop.set()
+        writer.join()
+
+
+def test_suggest_endpoint(test_app, client, auth, assert_num_queries):
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    conn.executemany("INSERT INTO games (title) VALUES (?)", [("Celeste",), ("Cuphead",)])
+    conn.commit()
+    conn.close()
+
+    data = client.get("/api/suggest?q=cel").get_json()
+    assert data["items"] == [{"type": "game", "id": 1, "label": "Celeste", "url": "/game/1"}]
+    assert client.get("/api/suggest?q=user").get_json()["items"][0]["url"] == "/profile/user1"
+
+    # Served from memory once loaded
+    assert_num_queries("/api/suggest?q=cu", 0)
+
+
+def test_suggest_says_when_it_returned_every_match(test_app, client, monkeypatch):
+    monkeypatch.setitem(test_app.config, "SUGGEST_LIMIT", 2)
+    conn = sqlite3.connect(test_app.config["DATABASE"])
+    conn.executemany("INSERT INTO games (title) VALUES (?)", [("Celeste",), ("Cuphead",), ("Cult of the Lamb",)])
+    conn.commit()
+    conn.close()
+
+    data = client.get("/api/suggest?q=cu").get_json()
+    assert len(data["items"]) == 2 and not data["complete"]
+    data = client.get("/api/suggest?q=cel").get_json()
+    assert len(data["items"]) == 1 and data["complete"]
+
+
+def test_admin_game_changes_update_suggestions(test_app, client, auth):
+    auth.login_admin()
+    assert client.get("/api/suggest?q=test").get_json()["items"] == []
+
+    client.post("/admin/game/add", data={"title": "Test Game", "genre": "", "platform": "",
+                                         "cover_image_url": "", "description": ""})
+    assert [i["label"] for i in client.get("/api/suggest?q=test").get_json()["items"]] == ["Test Game"]
+
+    client.post("/admin/game/1/edit", data={"title": "Renamed", "genre": "", "platform": "",
+                                            "cover_image_url": "", "description": ""})
+    assert client.get("/api/suggest?q=test").get_json()["items"] == []
+    assert [i["label"] for i in client.get("/api/suggest?q=ren").get_json()["items"]] == ["Renamed"]
+
+    client.post("/admin/game/1/delete")
+    assert client.get("/api/suggest?q=ren").get_json()["items"] == []
@@ -0,0 +1,81 @@
+import sqlite3
+
+
+def _stats(db_path, user_id):
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT * FROM user_stats WHERE user_id = ?", (user_id,)).fetchone()
+    conn.close()
+    return dict(row)
+
+
+def _add_games_and_users(db_path):
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO games (title) VALUES (?)", [("Game A",), ("Game B",)])
+    conn.executemany("INSERT INTO users (username, email, password_hash) VALUES (?, ?, 'x')",
+                     [("player0", "player0@example.com"), ("player1", "player1@example.com")])
+    conn.commit()
+    conn.close()
+
+
+def test_new_users_get_a_stats_row(test_app):
+    stats = _stats(test_app.config["DATABASE"], 1)
+    assert stats["game_count"] == stats["follower_count"] == stats["review_count"] == 0
+
+
+def test_shelf_review_and_follow_writes_update_stats(test_app, client, auth):
+    db_path = test_app.config["DATABASE"]
+    _add_games_and_users(db_path)
+    auth.login()
+
+    client.post("/game/1/add-to-list", data={"status": "wishlist"})
+    client.post("/game/2/add-to-list", data={"status": "completed"})
+    client.post("/game/1/add-to-list", data={"status": "currently_playing"})
+    client.post("/game/1/review", data={"rating": "7", "review_text": ""})
+    client.post("/follow/player0")
+
+    stats = _stats(db_path, 1)
+    assert stats["game_count"] == 2
+    assert (stats["wishlist_count"], stats["currently_playing_count"], stats["completed_count"]) == (0, 1, 1)
+    assert stats["review_count"] == 1
+    assert stats["following_count"] == 1
+    assert _stats(db_path, 3)["follower_count"] == 1
+
+    client.post("/follow/player0")  # unfollow
+    assert _stats(db_path, 1)["following_count"] == 0
+    assert _stats(db_path, 3)["follower_count"] == 0
+
+
+def test_deleting_user_updates_other_users_stats(test_app, client, auth):
+    db_path = test_app.config["DATABASE"]
+    _add_games_and_users(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO follows (follower_id, following_id) VALUES (3, 1)")
+    conn.commit()
+    conn.close()
+    assert _stats(db_path, 1)["follower_count"] == 1
+
+    auth.login_admin()
+    client.post("/admin/user/3/delete")
+    assert _stats(db_path, 1)["follower_count"] == 0
+
+
+def test_pages_read_counts_from_user_stats(test_app, client, auth):
+    db_path = test_app.config["DATABASE"]
+    _add_games_and_users(db_path)
+    conn = sqlite3.connect(db_path)
+    conn.executemany("INSERT INTO user_games (user_id, game_id, status) VALUES (3, ?, 'completed')", [(1,), (2,)])
+    conn.execute("INSERT INTO follows (follower_id, following_id) VALUES (1, 3)")
+    conn.commit()
+    conn.close()
+
+    resp = client.get("/profile/player0")
+    assert "🎮 2 games".encode() in resp.data
+    assert "👥 1 followers".encode() in resp.data
+
+    auth.login()
+    resp = client.get("/friends/discover")
+    # player0 has the biggest library, so is listed first
+    assert resp.data.index(b"player0") < resp.data.index(b"player1")
+    assert b"2 games in their library" in resp.data
+    assert b"2 games in their library" in client.get("/friends").data